@@ -1,20 +1,51 @@
 # app.py
 from flask import Flask
-from flask_migrate import Migrate
-from flask_jwt_extended import JWTManager
-from models import db
-from routes import api
-from config import Config
-from flask_cors import CORS
+from config import Config, engine_options
 
-app = Flask(__name__)
-app.config.from_object(Config)
-CORS(app)  # Enable CORS for all routes
+def create_app(config=None):
+    """Build and configure the Flask application.
 
-db.init_app(app)
-migrate = Migrate(app, db)
-jwt = JWTManager(app)
-app.register_blueprint(api)
+    `config` is a mapping of settings or a config object applied on top of
+    Config. Importing this module has no side effects: routes, models and
+    extensions are only imported and registered here, so each process (or
+    test) builds exactly the app it needs.
+    """
+    app = Flask(__name__)
+    app.config.from_object(Config)
+    if isinstance(config, dict):
+        app.config.update(config)
+    elif config is not None:
+        app.config.from_object(config)
+    # Config sized the pool for DATABASE_URL, redo it for an overridden database
+    # unless the caller set its own (a Config subclass inherits the defaults)
+    if isinstance(config, dict):
+        explicit = 'SQLALCHEMY_ENGINE_OPTIONS' in config
+    else:
+        explicit = getattr(config, 'SQLALCHEMY_ENGINE_OPTIONS', Config.SQLALCHEMY_ENGINE_OPTIONS) is not Config.SQLALCHEMY_ENGINE_OPTIONS
+    if not explicit:
+        app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(app.config['SQLALCHEMY_DATABASE_URI'])
+
+    from flask_cors import CORS
+    from flask_jwt_extended import JWTManager
+    from models import db
+    from routes import api
+    from services import init_metrics
+
+    CORS(app, expose_headers=['X-Next-Cursor'])  # Enable CORS for all routes
+    db.init_app(app)
+    JWTManager(app)
+    app.register_blueprint(api)
+    init_metrics(app)
+
+    # The `flask db` commands pull in Alembic, which serving processes never use
+    if app.config['MIGRATE_COMMANDS']:
+        from flask_migrate import Migrate
+        Migrate(app, db)
+
+    return app
 
 if __name__ == '__main__':
-    app.run(debug=True)
\ No newline at end of file
+    from sweeper import start_configured_sweeper
+    app = create_app()
+    start_configured_sweeper(app)
+    app.run(debug=True)
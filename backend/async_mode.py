@@ -0,0 +1,24 @@
+# async_mode.py
+"""Cooperative (gevent) serving mode.
+
+In async mode every request runs on a greenlet instead of a worker thread,
+so a request that is waiting on Postgres costs a few KB of memory rather
+than a thread. The standard library and psycopg2 are patched to yield to the
+event loop while they wait, which lets the existing routes and SQLAlchemy
+sessions run unchanged. CPU-bound work (bcrypt) still goes to real OS
+threads, see hashing.PasswordHasher.
+"""
+
+def enable_async_mode():
+    """Patch the process for gevent. Call before anything else is imported."""
+    from gevent import monkey
+    monkey.patch_all()
+    from psycogreen.gevent import patch_psycopg
+    patch_psycopg()
+
+def async_mode_enabled():
+    try:
+        from gevent import monkey
+    except ImportError:
+        return False
+    return monkey.is_module_patched('socket')
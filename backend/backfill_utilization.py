@@ -0,0 +1,31 @@
+# backfill_utilization.py
+import argparse
+import time
+from datetime import datetime, timedelta
+from models import UtilizationRollup
+
+# Rebuild the utilization rollups from the appointment table, one window of days per transaction
+def backfill_utilization(start=None, end=None, days_per_batch=31):
+    if start is None or end is None:
+        UtilizationRollup.rebuild(start, end)
+        return
+    while start < end:
+        batch_end = min(start + timedelta(days=days_per_batch), end)
+        UtilizationRollup.rebuild(start, batch_end)
+        start = batch_end
+
+if __name__ == '__main__':
+    from app import create_app
+
+    parser = argparse.ArgumentParser(description='Rebuild the utilization rollups from the appointments.')
+    parser.add_argument('--from', dest='date_from', help='First day to rebuild (YYYY-MM-DD), everything when omitted')
+    parser.add_argument('--to', dest='date_to', help='Last day to rebuild (YYYY-MM-DD), everything when omitted')
+    parser.add_argument('--days-per-batch', type=int, default=31, help='Days rebuilt per transaction with --from and --to')
+    args = parser.parse_args()
+
+    start = datetime.strptime(args.date_from, '%Y-%m-%d').date() if args.date_from else None
+    end = datetime.strptime(args.date_to, '%Y-%m-%d').date() + timedelta(days=1) if args.date_to else None
+    with create_app().app_context():
+        started = time.perf_counter()
+        backfill_utilization(start, end, args.days_per_batch)
+        print(f"Utilization rollups rebuilt in {time.perf_counter() - started:.1f}s")
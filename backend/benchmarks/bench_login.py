@@ -0,0 +1,91 @@
+# benchmarks/bench_login.py
+"""Login throughput with bcrypt uncapped vs. capped at a number of concurrent hashes.
+
+Runs concurrent logins through the Flask test client while one thread keeps
+requesting the doctor list, and reports login throughput and doctor list
+latency for each mode. Usage: python benchmarks/bench_login.py [--threads N]
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+db_file = tempfile.NamedTemporaryFile(suffix='.db', delete=False)
+# Always a throwaway database, setup() drops every table
+os.environ['DATABASE_URL'] = f'sqlite:///{db_file.name}'
+
+from app import create_app
+from hashing import password_hasher
+from models import db, Patient, Doctor
+
+app = create_app({'MIGRATE_COMMANDS': False})
+
+def setup(patients):
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        for i in range(patients):
+            patient = Patient(name=f'Bench Patient {i}', email=f'bench{i}@example.com', phone='1234567890')
+            patient.set_password('benchpass123')
+            db.session.add(patient)
+        db.session.add(Doctor(name='Dr. Bench', email='drbench@example.com', phone='1234567890', specialization='General'))
+        db.session.commit()
+
+def run(threads, duration, workers):
+    app.config['PASSWORD_HASH_WORKERS'] = workers
+    app.config['PASSWORD_HASH_MAX_PENDING'] = max(threads, 1)
+    password_hasher.shutdown()
+    stop = time.monotonic() + duration
+    logins = []
+    list_latencies = []
+
+    def login(i):
+        client = app.test_client()
+        count = 0
+        while time.monotonic() < stop:
+            response = client.post('/api/patients/login', json={'email': f'bench{i}@example.com', 'password': 'benchpass123'})
+            assert response.status_code == 200
+            count += 1
+        logins.append(count)
+
+    def list_doctors():
+        client = app.test_client()
+        while time.monotonic() < stop:
+            started = time.perf_counter()
+            client.get('/api/doctors')
+            list_latencies.append(time.perf_counter() - started)
+
+    workers_threads = [threading.Thread(target=login, args=(i,)) for i in range(threads)]
+    workers_threads.append(threading.Thread(target=list_doctors))
+    for thread in workers_threads:
+        thread.start()
+    for thread in workers_threads:
+        thread.join()
+
+    list_latencies.sort()
+    return {
+        'logins_per_sec': sum(logins) / duration,
+        'doctors_p50_ms': statistics.median(list_latencies) * 1000,
+        'doctors_p99_ms': list_latencies[int(len(list_latencies) * 0.99)] * 1000
+    }
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--threads', type=int, default=32, help='Concurrent login clients')
+    parser.add_argument('--duration', type=float, default=5, help='Seconds per mode')
+    parser.add_argument('--pool-workers', type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    setup(args.threads)
+    try:
+        for label, workers in (('uncapped', 0), (f'capped at {args.pool_workers}', args.pool_workers)):
+            result = run(args.threads, args.duration, workers)
+            print(f"{label:>20}: {result['logins_per_sec']:8.1f} logins/s, "
+                  f"/api/doctors p50 {result['doctors_p50_ms']:.1f} ms, p99 {result['doctors_p99_ms']:.1f} ms")
+    finally:
+        password_hasher.shutdown()
+        os.unlink(db_file.name)
@@ -0,0 +1,64 @@
+# benchmarks/bench_serialization.py
+"""Appointment listing serialization: ORM objects + strftime + jsonify vs.
+column projection + isoformat + the fast JSON encoder.
+
+Usage: python benchmarks/bench_serialization.py [--rows 10000 50000]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+db_file = tempfile.NamedTemporaryFile(suffix='.db', delete=False)
+# Always a throwaway database, every table is dropped
+os.environ['DATABASE_URL'] = f'sqlite:///{db_file.name}'
+
+from flask import jsonify
+from app import create_app
+from benchmarks.datasets import build_dataset
+from models import Appointment
+from services.serialization import appointment_columns, serialize_appointments, json_response, APPOINTMENT_FIELDS
+
+def orm_listing(query):
+    appointments = query.all()
+    return jsonify([{
+        'id': appointment.id,
+        'doctor_id': appointment.doctor_id,
+        'patient_id': appointment.patient_id,
+        'appointment_time': appointment.appointment_time.strftime("%Y-%m-%d %H:%M"),
+        'status': appointment.status
+    } for appointment in appointments])
+
+def projected_listing(query):
+    rows = appointment_columns(query, APPOINTMENT_FIELDS).all()
+    return json_response(serialize_appointments(rows, APPOINTMENT_FIELDS))
+
+def best_of(fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, nargs='+', default=[10000, 50000])
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    app = create_app({'MIGRATE_COMMANDS': False})
+    try:
+        with app.test_request_context():
+            build_dataset(doctors=1, patients=100, appointments=max(args.rows))
+            for rows in args.rows:
+                query = Appointment.query.order_by(Appointment.appointment_time, Appointment.id).limit(rows)
+                assert orm_listing(query).get_json() == projected_listing(query).get_json()
+                orm = best_of(lambda: orm_listing(query), args.repeat)
+                projected = best_of(lambda: projected_listing(query), args.repeat)
+                print(f"{rows:>8} rows: ORM {orm * 1000:8.1f} ms, projected {projected * 1000:8.1f} ms, "
+                      f"{orm / projected:.1f}x faster")
+    finally:
+        os.unlink(db_file.name)
@@ -0,0 +1,113 @@
+# benchmarks/bench_startup.py
+"""Cold start and worker fork time of the production app.
+
+Cold start runs in a fresh interpreter per sample: importing wsgi (which
+builds the app) and serving the first request. Fork time preloads the app
+once, like gunicorn's master with preload_app, then forks workers and times
+each one from fork until it has served its first request. Usage:
+python benchmarks/bench_startup.py [--runs N] [--output FILE]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND)
+
+# Runs in the child interpreter, prints its timings as JSON
+COLD_START = """
+import json, sys, time
+started = time.perf_counter()
+import wsgi
+imported = time.perf_counter()
+with wsgi.app.test_client() as client:
+    status = client.get('/api/doctors').status_code
+served = time.perf_counter()
+print(json.dumps({'import_ms': (imported - started) * 1000, 'first_request_ms': (served - imported) * 1000,
+                  'total_ms': (served - started) * 1000, 'modules': len(sys.modules), 'status': status}))
+"""
+
+def setup_database(database_url):
+    from app import create_app
+    from models import db
+    app = create_app({'SQLALCHEMY_DATABASE_URI': database_url, 'MIGRATE_COMMANDS': False, 'STATUS_SWEEP_INTERVAL': 0})
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+    return app
+
+def cold_start(database_url, runs):
+    """Timings of `runs` fresh interpreters, each importing wsgi and serving one request."""
+    env = {**os.environ, 'DATABASE_URL': database_url, 'STATUS_SWEEP_INTERVAL': '0'}
+    samples = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        output = subprocess.run([sys.executable, '-c', COLD_START], cwd=BACKEND, env=env,
+                                capture_output=True, text=True, check=True).stdout
+        sample = json.loads(output.strip().splitlines()[-1])
+        assert sample.pop('status') == 200
+        sample['process_ms'] = (time.perf_counter() - started) * 1000
+        samples.append(sample)
+    return samples
+
+def fork_start(app, runs):
+    """Milliseconds from fork until a worker forked from the preloaded `app` served its first request."""
+    from models import db
+    # Warm up the parent like a preloading master would be
+    with app.test_client() as client:
+        assert client.get('/api/doctors').status_code == 200
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose()
+
+    samples = []
+    for _ in range(runs):
+        read_end, write_end = os.pipe()
+        started = time.perf_counter()
+        pid = os.fork()
+        if pid == 0:
+            os.close(read_end)
+            with app.test_client() as client:
+                client.get('/api/doctors')
+            os.write(write_end, str(time.perf_counter() - started).encode('ascii'))
+            os._exit(0)
+        os.close(write_end)
+        with os.fdopen(read_end) as pipe:
+            samples.append(float(pipe.read()) * 1000)
+        os.waitpid(pid, 0)
+    return samples
+
+def summary(values):
+    return {'median': statistics.median(values), 'min': min(values), 'max': max(values)}
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=10, help='Samples of each measurement')
+    parser.add_argument('--output', help='Also write the results to this JSON file')
+    args = parser.parse_args()
+
+    db_file = tempfile.NamedTemporaryFile(suffix='.db', delete=False)
+    database_url = f'sqlite:///{db_file.name}'
+    try:
+        app = setup_database(database_url)
+        cold = cold_start(database_url, args.runs)
+        report = {key: summary([sample[key] for sample in cold]) for key in ('import_ms', 'first_request_ms', 'total_ms', 'process_ms')}
+        report['modules'] = cold[0]['modules']
+        if hasattr(os, 'fork'):
+            report['fork_ms'] = summary(fork_start(app, args.runs))
+
+        for key, value in report.items():
+            if isinstance(value, dict):
+                print(f"{key:>18}: median {value['median']:8.1f}, min {value['min']:8.1f}, max {value['max']:8.1f}")
+            else:
+                print(f"{key:>18}: {value}")
+        if args.output:
+            with open(args.output, 'w') as f:
+                json.dump(report, f, indent=2)
+    finally:
+        os.unlink(db_file.name)
@@ -0,0 +1,20 @@
+# benchmarks/datasets.py
+"""Synthetic datasets for the benchmark suite."""
+from models import db
+from seed import seed_synthetic, SYNTHETIC_DOMAIN, SYNTHETIC_PASSWORD
+
+# Named dataset sizes, pick one with --scale or override individual counts
+SCALES = {
+    'small': {'doctors': 100, 'patients': 1000, 'appointments': 50000},
+    'medium': {'doctors': 500, 'patients': 20000, 'appointments': 1000000},
+    'large': {'doctors': 1000, 'patients': 100000, 'appointments': 5000000}
+}
+
+BENCH_DOMAIN = SYNTHETIC_DOMAIN
+BENCH_PASSWORD = SYNTHETIC_PASSWORD
+
+def build_dataset(doctors, patients, appointments, seed=0, now=None):
+    """Drop and recreate every table, then fill it with the seeder's synthetic rows."""
+    db.drop_all()
+    db.create_all()
+    seed_synthetic(patients, doctors, appointments, seed=seed, now=now)
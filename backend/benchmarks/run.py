@@ -0,0 +1,224 @@
+# benchmarks/run.py
+"""Benchmark suite for the API hot paths.
+
+Builds a synthetic dataset, drives each scenario through the Flask test
+client and writes p50/p99 latency and throughput as JSON, so runs can be
+compared over time. Usage:
+
+    python benchmarks/run.py --scale small
+    python benchmarks/run.py --doctors 1000 --patients 100000 --appointments 5000000
+    python benchmarks/run.py --compare benchmarks/results/<earlier run>.json
+
+The dataset goes into a throwaway SQLite file unless --database-url is given.
+Every table in that database is dropped.
+"""
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return None
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * fraction))]
+
+class Scenarios:
+    """Request factories for each benchmarked endpoint."""
+
+    def __init__(self, app, doctors, patients, seed=0):
+        from flask_jwt_extended import create_access_token
+        from benchmarks.datasets import BENCH_DOMAIN, BENCH_PASSWORD
+
+        self.doctors = doctors
+        self.patients = patients
+        self.domain = BENCH_DOMAIN
+        self.password = BENCH_PASSWORD
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.booking_slot = 0
+        # Bookings go far in the future so they never clash with the dataset
+        self.booking_start = datetime.now().replace(second=0, microsecond=0) + timedelta(days=365 * 50)
+        with app.app_context():
+            self.tokens = {
+                patient_id: create_access_token(identity=str(patient_id), expires_delta=timedelta(hours=24))
+                for patient_id in self.rng.sample(range(1, patients + 1), min(patients, 100))
+            }
+
+    def _headers(self):
+        token = self.tokens[self.rng.choice(list(self.tokens))]
+        return {'Authorization': f'Bearer {token}'}
+
+    def login(self, client):
+        patient_id = self.rng.randint(1, self.patients)
+        return client.post('/api/patients/login', json={
+            'email': f'patient{patient_id}@{self.domain}',
+            'password': self.password
+        })
+
+    def profile(self, client):
+        return client.get('/api/patients/profile', headers=self._headers())
+
+    def booking(self, client):
+        with self.lock:
+            self.booking_slot += 1
+            appointment_time = self.booking_start + timedelta(minutes=30 * self.booking_slot)
+        return client.post('/api/appointments/create', headers=self._headers(), json={
+            'doctor_id': self.rng.randint(1, self.doctors),
+            'appointment_time': appointment_time.strftime("%Y-%m-%d %H:%M")
+        })
+
+    def doctor_schedule(self, client):
+        return client.get(f'/api/doctors/{self.rng.randint(1, self.doctors)}/appointments', headers=self._headers())
+
+    def appointment_listing(self, client):
+        return client.get('/api/appointments', headers=self._headers())
+
+SCENARIOS = ('login', 'profile', 'booking', 'doctor_schedule', 'appointment_listing')
+
+def run_scenario(app, scenario, requests, concurrency=1):
+    """Issue `requests` calls of one scenario and summarise their latency."""
+    latencies = []
+    errors = 0
+    counter = iter(range(requests))
+    lock = threading.Lock()
+
+    def worker():
+        nonlocal errors
+        client = app.test_client()
+        while True:
+            with lock:
+                if next(counter, None) is None:
+                    return
+            started = time.perf_counter()
+            response = scenario(client)
+            elapsed = time.perf_counter() - started
+            with lock:
+                latencies.append(elapsed)
+                if response.status_code >= 400:
+                    errors += 1
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        'requests': len(latencies),
+        'errors': errors,
+        'p50_ms': round(percentile(latencies, 0.50) * 1000, 3),
+        'p99_ms': round(percentile(latencies, 0.99) * 1000, 3),
+        'mean_ms': round(sum(latencies) / len(latencies) * 1000, 3),
+        'throughput_rps': round(len(latencies) / wall, 1)
+    }
+
+def run_suite(app, doctors, patients, names=SCENARIOS, requests=200, concurrency=1, seed=0):
+    scenarios = Scenarios(app, doctors, patients, seed=seed)
+    return {name: run_scenario(app, getattr(scenarios, name), requests, concurrency) for name in names}
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=BACKEND_DIR, capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        return None
+
+def compare(previous, current):
+    print(f"{'scenario':<22}{'p50 ms':>18}{'p99 ms':>18}{'req/s':>18}")
+    for name, result in current['results'].items():
+        before = previous['results'].get(name)
+        cells = []
+        for key in ('p50_ms', 'p99_ms', 'throughput_rps'):
+            if before:
+                change = (result[key] - before[key]) / before[key] * 100 if before[key] else 0
+                cells.append(f"{result[key]:>9} ({change:+5.1f}%)")
+            else:
+                cells.append(f"{result[key]:>18}")
+        print(f"{name:<22}" + ''.join(cells))
+
+def main():
+    from benchmarks.datasets import SCALES
+
+    parser = argparse.ArgumentParser(description='Benchmark the API hot paths.')
+    parser.add_argument('--scale', choices=sorted(SCALES), default='small')
+    parser.add_argument('--doctors', type=int)
+    parser.add_argument('--patients', type=int)
+    parser.add_argument('--appointments', type=int)
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS), help='Comma separated subset of ' + ', '.join(SCENARIOS))
+    parser.add_argument('--requests', type=int, default=200, help='Requests per scenario')
+    parser.add_argument('--concurrency', type=int, default=1, help='Client threads per scenario')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--database-url', help='Database to build the dataset in, all its tables are dropped')
+    parser.add_argument('--output', help='Results file, defaults to benchmarks/results/<timestamp>.json')
+    parser.add_argument('--compare', help='Earlier results file to compare against')
+    args = parser.parse_args()
+
+    sizes = dict(SCALES[args.scale])
+    for key in sizes:
+        if getattr(args, key) is not None:
+            sizes[key] = getattr(args, key)
+    names = [name.strip() for name in args.scenarios.split(',') if name.strip()]
+    unknown = set(names) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+
+    db_file = None
+    if not args.database_url:
+        db_file = tempfile.NamedTemporaryFile(suffix='.db', delete=False)
+        args.database_url = f'sqlite:///{db_file.name}'
+    os.environ['DATABASE_URL'] = args.database_url
+
+    from app import create_app
+    from benchmarks.datasets import build_dataset
+    from hashing import password_hasher
+
+    app = create_app({'MIGRATE_COMMANDS': False})
+    try:
+        with app.app_context():
+            started = time.perf_counter()
+            build_dataset(seed=args.seed, **sizes)
+            print(f"Built dataset {sizes} in {time.perf_counter() - started:.1f}s")
+
+        results = run_suite(app, sizes['doctors'], sizes['patients'], names, args.requests, args.concurrency, args.seed)
+        report = {
+            'timestamp': datetime.now(timezone.utc).isoformat(),
+            'git_commit': git_commit(),
+            'database': app.config['SQLALCHEMY_DATABASE_URI'].split(':', 1)[0],
+            'dataset': sizes,
+            'requests': args.requests,
+            'concurrency': args.concurrency,
+            'results': results
+        }
+    finally:
+        password_hasher.shutdown()
+        if db_file:
+            os.unlink(db_file.name)
+
+    output = args.output or os.path.join(BACKEND_DIR, 'benchmarks', 'results',
+                                         datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%SZ') + '.json')
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+
+    for name, result in results.items():
+        print(f"{name:<22} p50 {result['p50_ms']:>9} ms  p99 {result['p99_ms']:>9} ms  "
+              f"{result['throughput_rps']:>8} req/s  errors {result['errors']}")
+    print(f"Results written to {output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare(json.load(f), report)
+
+if __name__ == '__main__':
+    main()
@@ -37,6 +37,6 @@ flask db upgrade
 echo "Seeding the database..."
 python seed.py
 
-# Start the Flask application
+# Start the Flask application under gunicorn, SERVING_MODE=async serves on gevent greenlets (see gunicorn.conf.py)
 echo "Starting Flask application..."
-exec flask run --host=0.0.0.0 --port=5000 
\ No newline at end of file
+exec gunicorn -c gunicorn.conf.py
\ No newline at end of file
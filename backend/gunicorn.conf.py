@@ -0,0 +1,60 @@
+# gunicorn.conf.py
+import os
+
+# Async mode must patch the process before the app is preloaded, see async_mode.py
+ASYNC_MODE = os.getenv('SERVING_MODE') == 'async'
+if ASYNC_MODE:
+    from async_mode import enable_async_mode
+    enable_async_mode()
+
+def available_cpus():
+    """CPUs this process may actually use, honouring affinity and the cgroup CPU quota."""
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+    # Containers often see every host CPU but are throttled to a quota
+    try:
+        with open('/sys/fs/cgroup/cpu.max') as f:
+            quota, period = f.read().split()
+        if quota != 'max':
+            cpus = min(cpus, max(1, -(-int(quota) // int(period))))
+    except (OSError, ValueError):
+        pass
+    return cpus
+
+def default_workers(cpus, async_mode=False):
+    # A gevent worker keeps one CPU busy on its own; sync workers block on the database, so run 2n + 1
+    return cpus if async_mode else 2 * cpus + 1
+
+wsgi_app = 'wsgi:app'
+bind = f"{os.getenv('HOST', '0.0.0.0')}:{os.getenv('PORT', '5000')}"
+# WEB_CONCURRENCY overrides the worker count sized from the available CPUs
+workers = int(os.getenv('WEB_CONCURRENCY', '0')) or default_workers(available_cpus(), ASYNC_MODE)
+# Each worker would keep its own schedule cache, which the other workers' writes don't invalidate
+if workers > 1 and os.getenv('SCHEDULE_CACHE_BACKEND') == 'local':
+    raise RuntimeError("SCHEDULE_CACHE_BACKEND=local is only exact with one worker, use redis or set WEB_CONCURRENCY=1")
+if ASYNC_MODE:
+    worker_class = 'gevent'
+    worker_connections = int(os.getenv('ASYNC_MAX_CONNECTIONS', '5000'))
+else:
+    worker_class = 'gthread'
+    threads = int(os.getenv('GUNICORN_THREADS', '4'))
+# Import the app once in the master, workers fork with it already loaded
+preload_app = os.getenv('GUNICORN_PRELOAD', 'true').lower() == 'true'
+timeout = int(os.getenv('GUNICORN_TIMEOUT', '30'))
+graceful_timeout = int(os.getenv('GUNICORN_GRACEFUL_TIMEOUT', '30'))
+# Recycle workers now and then, with jitter so they don't all restart at once
+max_requests = int(os.getenv('GUNICORN_MAX_REQUESTS', '0'))
+max_requests_jitter = max_requests // 10
+accesslog = '-'
+
+def post_fork(server, worker):
+    # Connections opened in the master (a preload or the sweeper) must not be shared with workers
+    if not preload_app:
+        return
+    from models import db
+    from wsgi import app
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose(close=False)
@@ -0,0 +1,98 @@
+# hashing.py
+import os
+import threading
+from flask import current_app
+from flask_bcrypt import Bcrypt
+from async_mode import async_mode_enabled
+
+# Initialize bcrypt Security
+bcrypt = Bcrypt()
+
+class HashingBusy(Exception):
+    """Raised when too many password hash operations are already pending."""
+
+class PasswordHasher:
+    """Caps how many bcrypt hashes run and wait at once.
+
+    In the default threaded mode the hash runs on the request thread itself:
+    bcrypt releases the GIL, so handing it to another thread would only add
+    a switch. What this buys is a concurrency cap: at most
+    PASSWORD_HASH_WORKERS hashes run at once, at most
+    PASSWORD_HASH_MAX_PENDING run or wait, and callers that can't get a slot
+    within PASSWORD_HASH_TIMEOUT seconds get HashingBusy, so a login burst
+    sheds load (503) instead of tying up every worker. In async mode the
+    hashes run on a pool of native threads so they never block the event
+    loop. Setting PASSWORD_HASH_WORKERS to 0 removes the running cap (and the
+    pool). Limits follow the current app's config and are rebuilt when it
+    changes.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._settings = None
+        self._executor = None
+        self._running = None
+        self._slots = None
+
+    def _pool(self):
+        config = current_app.config
+        workers = config['PASSWORD_HASH_WORKERS']
+        if workers is None:
+            workers = os.cpu_count() or 1
+        settings = (workers, config['PASSWORD_HASH_MAX_PENDING'], async_mode_enabled())
+        with self._lock:
+            if self._settings != settings:
+                self._shutdown()
+                if workers and settings[2]:
+                    # Patched threads are greenlets, bcrypt needs real OS threads to not block the loop
+                    from gevent.threadpool import ThreadPoolExecutor as NativeThreadPoolExecutor
+                    self._executor = NativeThreadPoolExecutor(max_workers=workers)
+                elif workers:
+                    self._running = threading.BoundedSemaphore(workers)
+                self._slots = threading.BoundedSemaphore(settings[1])
+                self._settings = settings
+            return self._executor, self._running, self._slots
+
+    def _shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown()
+        self._settings = None
+        self._executor = None
+        self._running = None
+        self._slots = None
+
+    def shutdown(self):
+        with self._lock:
+            self._shutdown()
+
+    def _run(self, fn, *args):
+        executor, running, slots = self._pool()
+        if not slots.acquire(timeout=current_app.config['PASSWORD_HASH_TIMEOUT']):
+            raise HashingBusy("Too many password hash operations in progress")
+        try:
+            if executor is not None:
+                return executor.submit(fn, *args).result()
+            if running is None:
+                return fn(*args)
+            with running:
+                return fn(*args)
+        finally:
+            slots.release()
+
+    def hash(self, password):
+        """Hash a password with the configured bcrypt cost."""
+        rounds = current_app.config['BCRYPT_LOG_ROUNDS']
+        return self._run(bcrypt.generate_password_hash, password, rounds).decode('utf-8')
+
+    def check(self, password_hash, password):
+        return self._run(bcrypt.check_password_hash, password_hash, password)
+
+    def needs_rehash(self, password_hash):
+        """True if the hash was made with a different cost than the configured one."""
+        try:
+            rounds = int(password_hash.split('$')[2])
+        except (AttributeError, IndexError, ValueError):
+            return True
+        return rounds != current_app.config['BCRYPT_LOG_ROUNDS']
+
+password_hasher = PasswordHasher()
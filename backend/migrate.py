@@ -1,7 +1,8 @@
-from app import app, db
-from flask_migrate import Migrate, upgrade
+from app import create_app
+from models import db
+from flask_migrate import upgrade
 
-migrate = Migrate(app, db)
+app = create_app({'MIGRATE_COMMANDS': True})
 
 if __name__ == '__main__':
     with app.app_context():
@@ -0,0 +1,59 @@
+"""Add recurring appointment series
+
+Revision ID: 5d3f8a2c9e61
+Revises: e4a9c0d7b215
+Create Date: 2026-10-18 18:12:44.301927
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5d3f8a2c9e61'
+down_revision = 'e4a9c0d7b215'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('appointment_series',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('appointment_id', sa.Integer(), nullable=False),
+    sa.Column('doctor_id', sa.Integer(), nullable=False),
+    sa.Column('patient_id', sa.Integer(), nullable=False),
+    sa.Column('starts_at', sa.DateTime(), nullable=False),
+    sa.Column('interval_days', sa.Integer(), nullable=False),
+    sa.Column('occurrences', sa.Integer(), nullable=False),
+    sa.Column('span_start', sa.DateTime(), nullable=False),
+    sa.Column('span_end', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['appointment_id'], ['appointment.id'], ),
+    sa.ForeignKeyConstraint(['doctor_id'], ['doctor.id'], ),
+    sa.ForeignKeyConstraint(['patient_id'], ['patient.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('appointment_id')
+    )
+    with op.batch_alter_table('appointment_series', schema=None) as batch_op:
+        batch_op.create_index('ix_appointment_series_doctor_span', ['doctor_id', 'span_start', 'span_end'], unique=False)
+        batch_op.create_index('ix_appointment_series_patient_span', ['patient_id', 'span_start', 'span_end'], unique=False)
+
+    op.create_table('appointment_series_exception',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('series_id', sa.Integer(), nullable=False),
+    sa.Column('original_time', sa.DateTime(), nullable=False),
+    sa.Column('appointment_time', sa.DateTime(), nullable=False),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('notes', sa.String(length=500), nullable=True),
+    sa.ForeignKeyConstraint(['series_id'], ['appointment_series.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('series_id', 'original_time', name='uq_series_exception_occurrence')
+    )
+
+
+def downgrade():
+    op.drop_table('appointment_series_exception')
+    with op.batch_alter_table('appointment_series', schema=None) as batch_op:
+        batch_op.drop_index('ix_appointment_series_patient_span')
+        batch_op.drop_index('ix_appointment_series_doctor_span')
+
+    op.drop_table('appointment_series')
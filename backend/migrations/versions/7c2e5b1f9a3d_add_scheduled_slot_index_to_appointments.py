@@ -0,0 +1,45 @@
+"""Add unique scheduled slot index to appointments
+
+Revision ID: 7c2e5b1f9a3d
+Revises: 4ff1a13c4768
+Create Date: 2026-10-18 09:12:41.203518
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7c2e5b1f9a3d'
+down_revision = '4ff1a13c4768'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Double bookings made before the index existed would fail its creation:
+    # keep the earliest booking of each slot and cancel the later ones
+    op.execute(sa.text("""
+        UPDATE appointment SET status = 'canceled'
+        WHERE status = 'scheduled'
+          AND id > (SELECT MIN(earlier.id) FROM appointment AS earlier
+                    WHERE earlier.doctor_id = appointment.doctor_id
+                      AND earlier.appointment_time = appointment.appointment_time
+                      AND earlier.status = 'scheduled')
+    """))
+
+    # Partial unique index: covers the slot lookup and lets the database reject
+    # double bookings. Only scheduled rows take part in the constraint.
+    with op.batch_alter_table('appointment', schema=None) as batch_op:
+        batch_op.create_index(
+            'uq_appointment_doctor_time_scheduled',
+            ['doctor_id', 'appointment_time'],
+            unique=True,
+            postgresql_where=sa.text("status = 'scheduled'"),
+            sqlite_where=sa.text("status = 'scheduled'")
+        )
+
+
+def downgrade():
+    with op.batch_alter_table('appointment', schema=None) as batch_op:
+        batch_op.drop_index('uq_appointment_doctor_time_scheduled')
@@ -0,0 +1,50 @@
+"""Add waitlist
+
+Revision ID: a3c61e9f4b07
+Revises: 5d3f8a2c9e61
+Create Date: 2026-10-18 19:05:31.642118
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a3c61e9f4b07'
+down_revision = '5d3f8a2c9e61'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('waitlist_entry',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('patient_id', sa.Integer(), nullable=False),
+    sa.Column('doctor_id', sa.Integer(), nullable=True),
+    sa.Column('specialization', sa.String(length=100), nullable=True),
+    sa.Column('window_start', sa.DateTime(), nullable=False),
+    sa.Column('window_end', sa.DateTime(), nullable=False),
+    sa.Column('priority', sa.Integer(), nullable=False),
+    sa.Column('auto_book', sa.Boolean(), nullable=False),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('offered_doctor_id', sa.Integer(), nullable=True),
+    sa.Column('offered_time', sa.DateTime(), nullable=True),
+    sa.Column('appointment_id', sa.Integer(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['appointment_id'], ['appointment.id'], ),
+    sa.ForeignKeyConstraint(['doctor_id'], ['doctor.id'], ),
+    sa.ForeignKeyConstraint(['offered_doctor_id'], ['doctor.id'], ),
+    sa.ForeignKeyConstraint(['patient_id'], ['patient.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('waitlist_entry', schema=None) as batch_op:
+        batch_op.create_index('ix_waitlist_doctor_status_window', ['doctor_id', 'status', 'window_end'], unique=False)
+        batch_op.create_index('ix_waitlist_specialization_status_window', ['specialization', 'status', 'window_end'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('waitlist_entry', schema=None) as batch_op:
+        batch_op.drop_index('ix_waitlist_specialization_status_window')
+        batch_op.drop_index('ix_waitlist_doctor_status_window')
+
+    op.drop_table('waitlist_entry')
@@ -0,0 +1,38 @@
+"""Add utilization rollup
+
+Revision ID: b5e8d2a41c93
+Revises: f19b5d3e7a82
+Create Date: 2026-10-18 22:14:37.508213
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b5e8d2a41c93'
+down_revision = 'f19b5d3e7a82'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('utilization_rollup',
+    sa.Column('doctor_id', sa.Integer(), nullable=False),
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('appointments', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['doctor_id'], ['doctor.id'], ),
+    sa.PrimaryKeyConstraint('doctor_id', 'day', 'status')
+    )
+    with op.batch_alter_table('utilization_rollup', schema=None) as batch_op:
+        batch_op.create_index('ix_utilization_rollup_day', ['day', 'doctor_id'], unique=False)
+
+    # Existing appointments are counted by running backfill_utilization.py once after upgrading
+
+
+def downgrade():
+    with op.batch_alter_table('utilization_rollup', schema=None) as batch_op:
+        batch_op.drop_index('ix_utilization_rollup_day')
+
+    op.drop_table('utilization_rollup')
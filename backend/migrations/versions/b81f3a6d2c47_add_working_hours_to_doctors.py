@@ -0,0 +1,32 @@
+"""Add working hours to doctors
+
+Revision ID: b81f3a6d2c47
+Revises: 7c2e5b1f9a3d
+Create Date: 2026-10-18 11:02:17.884310
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b81f3a6d2c47'
+down_revision = '7c2e5b1f9a3d'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('doctor', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('work_start', sa.Time(), nullable=False, server_default='09:00:00'))
+        batch_op.add_column(sa.Column('work_end', sa.Time(), nullable=False, server_default='17:00:00'))
+        batch_op.add_column(sa.Column('slot_minutes', sa.Integer(), nullable=False, server_default='30'))
+        batch_op.add_column(sa.Column('work_days', sa.String(length=20), nullable=False, server_default='0,1,2,3,4'))
+
+
+def downgrade():
+    with op.batch_alter_table('doctor', schema=None) as batch_op:
+        batch_op.drop_column('work_days')
+        batch_op.drop_column('slot_minutes')
+        batch_op.drop_column('work_end')
+        batch_op.drop_column('work_start')
@@ -0,0 +1,26 @@
+"""Add version to appointments
+
+Revision ID: c7e2b94d1f38
+Revises: a3c61e9f4b07
+Create Date: 2026-10-18 19:48:02.115734
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c7e2b94d1f38'
+down_revision = 'a3c61e9f4b07'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('appointment', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('version', sa.Integer(), server_default='1', nullable=False))
+
+
+def downgrade():
+    with op.batch_alter_table('appointment', schema=None) as batch_op:
+        batch_op.drop_column('version')
@@ -0,0 +1,78 @@
+"""Add appointment change sequence and tombstones
+
+Revision ID: d4a7f3c18e59
+Revises: b5e8d2a41c93
+Create Date: 2026-10-18 23:02:48.913405
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd4a7f3c18e59'
+down_revision = 'b5e8d2a41c93'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    postgres = op.get_bind().dialect.name == 'postgresql'
+    if postgres:
+        op.execute('CREATE SEQUENCE appointment_change_seq')
+
+    with op.batch_alter_table('appointment', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('change_seq', sa.BigInteger(), nullable=True))
+        batch_op.add_column(sa.Column('updated_at', sa.DateTime(), nullable=True))
+
+    # Existing rows enter the sequence in id order
+    if postgres:
+        op.execute("UPDATE appointment SET change_seq = nextval('appointment_change_seq'), updated_at = now() "
+                   "FROM (SELECT id FROM appointment ORDER BY id) AS ordered WHERE appointment.id = ordered.id")
+    else:
+        op.execute("UPDATE appointment SET change_seq = id, updated_at = CURRENT_TIMESTAMP")
+
+    with op.batch_alter_table('appointment', schema=None) as batch_op:
+        batch_op.alter_column('change_seq', existing_type=sa.BigInteger(), nullable=False)
+        batch_op.alter_column('updated_at', existing_type=sa.DateTime(), nullable=False)
+        batch_op.create_index('ix_appointment_doctor_change', ['doctor_id', 'change_seq'], unique=False)
+        batch_op.create_index('ix_appointment_patient_change', ['patient_id', 'change_seq'], unique=False)
+        batch_op.create_index('ix_appointment_updated_at', ['updated_at'], unique=False)
+        if not postgres:
+            batch_op.create_index('ix_appointment_change_seq', ['change_seq'], unique=False)
+
+    op.create_table('appointment_tombstone',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('appointment_id', sa.Integer(), nullable=False),
+    sa.Column('doctor_id', sa.Integer(), nullable=False),
+    sa.Column('patient_id', sa.Integer(), nullable=False),
+    sa.Column('change_seq', sa.BigInteger(), nullable=False),
+    sa.Column('deleted_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('appointment_tombstone', schema=None) as batch_op:
+        batch_op.create_index('ix_appointment_tombstone_doctor_change', ['doctor_id', 'change_seq'], unique=False)
+        batch_op.create_index('ix_appointment_tombstone_patient_change', ['patient_id', 'change_seq'], unique=False)
+        batch_op.create_index('ix_appointment_tombstone_deleted_at', ['deleted_at'], unique=False)
+
+
+def downgrade():
+    postgres = op.get_bind().dialect.name == 'postgresql'
+    with op.batch_alter_table('appointment_tombstone', schema=None) as batch_op:
+        batch_op.drop_index('ix_appointment_tombstone_deleted_at')
+        batch_op.drop_index('ix_appointment_tombstone_patient_change')
+        batch_op.drop_index('ix_appointment_tombstone_doctor_change')
+
+    op.drop_table('appointment_tombstone')
+
+    with op.batch_alter_table('appointment', schema=None) as batch_op:
+        if not postgres:
+            batch_op.drop_index('ix_appointment_change_seq')
+        batch_op.drop_index('ix_appointment_updated_at')
+        batch_op.drop_index('ix_appointment_patient_change')
+        batch_op.drop_index('ix_appointment_doctor_change')
+        batch_op.drop_column('updated_at')
+        batch_op.drop_column('change_seq')
+
+    if postgres:
+        op.execute('DROP SEQUENCE appointment_change_seq')
@@ -0,0 +1,27 @@
+"""Add schedule range indexes to appointments
+
+Revision ID: e4a9c0d7b215
+Revises: b81f3a6d2c47
+Create Date: 2026-10-18 15:40:08.517262
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'e4a9c0d7b215'
+down_revision = 'b81f3a6d2c47'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('appointment', schema=None) as batch_op:
+        batch_op.create_index('ix_appointment_doctor_time', ['doctor_id', 'appointment_time'], unique=False)
+        batch_op.create_index('ix_appointment_patient_time', ['patient_id', 'appointment_time'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('appointment', schema=None) as batch_op:
+        batch_op.drop_index('ix_appointment_patient_time')
+        batch_op.drop_index('ix_appointment_doctor_time')
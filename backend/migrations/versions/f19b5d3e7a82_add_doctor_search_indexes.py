@@ -0,0 +1,32 @@
+"""Add doctor search indexes
+
+Revision ID: f19b5d3e7a82
+Revises: c7e2b94d1f38
+Create Date: 2026-10-18 20:31:57.406583
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f19b5d3e7a82'
+down_revision = 'c7e2b94d1f38'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Trigram indexes only exist on Postgres, SQLite searches an in-memory index
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    op.create_index('ix_doctor_name_trgm', 'doctor', [sa.text('lower(name) gin_trgm_ops')], unique=False, postgresql_using='gin')
+    op.create_index('ix_doctor_specialization_trgm', 'doctor', [sa.text('lower(specialization) gin_trgm_ops')], unique=False, postgresql_using='gin')
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    op.drop_index('ix_doctor_specialization_trgm', table_name='doctor')
+    op.drop_index('ix_doctor_name_trgm', table_name='doctor')
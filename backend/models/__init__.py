@@ -2,4 +2,8 @@
 from .person import Person, db
 from .patient import Patient
 from .doctor import Doctor
-from .appointments import Appointment
\ No newline at end of file
+from .appointments import Appointment, VersionConflict, commit_versioned, lock_schedules, next_change_seq, change_sequence
+from .series import AppointmentSeries, SeriesException, Occurrence
+from .waitlist import WaitlistEntry
+from .utilization import UtilizationRollup, series_counts, appointment_key
+from .tombstone import AppointmentTombstone
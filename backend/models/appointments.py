@@ -1,15 +1,165 @@
 # models/appointment.py
+from collections import Counter
+from datetime import datetime
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.orm.exc import StaleDataError
+from sqlalchemy.sql.expression import FunctionElement
 from .person import db
 
+# Source of change sequence numbers on Postgres, see next_change_seq
+change_sequence = db.Sequence('appointment_change_seq', metadata=db.metadata)
+
+class next_change_seq(FunctionElement):
+    """Next value of the appointment change sequence, shared by appointments and their tombstones.
+
+    Postgres draws it from a sequence. Databases without sequences (SQLite)
+    take one more than the highest value in use, which their single writer
+    lock keeps unique.
+    """
+    type = db.BigInteger()
+    inherit_cache = True
+
+@compiles(next_change_seq)
+def _next_change_seq(element, compiler, **kw):
+    return ('(SELECT max(coalesce((SELECT max(change_seq) FROM appointment), 0), '
+            'coalesce((SELECT max(change_seq) FROM appointment_tombstone), 0)) + 1)')
+
+@compiles(next_change_seq, 'postgresql')
+def _next_change_seq_postgresql(element, compiler, **kw):
+    return f"nextval('{change_sequence.name}')"
+
+class VersionConflict(Exception):
+    """The appointment changed since the version the caller last read."""
+
+    def __init__(self, current_version=None):
+        super().__init__(f"Appointment is at version {current_version}")
+        self.current_version = current_version
+
+def commit_versioned():
+    """Commit the session, turning a lost compare-and-swap on a versioned row
+    into VersionConflict."""
+    try:
+        db.session.commit()
+    except StaleDataError:
+        db.session.rollback()
+        raise VersionConflict()
+
+# Advisory lock namespace of the per-doctor schedule locks, see lock_schedules
+SCHEDULE_LOCK_CLASS = 1
+
+def lock_schedules(doctor_ids):
+    """Hold each doctor's schedule lock until the current transaction ends.
+
+    Series occurrences aren't rows, so the unique slot index can't stop a
+    series and another booking from claiming the same time concurrently.
+    Writes that check slots take this lock first, which makes the check and
+    the write atomic per doctor. Postgres takes a transaction-level advisory
+    lock per doctor, in id order so that multi-doctor batches can't deadlock.
+    SQLite, used for development and tests, has no advisory locks and gets none.
+    """
+    if db.session.get_bind().dialect.name != 'postgresql':
+        return
+    for doctor_id in sorted(set(doctor_ids)):
+        db.session.execute(db.select(db.func.pg_advisory_xact_lock(SCHEDULE_LOCK_CLASS, doctor_id)))
+
 class Appointment(db.Model):
     __tablename__ = 'appointment'
+    __table_args__ = (
+        # Only one scheduled appointment per doctor per time slot. Partial so that
+        # canceled/completed rows don't block re-booking the same slot.
+        db.Index(
+            'uq_appointment_doctor_time_scheduled',
+            'doctor_id', 'appointment_time',
+            unique=True,
+            postgresql_where=db.text("status = 'scheduled'"),
+            sqlite_where=db.text("status = 'scheduled'")
+        ),
+        # Date range lookups on a doctor's or a patient's schedule
+        db.Index('ix_appointment_doctor_time', 'doctor_id', 'appointment_time'),
+        db.Index('ix_appointment_patient_time', 'patient_id', 'appointment_time'),
+        # Changes since a sync token, per participant, and the rows written in a time window
+        db.Index('ix_appointment_doctor_change', 'doctor_id', 'change_seq'),
+        db.Index('ix_appointment_patient_change', 'patient_id', 'change_seq'),
+        db.Index('ix_appointment_updated_at', 'updated_at'),
+        # Lets next_change_seq find the highest value without a table scan
+        db.Index('ix_appointment_change_seq', 'change_seq').ddl_if(dialect='sqlite'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     doctor_id = db.Column(db.Integer, db.ForeignKey('doctor.id'), nullable=False)
     patient_id = db.Column(db.Integer, db.ForeignKey('patient.id'), nullable=False)
     appointment_time = db.Column(db.DateTime, nullable=False)
     status = db.Column(db.String(20), default='scheduled')  # e.g., scheduled, canceled, completed
     notes = db.Column(db.String(500))  # Add notes column with max length of 500 characters
+    # Bumped on every update. ORM updates only apply WHERE version matches the one that
+    # was read (compare-and-swap) and raise StaleDataError otherwise
+    version = db.Column(db.Integer, nullable=False, default=1, server_default='1')
+
+    # Every insert and update, bulk ones included, moves the row to the end of the change sequence
+    change_seq = db.Column(db.BigInteger, nullable=False, default=next_change_seq(), onupdate=next_change_seq())
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.now, onupdate=datetime.now)
+
+    __mapper_args__ = {'version_id_col': version}
 
     # Specify foreign keys for the relationships
     doctor = db.relationship('Doctor', foreign_keys=[doctor_id], backref='appointments')
-    patient = db.relationship('Patient', foreign_keys=[patient_id], backref='appointments')
\ No newline at end of file
+    patient = db.relationship('Patient', foreign_keys=[patient_id], backref='appointments')
+
+    def effective_status(self, now=None):
+        """Status as readers should see it: past scheduled appointments count as
+        completed even if the status sweeper hasn't updated the row yet."""
+        now = now or datetime.now()
+        if self.status == 'scheduled' and self.appointment_time < now:
+            return 'completed'
+        return self.status
+
+    def check_version(self, expected_version):
+        """Raise VersionConflict unless the caller's version is current (None skips the check)."""
+        if expected_version is not None and expected_version != self.version:
+            raise VersionConflict(self.version)
+
+    @classmethod
+    def taken_slots(cls, slots):
+        """Return which (doctor_id, appointment_time) pairs already have a
+        scheduled appointment, using a single query."""
+        slots = list(slots)
+        if not slots:
+            return set()
+        rows = db.session.execute(
+            db.select(cls.doctor_id, cls.appointment_time)
+            .where(cls.status == 'scheduled', db.tuple_(cls.doctor_id, cls.appointment_time).in_(slots))
+        )
+        return {(row.doctor_id, row.appointment_time) for row in rows}
+
+    @classmethod
+    def complete_overdue(cls, now=None, batch_size=500):
+        """Mark one batch of past scheduled appointments as completed.
+
+        Issues a single UPDATE for the oldest `batch_size` overdue rows, moves
+        their utilization rollups along in the same transaction and returns
+        the number of rows updated."""
+        from .utilization import UtilizationRollup, appointment_key
+        now = now or datetime.now()
+        overdue_ids = (
+            db.select(cls.id)
+            .where(cls.status == 'scheduled', cls.appointment_time < now)
+            .order_by(cls.appointment_time)
+            .limit(batch_size)
+        )
+        result = db.session.execute(
+            db.update(cls)
+            .where(cls.id.in_(overdue_ids), cls.status == 'scheduled')
+            .values(status='completed', version=cls.version + 1)
+            .returning(cls.doctor_id, cls.appointment_time)
+            # The days touched are known from RETURNING, caches don't need to drop everything
+            .execution_options(synchronize_session=False, records_schedule_days=True)
+        )
+        completed = result.all()
+        deltas = Counter()
+        for doctor_id, appointment_time in completed:
+            deltas[appointment_key(doctor_id, appointment_time, 'scheduled')] -= 1
+            deltas[appointment_key(doctor_id, appointment_time, 'completed')] += 1
+        db.session.info.setdefault('schedule_writes', set()).update(
+            (doctor_id, appointment_time.date()) for doctor_id, appointment_time in completed)
+        UtilizationRollup.apply(db.session.connection(), deltas)
+        db.session.commit()
+        return len(completed)
@@ -1,10 +1,23 @@
 # models/doctor.py
+from datetime import datetime, time, timedelta
+from sqlalchemy import DDL, event
 from .person import Person, db
 from .appointments import Appointment  # Import the Appointment model
 
 class Doctor(Person):
     __tablename__ = 'doctor'
+    __table_args__ = (
+        # Doctor search on Postgres: trigram indexes for substring and fuzzy matches on
+        # name and specialization (pg_trgm), SQLite uses services.doctor_search instead
+        db.Index('ix_doctor_name_trgm', db.text('lower(name) gin_trgm_ops'), postgresql_using='gin').ddl_if(dialect='postgresql'),
+        db.Index('ix_doctor_specialization_trgm', db.text('lower(specialization) gin_trgm_ops'), postgresql_using='gin').ddl_if(dialect='postgresql'),
+    )
     specialization = db.Column(db.String(100))
+    # Working hours, slot length and working weekdays (0 = Monday) used for availability
+    work_start = db.Column(db.Time, nullable=False, default=time(9, 0))
+    work_end = db.Column(db.Time, nullable=False, default=time(17, 0))
+    slot_minutes = db.Column(db.Integer, nullable=False, default=30)
+    work_days = db.Column(db.String(20), nullable=False, default='0,1,2,3,4')
 
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
@@ -14,9 +27,26 @@ class Doctor(Person):
     def get_info(self):
         return f"Doctor Info - Name: {self.name}, Email: {self.email}, Phone: {self.phone}, Specialization: {self.specialization}"
 
+    def appointments_query(self, *filters):
+        """Query for this doctor's appointments, for callers that page or filter."""
+        return Appointment.query.filter(Appointment.doctor_id == self.id, *filters)
+
     def get_appointments(self):
         """Retrieve all appointments for this doctor."""
-        return Appointment.query.filter_by(doctor_id=self.id).all()
+        return self.appointments_query().all()
+
+    def get_slot_times(self, day):
+        """Return the start times of every working slot on the given date."""
+        if str(day.weekday()) not in (self.work_days or '').split(','):
+            return []
+        length = timedelta(minutes=self.slot_minutes)
+        slot = datetime.combine(day, self.work_start)
+        end = datetime.combine(day, self.work_end)
+        slots = []
+        while slot + length <= end:
+            slots.append(slot)
+            slot += length
+        return slots
     
     # Create a doctor using Polymorphism
     @staticmethod
@@ -198,4 +228,7 @@ class Doctor(Person):
                 'phone': '5559900112',
                 'specialization': 'Neurosurgery'
             }
-        ]
\ No newline at end of file
+        ]
+
+# The trigram indexes need the pg_trgm extension
+event.listen(Doctor.__table__, 'before_create', DDL('CREATE EXTENSION IF NOT EXISTS pg_trgm').execute_if(dialect='postgresql'))
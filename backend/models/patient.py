@@ -1,10 +1,7 @@
 # models/patient.py
-from flask_bcrypt import Bcrypt
+from hashing import password_hasher
 from .person import Person, db
-from .appointments import Appointment
-
-# Initialize bcrypt Security
-bcrypt = Bcrypt()
+from .appointments import Appointment, commit_versioned
 
 class Patient(Person):
     __tablename__ = 'patient'
@@ -18,12 +15,16 @@ class Patient(Person):
         return f"Patient Info - Name: {self.name}, Email: {self.email}, Phone: {self.phone}"
 
     def set_password(self, password):
-        # Set the password hash using bcrypt Security
-        self.password_hash = bcrypt.generate_password_hash(password).decode('utf-8')
+        # Set the password hash using bcrypt Security, off the request thread
+        self.password_hash = password_hasher.hash(password)
 
     def check_password(self, password):
         # Check if the password is correct and hashed
-        return bcrypt.check_password_hash(self.password_hash, password)
+        return password_hasher.check(self.password_hash, password)
+
+    def password_needs_rehash(self):
+        # True when the stored hash uses a different bcrypt cost than configured
+        return password_hasher.needs_rehash(self.password_hash)
     
     def update_info(self, name=None, email=None, phone=None):
         if name:
@@ -34,20 +35,23 @@ class Patient(Person):
             self.phone = phone
         db.session.commit()
 
-    def update_appointment(self, appointment_id, new_time):
+    # Both raise VersionConflict when expected_version is stale or another writer commits first
+    def update_appointment(self, appointment_id, new_time, expected_version=None):
         appointment = Appointment.query.get(appointment_id)
         if appointment and appointment.patient_id == self.id:
+            appointment.check_version(expected_version)
             appointment.appointment_time = new_time
             appointment.status = 'scheduled'  # Update status to 'scheduled'
-            db.session.commit()
+            commit_versioned()
             return appointment
         return None
     
-    def cancel_appointment(self, appointment_id):
+    def cancel_appointment(self, appointment_id, expected_version=None):
         appointment = Appointment.query.get(appointment_id)
         if appointment and appointment.patient_id == self.id:
+            appointment.check_version(expected_version)
             appointment.status = 'canceled'  # Update status to 'canceled'
-            db.session.commit()
+            commit_versioned()
             return True
         return False
 
@@ -1,7 +1,8 @@
 # models/person.py
 from flask_sqlalchemy import SQLAlchemy
+from .session import RoutingSession
 
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 
 class Person(db.Model):
     __abstract__ = True
@@ -0,0 +1,138 @@
+# models/series.py
+from collections import namedtuple
+from datetime import timedelta
+from .person import db
+
+# One expanded occurrence: where the rule put it, and where and how it actually happens
+Occurrence = namedtuple('Occurrence', ['original_time', 'appointment_time', 'status', 'notes'])
+
+class AppointmentSeries(db.Model):
+    """Recurrence rule attached to a template appointment.
+
+    The template Appointment row is the first occurrence. Later occurrences are
+    never stored: they are computed from starts_at, interval_days and
+    occurrences for whatever window is being read. Only occurrences that were
+    moved or canceled get a SeriesException row. span_start and span_end
+    cover every occurrence, moved ones included, so the series overlapping a
+    window can be found with an index range scan.
+    """
+    __tablename__ = 'appointment_series'
+    __table_args__ = (
+        db.Index('ix_appointment_series_doctor_span', 'doctor_id', 'span_start', 'span_end'),
+        db.Index('ix_appointment_series_patient_span', 'patient_id', 'span_start', 'span_end'),
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    appointment_id = db.Column(db.Integer, db.ForeignKey('appointment.id'), nullable=False, unique=True)
+    doctor_id = db.Column(db.Integer, db.ForeignKey('doctor.id'), nullable=False)
+    patient_id = db.Column(db.Integer, db.ForeignKey('patient.id'), nullable=False)
+    starts_at = db.Column(db.DateTime, nullable=False)  # Original time of the first occurrence
+    interval_days = db.Column(db.Integer, nullable=False, default=7)
+    occurrences = db.Column(db.Integer, nullable=False)  # Total occurrences, the template included
+    span_start = db.Column(db.DateTime, nullable=False)
+    span_end = db.Column(db.DateTime, nullable=False)
+
+    template = db.relationship('Appointment', backref=db.backref('series', uselist=False))
+    exceptions = db.relationship('SeriesException', backref='series', cascade='all, delete-orphan')
+
+    @property
+    def interval(self):
+        return timedelta(days=self.interval_days)
+
+    def occurrence_index(self, original_time):
+        """Position of an occurrence in the series, or None if the rule never produces that time."""
+        index, remainder = divmod(original_time - self.starts_at, self.interval)
+        if remainder or not 0 <= index < self.occurrences:
+            return None
+        return index
+
+    def update_span(self):
+        times = [self.starts_at, self.starts_at + self.interval * (self.occurrences - 1)]
+        times.extend(exception.appointment_time for exception in self.exceptions)
+        self.span_start, self.span_end = min(times), max(times)
+
+    def expand(self, start, end):
+        """Occurrences after the template whose effective time is in [start, end), by time.
+
+        Only the rule positions inside the window are computed, plus the
+        sparse exceptions, so the cost depends on the window and not on the
+        length of the series.
+        """
+        exceptions = {exception.original_time: exception for exception in self.exceptions}
+        template_notes = self.template.notes if self.template else ''
+        found = [
+            Occurrence(exception.original_time, exception.appointment_time, exception.status,
+                       exception.notes if exception.notes is not None else template_notes)
+            for exception in exceptions.values()
+            if start <= exception.appointment_time < end
+        ]
+
+        # First rule position at or after start, the template itself is not expanded
+        index = max(1, -((self.starts_at - start) // self.interval))
+        while index < self.occurrences:
+            original_time = self.starts_at + self.interval * index
+            if original_time >= end:
+                break
+            if original_time not in exceptions:
+                found.append(Occurrence(original_time, original_time, 'scheduled', template_notes))
+            index += 1
+
+        found.sort(key=lambda occurrence: occurrence.appointment_time)
+        return found
+
+    @classmethod
+    def overlapping(cls, start, end, *filters):
+        """Query for series with at least one occurrence that may fall in [start, end)."""
+        query = cls.query.filter(*filters).options(db.selectinload(cls.exceptions), db.selectinload(cls.template))
+        if start is not None:
+            query = query.filter(cls.span_end >= start)
+        if end is not None:
+            query = query.filter(cls.span_start < end)
+        return query
+
+    @classmethod
+    def booked_times(cls, doctor_id, start, end):
+        """Start times of the doctor's scheduled series occurrences in [start, end)."""
+        return sorted(
+            occurrence.appointment_time
+            for series in cls.overlapping(start, end, cls.doctor_id == doctor_id)
+            for occurrence in series.expand(start, end)
+            if occurrence.status == 'scheduled'
+        )
+
+    @classmethod
+    def taken_slots(cls, slots, exclude=None):
+        """Return which (doctor_id, appointment_time) pairs clash with a scheduled series
+        occurrence, using a single query. `exclude` is a (series_id, original_time)
+        occurrence to ignore, for when that occurrence itself is being moved."""
+        slots = set(slots)
+        if not slots:
+            return set()
+        times = [appointment_time for _, appointment_time in slots]
+        doctor_ids = {doctor_id for doctor_id, _ in slots}
+        series_list = cls.overlapping(min(times), max(times) + timedelta(minutes=1), cls.doctor_id.in_(doctor_ids)).all()
+
+        taken = set()
+        for doctor_id, appointment_time in slots:
+            for series in series_list:
+                if series.doctor_id != doctor_id:
+                    continue
+                if any(
+                    occurrence.status == 'scheduled' and (series.id, occurrence.original_time) != exclude
+                    for occurrence in series.expand(appointment_time, appointment_time + timedelta(minutes=1))
+                ):
+                    taken.add((doctor_id, appointment_time))
+                    break
+        return taken
+
+class SeriesException(db.Model):
+    """A single occurrence of a series that was moved or canceled."""
+    __tablename__ = 'appointment_series_exception'
+    __table_args__ = (
+        db.UniqueConstraint('series_id', 'original_time', name='uq_series_exception_occurrence'),
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    series_id = db.Column(db.Integer, db.ForeignKey('appointment_series.id'), nullable=False)
+    original_time = db.Column(db.DateTime, nullable=False)
+    appointment_time = db.Column(db.DateTime, nullable=False)  # Where the occurrence happens now
+    status = db.Column(db.String(20), nullable=False, default='scheduled')  # scheduled (moved) or canceled
+    notes = db.Column(db.String(500))  # None keeps the template's notes
@@ -0,0 +1,18 @@
+# models/session.py
+from flask import g, has_app_context
+from flask_sqlalchemy.session import Session
+
+class RoutingSession(Session):
+    """Session that sends reads to the 'replica' bind when the request asks for it.
+
+    Routes opt in with services.replica.read_replica, which sets
+    g.use_replica. Flushes always go to the primary, as does everything when
+    no replica bind is configured.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and not self._flushing and has_app_context() and g.get('use_replica'):
+            engine = self._db.engines.get('replica')
+            if engine is not None:
+                return engine
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
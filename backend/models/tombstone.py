@@ -0,0 +1,40 @@
+# models/tombstone.py
+from datetime import datetime
+from sqlalchemy import event
+from .person import db
+from .appointments import Appointment, next_change_seq
+
+class AppointmentTombstone(db.Model):
+    """Marker left by a deleted appointment, so delta sync clients can drop their copy.
+
+    Tombstones share the appointments' change sequence and are kept for
+    CHANGES_RETENTION_DAYS; sync tokens older than that must start over.
+    """
+    __tablename__ = 'appointment_tombstone'
+    __table_args__ = (
+        db.Index('ix_appointment_tombstone_doctor_change', 'doctor_id', 'change_seq'),
+        db.Index('ix_appointment_tombstone_patient_change', 'patient_id', 'change_seq'),
+        db.Index('ix_appointment_tombstone_deleted_at', 'deleted_at'),
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    appointment_id = db.Column(db.Integer, nullable=False)  # No foreign key, the row is gone
+    doctor_id = db.Column(db.Integer, nullable=False)
+    patient_id = db.Column(db.Integer, nullable=False)
+    change_seq = db.Column(db.BigInteger, nullable=False, default=next_change_seq())
+    deleted_at = db.Column(db.DateTime, nullable=False, default=datetime.now)
+
+    @classmethod
+    def purge(cls, before):
+        """Delete the tombstones of deletions older than `before` and return how many went."""
+        result = db.session.execute(db.delete(cls).where(cls.deleted_at < before))
+        db.session.commit()
+        return result.rowcount
+
+# Write the tombstone in the same flush as the delete
+@event.listens_for(Appointment, 'after_delete')
+def _leave_tombstone(mapper, connection, appointment):
+    connection.execute(db.insert(AppointmentTombstone).values(
+        appointment_id=appointment.id,
+        doctor_id=appointment.doctor_id,
+        patient_id=appointment.patient_id
+    ))
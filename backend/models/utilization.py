@@ -0,0 +1,87 @@
+# models/utilization.py
+from collections import Counter
+from datetime import datetime, timedelta
+from sqlalchemy.dialects import postgresql, sqlite
+from .person import db
+from .appointments import Appointment
+from .series import AppointmentSeries
+
+class UtilizationRollup(db.Model):
+    """Number of appointments per doctor, day and stored status.
+
+    Kept up to date in the same transaction as every appointment write (see
+    services/utilization.py), so utilization reports read a few rows per
+    doctor and day instead of the appointment table. Occurrences of
+    recurring series count like the appointments they stand for. Rows are
+    only ever adjusted by deltas; rebuild() recomputes a date range from
+    scratch after bulk loads that bypass the ORM.
+    """
+    __tablename__ = 'utilization_rollup'
+    __table_args__ = (
+        # Reports over every doctor scan a date range
+        db.Index('ix_utilization_rollup_day', 'day', 'doctor_id'),
+    )
+    doctor_id = db.Column(db.Integer, db.ForeignKey('doctor.id'), primary_key=True)
+    day = db.Column(db.Date, primary_key=True)
+    status = db.Column(db.String(20), primary_key=True)
+    appointments = db.Column(db.Integer, nullable=False, default=0)
+
+    @classmethod
+    def apply(cls, connection, deltas):
+        """Add a Counter of (doctor_id, day, status) -> change to the rollups, with one upsert."""
+        rows = [
+            {'doctor_id': doctor_id, 'day': day, 'status': status, 'appointments': delta}
+            for (doctor_id, day, status), delta in deltas.items() if delta
+        ]
+        if not rows:
+            return
+        dialect = postgresql if connection.dialect.name == 'postgresql' else sqlite
+        statement = dialect.insert(cls.__table__)
+        statement = statement.on_conflict_do_update(
+            index_elements=['doctor_id', 'day', 'status'],
+            set_={'appointments': cls.__table__.c.appointments + statement.excluded.appointments}
+        )
+        connection.execute(statement, rows)
+
+    @classmethod
+    def rebuild(cls, start=None, end=None):
+        """Recompute the rollups for days in [start, end) (dates, None for unbounded)
+        from the appointments and series, and commit."""
+        day = db.func.date(Appointment.appointment_time)
+        deleted = db.delete(cls)
+        appointments = (
+            db.select(Appointment.doctor_id, day, Appointment.status, db.func.count())
+            .group_by(Appointment.doctor_id, day, Appointment.status)
+        )
+        window_start = window_end = None
+        if start is not None:
+            window_start = datetime.combine(start, datetime.min.time())
+            deleted = deleted.where(cls.day >= start)
+            appointments = appointments.where(Appointment.appointment_time >= window_start)
+        if end is not None:
+            window_end = datetime.combine(end, datetime.min.time())
+            deleted = deleted.where(cls.day < end)
+            appointments = appointments.where(Appointment.appointment_time < window_end)
+
+        db.session.execute(deleted)
+        db.session.execute(db.insert(cls).from_select(['doctor_id', 'day', 'status', 'appointments'], appointments))
+        occurrences = Counter()
+        for series in AppointmentSeries.overlapping(window_start, window_end):
+            occurrences.update(series_counts(series, window_start, window_end))
+        cls.apply(db.session.connection(), occurrences)
+        db.session.commit()
+
+def appointment_key(doctor_id, appointment_time, status):
+    return (doctor_id, appointment_time.date(), status or 'scheduled')
+
+def series_counts(series, start=None, end=None):
+    """Counter of (doctor_id, day, status) for a series' occurrences in [start, end).
+
+    The template is left out, it is an appointment row and counted as one.
+    """
+    start = start or series.span_start
+    end = end or series.span_end + timedelta(minutes=1)
+    return Counter(
+        appointment_key(series.doctor_id, occurrence.appointment_time, occurrence.status)
+        for occurrence in series.expand(start, end)
+    )
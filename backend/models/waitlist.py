@@ -0,0 +1,27 @@
+# models/waitlist.py
+from datetime import datetime
+from .person import db
+
+class WaitlistEntry(db.Model):
+    """A patient waiting for a freed slot with one doctor, or with any doctor
+    of a specialization, inside a time window."""
+    __tablename__ = 'waitlist_entry'
+    __table_args__ = (
+        # Waiting entries per doctor and per specialization, for loading the matcher's queues
+        db.Index('ix_waitlist_doctor_status_window', 'doctor_id', 'status', 'window_end'),
+        db.Index('ix_waitlist_specialization_status_window', 'specialization', 'status', 'window_end'),
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    patient_id = db.Column(db.Integer, db.ForeignKey('patient.id'), nullable=False)
+    doctor_id = db.Column(db.Integer, db.ForeignKey('doctor.id'))  # None to accept any doctor of the specialization
+    specialization = db.Column(db.String(100))
+    window_start = db.Column(db.DateTime, nullable=False)
+    window_end = db.Column(db.DateTime, nullable=False)
+    priority = db.Column(db.Integer, nullable=False, default=0)  # Higher is matched first
+    auto_book = db.Column(db.Boolean, nullable=False, default=True)  # Book a matched slot, or only offer it
+    status = db.Column(db.String(20), nullable=False, default='waiting')  # waiting, offered, booked, canceled
+    offered_doctor_id = db.Column(db.Integer, db.ForeignKey('doctor.id'))
+    offered_time = db.Column(db.DateTime)
+    appointment_id = db.Column(db.Integer, db.ForeignKey('appointment.id'))
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.now)
+
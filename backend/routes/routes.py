@@ -1,13 +1,33 @@
 # routes.py
-from flask import Blueprint, request, jsonify
-from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identity
+from flask import Blueprint, current_app, request, jsonify, stream_with_context
+from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identity, get_jwt
+import time
 from datetime import datetime, timedelta
-from models import db, Patient, Doctor, Appointment
-from validators import validate_email, validate_password, validate_phone, validate_name, validate_appointment_time, validate_appointment_status
+from sqlalchemy.exc import IntegrityError
+from models import db, Patient, Doctor, Appointment, VersionConflict, commit_versioned, lock_schedules, AppointmentSeries, SeriesException, Occurrence, WaitlistEntry
+from hashing import HashingBusy
+from validators import validate_email, validate_password, validate_phone, validate_name, validate_appointment_time, validate_appointment_status, validate_date, validate_recurrence, validate_waitlist_window, validate_priority
+from services import availability_index, paginate, paginate_rows, page_response, get_current_patient, cached_response, identity_cache, metrics, read_replica, export_appointments, EXPORT_FORMATS, appointment_filters, appointment_window, series_occurrences, waitlist_index, backfill_slot, expected_version, version_etag, retry_on_conflict, search_doctors, DOCTOR_FIELDS, schedule_cache, utilization_report, GROUP_BY, appointment_changes, ResyncRequired, schedule_broker, sse_events, BrokerFull
+from async_mode import async_mode_enabled
+from services.serialization import format_time, appointment_columns, serialize_appointments, json_response, PROFILE_APPOINTMENT_FIELDS, DOCTOR_APPOINTMENT_FIELDS, APPOINTMENT_FIELDS, EXPORT_APPOINTMENT_FIELDS
 import logging
 
 api = Blueprint('api', __name__)
 
+# Password hashing is saturated, ask the client to retry instead of queueing forever
+@api.errorhandler(HashingBusy)
+def handle_hashing_busy(e):
+    logging.error(f"Password hashing busy: {e}")
+    return jsonify({"msg": "Server is busy, please try again"}), 503, {'Retry-After': '1'}
+
+# Another writer changed the appointment first, the client should re-read and retry
+def version_conflict(e):
+    body = {"msg": "Appointment was changed by someone else, reload it and try again"}
+    if e.current_version is None:
+        return jsonify(body), 409
+    body["version"] = e.current_version
+    return jsonify(body), 409, {'ETag': version_etag(e.current_version)}
+
 # Patient routes
 
 # Register a new patient
@@ -39,6 +59,11 @@ def login_patient():
 
     # Check if patient exists and password is correct
     if patient and patient.check_password(data['password']):
+        # Upgrade the stored hash when the configured bcrypt cost has changed
+        if patient.password_needs_rehash():
+            patient.set_password(data['password'])
+            db.session.commit()
+
         # Create access token with 24 hour expiry
         expires = timedelta(hours=24)
         access_token = create_access_token(
@@ -56,34 +81,21 @@ def get_patient_profile():
     try:
         # Get the patient ID from the JWT token and convert to int
         current_user_id = int(get_jwt_identity())
-        patient = Patient.query.get_or_404(current_user_id)
+        patient = get_current_patient()
 
-        appointments = Appointment.query.filter_by(patient_id=current_user_id).all()
-        current_time = datetime.now()
-
-        # Update status of past appointments to completed
-        for appointment in appointments:
-            if (appointment.status == 'scheduled' and 
-                appointment.appointment_time < current_time):
-                appointment.status = 'completed'
-        
-        db.session.commit()
+        query = Appointment.query.filter_by(patient_id=current_user_id).order_by(Appointment.appointment_time, Appointment.id)
+        appointments = appointment_columns(query, PROFILE_APPOINTMENT_FIELDS).all()
 
         profile_data = {
             'id': patient.id,
             'name': patient.name,
             'email': patient.email,
             'phone': patient.phone,
-            'appointments': [{
-                'id': appointment.id,
-                'doctor_id': appointment.doctor_id,
-                'appointment_time': appointment.appointment_time.strftime("%Y-%m-%d %H:%M"),
-                'status': appointment.status,
-                'notes': appointment.notes
-            } for appointment in appointments]
+            # Past scheduled appointments are reported as completed, the status sweeper persists it
+            'appointments': serialize_appointments(appointments, PROFILE_APPOINTMENT_FIELDS, now=datetime.now())
         }
 
-        return jsonify(profile_data), 200
+        return json_response(profile_data), 200
 
     except ValueError as e:
         logging.error(f"Invalid user ID format: {e}")
@@ -96,8 +108,7 @@ def get_patient_profile():
 @api.route('/api/patients/profile', methods=['PUT'])
 @jwt_required()
 def update_patient_info():
-    current_user_id = get_jwt_identity()
-    patient = Patient.query.get_or_404(current_user_id)
+    patient = get_current_patient()
 
     data = request.get_json()
 
@@ -120,20 +131,50 @@ def update_patient_info():
 
     return jsonify({"msg": "Patient information updated successfully"}), 200
 
+# Get one appointment, its ETag is the version to send back in If-Match
+@api.route('/api/appointments/<int:appointment_id>', methods=['GET'])
+@jwt_required()
+def get_appointment(appointment_id):
+    current_user_id = int(get_jwt_identity())
+    appointment = db.session.get(Appointment, appointment_id)
+    if not appointment or current_user_id not in (appointment.patient_id, appointment.doctor_id):
+        return jsonify({"msg": "Appointment not found"}), 404
+
+    return jsonify({
+        'id': appointment.id,
+        'doctor_id': appointment.doctor_id,
+        'patient_id': appointment.patient_id,
+        'appointment_time': appointment.appointment_time.strftime("%Y-%m-%d %H:%M"),
+        'status': appointment.effective_status(),
+        'notes': appointment.notes,
+        'version': appointment.version
+    }), 200, {'ETag': version_etag(appointment.version)}
+
 # Update an appointment
 @api.route('/api/appointments/<int:appointment_id>', methods=['PUT'])
 @jwt_required()
 def update_appointment(appointment_id):
     try:
         current_user_id = int(get_jwt_identity())  # Convert string to int
-        patient = Patient.query.get_or_404(current_user_id)
+        patient = get_current_patient()
 
         data = request.get_json()
 
+        # Writes are conditional on the version the client read, when it sent one
+        try:
+            version = expected_version(request.headers, data)
+        except ValueError as e:
+            return jsonify({"msg": str(e)}), 400
+
         # Get the appointment
         appointment = Appointment.query.get(appointment_id)
         if not appointment or appointment.patient_id != current_user_id:
             return jsonify({"msg": "Appointment not found or you do not have permission to update it"}), 404
+        try:
+            appointment.check_version(version)
+        except VersionConflict as e:
+            return version_conflict(e)
+        previous_time = appointment.appointment_time if appointment.status == 'scheduled' else None
 
         # If appointment_time is provided, validate and update it
         if 'appointment_time' in data:
@@ -144,18 +185,12 @@ def update_appointment(appointment_id):
 
             new_time = datetime.strptime(data['appointment_time'], "%Y-%m-%d %H:%M")
 
-            # Check if the new time slot is available (unless it's the same time as current appointment)
-            if appointment.appointment_time != new_time:
-                existing_appointment = Appointment.query.filter_by(
-                    doctor_id=appointment.doctor_id,
-                    appointment_time=new_time,
-                    status='scheduled'  # Only check for scheduled appointments
-                ).first()
-                
-                if existing_appointment and existing_appointment.id != appointment_id:
-                    return jsonify({"msg": "Time slot is already taken"}), 400
-
-            # Update appointment time and status
+            # Recurring occurrences aren't rows, so the slot index can't see them
+            lock_schedules([appointment.doctor_id])
+            if AppointmentSeries.taken_slots([(appointment.doctor_id, new_time)]):
+                return jsonify({"msg": "Time slot is already taken"}), 400
+
+            # Update appointment time and status, slot availability is enforced on commit
             appointment.appointment_time = new_time
             appointment.status = 'scheduled'  # Set status to scheduled for both updates and reschedules
 
@@ -163,14 +198,28 @@ def update_appointment(appointment_id):
         if 'notes' in data:
             appointment.notes = data['notes']
 
-        db.session.commit()
+        # The UPDATE only applies if nobody else changed the row since it was read
+        try:
+            commit_versioned()
+        except IntegrityError:
+            db.session.rollback()
+            return jsonify({"msg": "Time slot is already taken"}), 400
+        except VersionConflict as e:
+            return version_conflict(e)
+
+        if appointment.status == 'scheduled':
+            availability_index.book(appointment.id, appointment.doctor_id, appointment.appointment_time)
+        # A rescheduled appointment frees its old slot for the waitlist
+        if previous_time is not None and previous_time != appointment.appointment_time:
+            backfill_slot(appointment.doctor, previous_time, exclude_patient_id=patient.id)
 
         return jsonify({
             "msg": "Appointment updated successfully",
             "appointment_time": appointment.appointment_time.strftime("%Y-%m-%d %H:%M"),
             "status": appointment.status,
-            "notes": appointment.notes
-        }), 200
+            "notes": appointment.notes,
+            "version": appointment.version
+        }), 200, {'ETag': version_etag(appointment.version)}
 
     except ValueError as e:
         logging.error(f"Invalid user ID format: {e}")
@@ -183,64 +232,150 @@ def update_appointment(appointment_id):
 @api.route('/api/appointments/<int:appointment_id>', methods=['DELETE'])
 @jwt_required()
 def cancel_appointment(appointment_id):
-    current_user_id = get_jwt_identity()
-    patient = Patient.query.get_or_404(current_user_id)
+    patient = get_current_patient()
+
+    try:
+        canceled = patient.cancel_appointment(appointment_id, expected_version=expected_version(request.headers))
+    except ValueError as e:
+        return jsonify({"msg": str(e)}), 400
+    except VersionConflict as e:
+        return version_conflict(e)
 
-    if patient.cancel_appointment(appointment_id):
+    if canceled:
+        availability_index.release(appointment_id)
+        # Offer the freed slot to the best waiting patient
+        appointment = db.session.get(Appointment, appointment_id)
+        backfill_slot(appointment.doctor, appointment.appointment_time, exclude_patient_id=patient.id)
         return jsonify({"msg": "Appointment canceled successfully"}), 200
     return jsonify({"msg": "Appointment not found or you do not have permission to cancel it"}), 404
 
-# Delete an appointment
-@api.route('/api/appointments/<int:appointment_id>', methods=['DELETE'])
+# Delete an appointment for good (DELETE on the appointment itself cancels it)
+@api.route('/api/appointments/<int:appointment_id>/delete', methods=['DELETE'])
 @jwt_required()
 def delete_appointment(appointment_id):
-    current_user_id = get_jwt_identity()
-    patient = Patient.query.get_or_404(current_user_id)
+    patient = get_current_patient()
+
+    # A series template stands for the whole series, which is canceled instead
+    appointment = db.session.get(Appointment, appointment_id)
+    if appointment is not None and appointment.series is not None:
+        return jsonify({"msg": "Appointment belongs to a series, cancel the series instead"}), 400
 
     if patient.delete_appointment(appointment_id):
+        availability_index.release(appointment_id)
         return jsonify({"msg": "Appointment deleted successfully"}), 200
     return jsonify({"msg": "Appointment not found or you do not have permission to delete it"}), 404
 
 # Get all patients
 @api.route('/api/patients', methods=['GET'])
+@read_replica
 def get_patients():
-    patients = Patient.query.filter_by(is_doctor=False).all()  # Filter for patients
-    return jsonify([{'name': patient.name, 'email': patient.email, 'phone': patient.phone} for patient in patients]), 200
+    query = Patient.query.filter_by(is_doctor=False)  # Filter for patients
+    try:
+        patients, next_cursor = paginate(query, (Patient.id,))
+    except ValueError as e:
+        return jsonify({"msg": str(e)}), 400
+
+    return page_response([{'name': patient.name, 'email': patient.email, 'phone': patient.phone} for patient in patients], next_cursor), 200
 
 # Get all doctors 
 @api.route('/api/doctors', methods=['GET'])
+@read_replica
+@cached_response('doctors')
 def get_doctors():
-    doctors = Doctor.query.filter_by(is_doctor=True).all()  # Filter for doctors
-    return jsonify([{
+    query = Doctor.query.filter_by(is_doctor=True)  # Filter for doctors
+    try:
+        doctors, next_cursor = paginate(query, (Doctor.id,))
+    except ValueError as e:
+        return jsonify({"msg": str(e)}), 400
+
+    return page_response([{
         'id': doctor.id,
         'name': doctor.name, 
         'email': doctor.email, 
         'phone': doctor.phone, 
         'specialization': doctor.specialization
-    } for doctor in doctors]), 200
+    } for doctor in doctors], next_cursor), 200
 
+# Search doctors by name and specialization, best matches first
+@api.route('/api/doctors/search', methods=['GET'])
+@read_replica
+def search_doctors_route():
+    q = request.args.get('q', '').strip()
+    specialization = request.args.get('specialization', '').strip()
+    if not q and not specialization:
+        return jsonify({"msg": "q or specialization is required"}), 400
+
+    max_limit = current_app.config['DOCTOR_SEARCH_MAX_LIMIT']
+    try:
+        limit = int(request.args.get('limit', 20))
+    except ValueError:
+        return jsonify({"msg": "Invalid limit"}), 400
+    if not 1 <= limit <= max_limit:
+        return jsonify({"msg": f"Limit must be between 1 and {max_limit}"}), 400
+
+    rows = search_doctors(q, specialization or None, limit)
+    return json_response([dict(zip(DOCTOR_FIELDS, row)) for row in rows]), 200
 
 # Doctor routes
 
 # Get a doctor's schedule
 @api.route('/api/doctors/<int:doctor_id>/appointments', methods=['GET'])
 @jwt_required()
+@read_replica
 def get_doctor_appointments(doctor_id):
     # Get the doctor by ID
     doctor = Doctor.query.get_or_404(doctor_id)
 
-    # Use the method to get appointments
-    appointments = doctor.get_appointments()
+    # Get one page of the doctor's appointments, only the columns the response needs
+    try:
+        # Windows of a few whole days are served from the per-day schedule cache
+        start, end, status = appointment_window(request.args)
+        days = schedule_cache.cacheable_days(start, end)
+        if days is not None:
+            rows = schedule_cache.get_days(doctor.id, days)
+            if status is not None:
+                rows = [row for row in rows if row.status == status]
+            appointments, next_cursor = paginate_rows(rows, (Appointment.appointment_time, Appointment.id))
+            return page_response(serialize_appointments(appointments, DOCTOR_APPOINTMENT_FIELDS, now=datetime.now()), next_cursor), 200
+
+        query = appointment_columns(doctor.appointments_query(*appointment_filters(request.args)), DOCTOR_APPOINTMENT_FIELDS)
+        occurrences = series_occurrences([AppointmentSeries.doctor_id == doctor.id], request.args, DOCTOR_APPOINTMENT_FIELDS)
+        appointments, next_cursor = paginate(query, (Appointment.appointment_time, Appointment.id), extra=occurrences)
+    except ValueError as e:
+        return jsonify({"msg": str(e)}), 400
 
-    # Prepare the response data
-    appointment_data = [{
-        'id': appointment.id,
-        'patient_id': appointment.patient_id,
-        'appointment_time': appointment.appointment_time.strftime("%Y-%m-%d %H:%M"),
-        'status': appointment.status
-    } for appointment in appointments]
+    return page_response(serialize_appointments(appointments, DOCTOR_APPOINTMENT_FIELDS, now=datetime.now()), next_cursor), 200
+
+# Get a doctor's free slots
+@api.route('/api/doctors/<int:doctor_id>/availability', methods=['GET'])
+def get_doctor_availability(doctor_id):
+    doctor = Doctor.query.get_or_404(doctor_id)
 
-    return jsonify(appointment_data), 200
+    # Validate the date range, defaults to the coming week
+    date_from = request.args.get('from', datetime.now().strftime("%Y-%m-%d"))
+    is_valid, message = validate_date(date_from)
+    if not is_valid:
+        return jsonify({"msg": message}), 400
+    start = datetime.strptime(date_from, "%Y-%m-%d")
+
+    date_to = request.args.get('to', (start + timedelta(days=6)).strftime("%Y-%m-%d"))
+    is_valid, message = validate_date(date_to)
+    if not is_valid:
+        return jsonify({"msg": message}), 400
+    end = datetime.strptime(date_to, "%Y-%m-%d") + timedelta(days=1)
+
+    if end <= start or end - start > timedelta(days=31):
+        return jsonify({"msg": "Date range must be between 1 and 31 days"}), 400
+
+    # Past slots can't be booked
+    start = max(start, datetime.now())
+    slots = availability_index.free_slots(doctor, start, end, booked=AppointmentSeries.booked_times(doctor.id, start, end))
+
+    return jsonify({
+        'doctor_id': doctor.id,
+        'slot_minutes': doctor.slot_minutes,
+        'slots': [slot.strftime("%Y-%m-%d %H:%M") for slot in slots]
+    }), 200
 
 
 
@@ -250,32 +385,26 @@ def get_doctor_appointments(doctor_id):
 @api.route('/api/appointments/create', methods=['POST'])
 @jwt_required()
 def create_appointment():
-    current_user_id = get_jwt_identity()
     data = request.get_json()
 
-    patient = Patient.query.get(current_user_id)
+    patient = get_current_patient()
     doctor = Doctor.query.get(data['doctor_id'])
 
     if not doctor:
         return jsonify({"msg": "Doctor not found"}), 404
 
-    appointment_time = datetime.strptime(data['appointment_time'], "%Y-%m-%d %H:%M")
-
-    # Check if the appointment time is already taken by a scheduled appointment
-    existing_appointment = Appointment.query.filter_by(
-        doctor_id=doctor.id,
-        appointment_time=appointment_time,
-        status='scheduled'  # Only check for scheduled appointments
-    ).first()
-
-    if existing_appointment:
-        return jsonify({"msg": "Time slot is already taken"}), 400
-    
     # Validate appointment time
     is_valid, message = validate_appointment_time(data['appointment_time'])
     if not is_valid:
         return jsonify({"msg": message}), 400
 
+    appointment_time = datetime.strptime(data['appointment_time'], "%Y-%m-%d %H:%M")
+
+    # Recurring occurrences aren't rows, check them against the series rules in the slot's range
+    lock_schedules([doctor.id])
+    if AppointmentSeries.taken_slots([(doctor.id, appointment_time)]):
+        return jsonify({"msg": "Time slot is already taken"}), 400
+
     # Create a new appointment with notes
     appointment = Appointment(
         doctor_id=doctor.id,
@@ -284,22 +413,613 @@ def create_appointment():
         notes=data.get('notes', '')  # Get notes from request or empty string if not provided
     )
 
+    # The unique scheduled-slot index rejects the insert if the time is already taken
     db.session.add(appointment)
-    db.session.commit()
+    try:
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()
+        return jsonify({"msg": "Time slot is already taken"}), 400
+
+    availability_index.book(appointment.id, appointment.doctor_id, appointment.appointment_time)
 
     return jsonify({"msg": "Appointment created successfully", "appointment_id": appointment.id}), 201
 
+# Create several appointments at once
+@api.route('/api/appointments/batch', methods=['POST'])
+@jwt_required()
+def create_appointments_batch():
+    patient = get_current_patient()
+    data = request.get_json()
+
+    items = data.get('appointments')
+    if not isinstance(items, list) or not items:
+        return jsonify({"msg": "appointments must be a non-empty list"}), 400
+    if len(items) > current_app.config['BATCH_BOOKING_MAX_ITEMS']:
+        return jsonify({"msg": f"At most {current_app.config['BATCH_BOOKING_MAX_ITEMS']} appointments per batch"}), 400
+    # All-or-nothing by default, atomic=false books whatever it can
+    atomic = data.get('atomic', True)
+    if not isinstance(atomic, bool):
+        return jsonify({"msg": "atomic must be true or false"}), 400
+
+    # Validate every item, then look up doctors and taken slots with one query each
+    errors = {}
+    slots = {}
+    for index, item in enumerate(items):
+        if not isinstance(item, dict) or 'doctor_id' not in item or 'appointment_time' not in item:
+            errors[index] = "doctor_id and appointment_time are required"
+            continue
+        # Doctor ids may come as numbers or numeric strings, like the single booking accepts
+        doctor_id = item['doctor_id']
+        if isinstance(doctor_id, str) and doctor_id.strip().isdigit():
+            doctor_id = int(doctor_id)
+        if not isinstance(doctor_id, int) or isinstance(doctor_id, bool):
+            errors[index] = "doctor_id must be an integer"
+            continue
+        if not isinstance(item['appointment_time'], str):
+            errors[index] = "appointment_time must be a string"
+            continue
+        is_valid, message = validate_appointment_time(item['appointment_time'])
+        if not is_valid:
+            errors[index] = message
+            continue
+        slots[index] = (doctor_id, datetime.strptime(item['appointment_time'], "%Y-%m-%d %H:%M"))
+
+    doctor_ids = {doctor_id for doctor_id, _ in slots.values()}
+    known_doctors = {row.id for row in Doctor.query.with_entities(Doctor.id).filter(Doctor.id.in_(doctor_ids))}
+    candidates = {slot for slot in slots.values() if slot[0] in known_doctors}
+    lock_schedules(known_doctors)
+    taken = Appointment.taken_slots(candidates) | AppointmentSeries.taken_slots(candidates)
+
+    appointments = {}
+    for index, slot in slots.items():
+        if slot[0] not in known_doctors:
+            errors[index] = "Doctor not found"
+        elif slot in taken:
+            errors[index] = "Time slot is already taken"
+        else:
+            taken.add(slot)  # Later items in the batch can't reuse the slot
+            appointments[index] = Appointment(
+                doctor_id=slot[0],
+                patient_id=patient.id,
+                appointment_time=slot[1],
+                notes=items[index].get('notes', '')
+            )
+
+    if atomic and errors:
+        return jsonify({
+            "msg": "No appointments were created",
+            "errors": [{"index": index, "msg": message} for index, message in sorted(errors.items())]
+        }), 400
+
+    # Insert everything in one transaction, the slot index still guards against concurrent bookings
+    db.session.add_all(appointments.values())
+    try:
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()
+        if atomic:
+            return jsonify({"msg": "No appointments were created", "errors": [{"msg": "Time slot is already taken"}]}), 400
+        # Retry item by item so one lost race doesn't fail the rest
+        for index, appointment in list(appointments.items()):
+            appointment = Appointment(
+                doctor_id=appointment.doctor_id,
+                patient_id=appointment.patient_id,
+                appointment_time=appointment.appointment_time,
+                notes=appointment.notes
+            )
+            try:
+                with db.session.begin_nested():
+                    db.session.add(appointment)
+                appointments[index] = appointment
+            except IntegrityError:
+                del appointments[index]
+                errors[index] = "Time slot is already taken"
+        db.session.commit()
+
+    for appointment in appointments.values():
+        availability_index.book(appointment.id, appointment.doctor_id, appointment.appointment_time)
+
+    if atomic:
+        return jsonify({
+            "msg": "Appointments created successfully",
+            "appointment_ids": [appointments[index].id for index in sorted(appointments)]
+        }), 201
+
+    results = []
+    for index in range(len(items)):
+        if index in appointments:
+            results.append({"index": index, "status": "created", "appointment_id": appointments[index].id})
+        else:
+            results.append({"index": index, "status": "error", "msg": errors[index]})
+    return jsonify({"msg": f"{len(appointments)} of {len(items)} appointments created", "results": results}), 200
+
+# Create a recurring appointment series
+@api.route('/api/appointments/series', methods=['POST'])
+@jwt_required()
+def create_appointment_series():
+    data = request.get_json()
+
+    patient = get_current_patient()
+    doctor = Doctor.query.get(data.get('doctor_id'))
+    if not doctor:
+        return jsonify({"msg": "Doctor not found"}), 404
+
+    is_valid, message = validate_appointment_time(data.get('appointment_time', ''))
+    if not is_valid:
+        return jsonify({"msg": message}), 400
+    interval_days = data.get('interval_days', 7)
+    occurrences = data.get('occurrences')
+    is_valid, message = validate_recurrence(interval_days, occurrences, current_app.config['SERIES_MAX_OCCURRENCES'])
+    if not is_valid:
+        return jsonify({"msg": message}), 400
+
+    starts_at = datetime.strptime(data['appointment_time'], "%Y-%m-%d %H:%M")
+
+    # Check every occurrence against stored appointments and other series, one query each
+    lock_schedules([doctor.id])
+    slots = {(doctor.id, starts_at + timedelta(days=interval_days * i)) for i in range(occurrences)}
+    conflicts = Appointment.taken_slots(slots) | AppointmentSeries.taken_slots(slots)
+    if conflicts:
+        return jsonify({
+            "msg": "Time slot is already taken",
+            "conflicts": [appointment_time.strftime("%Y-%m-%d %H:%M") for _, appointment_time in sorted(conflicts)]
+        }), 400
+
+    # The template appointment is the first occurrence, the rest are expanded on read
+    appointment = Appointment(
+        doctor_id=doctor.id,
+        patient_id=patient.id,
+        appointment_time=starts_at,
+        notes=data.get('notes', '')
+    )
+    series = AppointmentSeries(
+        template=appointment,
+        doctor_id=doctor.id,
+        patient_id=patient.id,
+        starts_at=starts_at,
+        interval_days=interval_days,
+        occurrences=occurrences
+    )
+    series.update_span()
+    db.session.add(series)
+    try:
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()
+        return jsonify({"msg": "Time slot is already taken"}), 400
+
+    availability_index.book(appointment.id, appointment.doctor_id, appointment.appointment_time)
+
+    return jsonify({
+        "msg": "Appointment series created successfully",
+        "series_id": series.id,
+        "appointment_id": appointment.id
+    }), 201
+
+# Get a series and its occurrences in a date range
+@api.route('/api/appointments/series/<int:series_id>', methods=['GET'])
+@jwt_required()
+def get_appointment_series(series_id):
+    current_user_id = int(get_jwt_identity())
+    series = db.session.get(AppointmentSeries, series_id)
+    if not series or current_user_id not in (series.patient_id, series.doctor_id):
+        return jsonify({"msg": "Series not found"}), 404
+
+    try:
+        start, end, status = appointment_window(request.args)
+    except ValueError as e:
+        return jsonify({"msg": str(e)}), 400
+    start = start or series.span_start
+    end = end or series.span_end + timedelta(minutes=1)
+
+    template = series.template
+    occurrences = series.expand(start, end)
+    if start <= template.appointment_time < end:
+        occurrences.insert(0, Occurrence(series.starts_at, template.appointment_time, template.status, template.notes))
+        occurrences.sort(key=lambda occurrence: occurrence.appointment_time)
+
+    now = datetime.now()
+    return json_response({
+        'id': series.id,
+        'appointment_id': series.appointment_id,
+        'doctor_id': series.doctor_id,
+        'patient_id': series.patient_id,
+        'interval_days': series.interval_days,
+        'occurrences': series.occurrences,
+        'items': [{
+            'original_time': format_time(occurrence.original_time),
+            'appointment_time': format_time(occurrence.appointment_time),
+            # Past scheduled occurrences are reported as completed, like appointments
+            'status': 'completed' if occurrence.status == 'scheduled' and occurrence.appointment_time < now else occurrence.status,
+            'notes': occurrence.notes
+        } for occurrence in occurrences if status is None or occurrence.status == status]
+    }), 200
+
+# Move or cancel one occurrence of a series
+@api.route('/api/appointments/series/<int:series_id>/occurrences', methods=['PUT'])
+@jwt_required()
+def update_series_occurrence(series_id):
+    patient = get_current_patient()
+    series = db.session.get(AppointmentSeries, series_id)
+    if not series or series.patient_id != patient.id:
+        return jsonify({"msg": "Series not found or you do not have permission to update it"}), 404
+
+    data = request.get_json()
+    is_valid, message = validate_appointment_time(data.get('original_time', ''))
+    if not is_valid:
+        return jsonify({"msg": message}), 400
+    original_time = datetime.strptime(data['original_time'], "%Y-%m-%d %H:%M")
+
+    index = series.occurrence_index(original_time)
+    if index is None:
+        return jsonify({"msg": "Occurrence not found"}), 404
+    if index == 0:
+        return jsonify({"msg": f"The first occurrence is appointment {series.appointment_id}, update it directly"}), 400
+
+    status = data.get('status', 'scheduled')
+    if status not in ('scheduled', 'canceled'):
+        return jsonify({"msg": "Invalid occurrence status. Must be 'scheduled' or 'canceled'."}), 400
+
+    exception = next((exception for exception in series.exceptions if exception.original_time == original_time), None)
+    previous_time = exception.appointment_time if exception else original_time
+    previous_status = exception.status if exception else 'scheduled'
+    new_time = previous_time
+    if 'appointment_time' in data:
+        is_valid, message = validate_appointment_time(data['appointment_time'])
+        if not is_valid:
+            return jsonify({"msg": message}), 400
+        new_time = datetime.strptime(data['appointment_time'], "%Y-%m-%d %H:%M")
+
+    # The occurrence being changed doesn't conflict with itself
+    if status == 'scheduled':
+        slot = (series.doctor_id, new_time)
+        lock_schedules([series.doctor_id])
+        if Appointment.taken_slots([slot]) or AppointmentSeries.taken_slots([slot], exclude=(series.id, original_time)):
+            return jsonify({"msg": "Time slot is already taken"}), 400
+
+    # Only changed occurrences are stored
+    if exception is None:
+        exception = SeriesException(original_time=original_time)
+        series.exceptions.append(exception)
+    exception.appointment_time = new_time
+    exception.status = status
+    if 'notes' in data:
+        exception.notes = data['notes']
+    series.update_span()
+    db.session.commit()
+
+    # A canceled or moved occurrence frees its slot for the waitlist
+    if previous_status == 'scheduled' and (status == 'canceled' or new_time != previous_time):
+        backfill_slot(db.session.get(Doctor, series.doctor_id), previous_time, exclude_patient_id=patient.id)
+
+    return jsonify({
+        "msg": "Occurrence updated successfully",
+        "appointment_time": new_time.strftime("%Y-%m-%d %H:%M"),
+        "status": status
+    }), 200
+
+# Cancel the remaining occurrences of a series
+@api.route('/api/appointments/series/<int:series_id>', methods=['DELETE'])
+@jwt_required()
+def cancel_appointment_series(series_id):
+    patient = get_current_patient()
+    series = db.session.get(AppointmentSeries, series_id)
+    if not series or series.patient_id != patient.id:
+        return jsonify({"msg": "Series not found or you do not have permission to cancel it"}), 404
+
+    # Keep the occurrences that already started and end the rule there. Re-run
+    # from a fresh read if the template appointment is changed concurrently
+    def cancel_remaining():
+        now = datetime.now()
+        started = -((series.starts_at - now) // series.interval)
+        series.occurrences = max(1, min(series.occurrences, started))
+        last_time = series.starts_at + series.interval * (series.occurrences - 1)
+        for exception in list(series.exceptions):
+            if exception.original_time > last_time:
+                series.exceptions.remove(exception)
+            elif exception.appointment_time >= now:
+                exception.status = 'canceled'
+
+        template = series.template
+        template_canceled = template.status == 'scheduled' and template.appointment_time >= now
+        if template_canceled:
+            template.status = 'canceled'
+        series.update_span()
+        commit_versioned()
+        return template_canceled
+
+    try:
+        template_canceled = retry_on_conflict(cancel_remaining)
+    except VersionConflict as e:
+        return version_conflict(e)
+
+    if template_canceled:
+        availability_index.release(series.appointment_id)
+
+    return jsonify({"msg": "Appointment series canceled successfully"}), 200
+
 # Get all appointments
 @api.route('/api/appointments', methods=['GET'])
 @jwt_required()
+@read_replica
 def get_appointments():
     current_user_id = get_jwt_identity()
-    appointments = Appointment.query.filter((Appointment.patient_id == current_user_id) | (Appointment.doctor_id == current_user_id)).all()
+    query = Appointment.query.filter((Appointment.patient_id == current_user_id) | (Appointment.doctor_id == current_user_id))
+    try:
+        query = appointment_columns(query.filter(*appointment_filters(request.args)), APPOINTMENT_FIELDS)
+        occurrences = series_occurrences(
+            [(AppointmentSeries.patient_id == current_user_id) | (AppointmentSeries.doctor_id == current_user_id)],
+            request.args, APPOINTMENT_FIELDS
+        )
+        appointments, next_cursor = paginate(query, (Appointment.appointment_time, Appointment.id), extra=occurrences)
+    except ValueError as e:
+        return jsonify({"msg": str(e)}), 400
+
+    return page_response(serialize_appointments(appointments, APPOINTMENT_FIELDS, now=datetime.now()), next_cursor), 200
+
+# Get the caller's appointments changed or deleted since a sync token
+@api.route('/api/appointments/changes', methods=['GET'])
+@jwt_required()
+def get_appointment_changes():
+    # Served by the primary: a lagging replica could hide writes older than the token's grace window
+    current_user_id = get_jwt_identity()
+    try:
+        changes = appointment_changes(current_user_id, request.args.get('since'))
+    except ResyncRequired as e:
+        return jsonify({"msg": str(e)}), 410
+    except ValueError as e:
+        return jsonify({"msg": str(e)}), 400
+
+    return json_response(changes), 200
+
+# Export appointments as a stream of NDJSON or CSV
+@api.route('/api/appointments/export', methods=['GET'])
+@jwt_required()
+@read_replica
+def export_appointments_route():
+    export_format = request.args.get('format', 'ndjson')
+    if export_format not in EXPORT_FORMATS:
+        return jsonify({"msg": "Invalid format. Must be 'ndjson' or 'csv'."}), 400
+
+    # Export one doctor's schedule, or the caller's own appointments
+    doctor_id = request.args.get('doctor_id')
+    if doctor_id:
+        try:
+            doctor = Doctor.query.get_or_404(int(doctor_id))
+        except ValueError:
+            return jsonify({"msg": "Invalid doctor ID"}), 400
+        filters = [Appointment.doctor_id == doctor.id]
+        # Other patients' appointments are on it, expose no more than the doctor's schedule listing does
+        fields = DOCTOR_APPOINTMENT_FIELDS
+    else:
+        filters = [Appointment.patient_id == int(get_jwt_identity())]
+        fields = EXPORT_APPOINTMENT_FIELDS
+
+    try:
+        filters.extend(appointment_filters(request.args))
+    except ValueError as e:
+        return jsonify({"msg": str(e)}), 400
+
+    chunks = export_appointments(filters, export_format, current_app.config['EXPORT_CHUNK_SIZE'], fields)
+    return current_app.response_class(
+        stream_with_context(chunks),
+        mimetype=EXPORT_FORMATS[export_format],
+        headers={'Content-Disposition': f'attachment; filename="appointments.{export_format}"'}
+    )
+
+# Stream routes
+
+# Push one doctor's schedule changes, or the caller's own appointments', as Server-Sent Events
+@api.route('/api/stream/schedule', methods=['GET'])
+@jwt_required()
+def stream_schedule():
+    doctor_id = request.args.get('doctor_id')
+    if doctor_id:
+        try:
+            doctor = Doctor.query.get_or_404(int(doctor_id))
+        except ValueError:
+            return jsonify({"msg": "Invalid doctor ID"}), 400
+        topics = [('doctor', doctor.id)]
+    else:
+        topics = [('patient', int(get_jwt_identity()))]
+    # Idle streams must not hold on to a database connection
+    db.session.close()
+
+    config = current_app.config
+    limit = config['STREAM_MAX_SUBSCRIBERS'] if async_mode_enabled() else config['STREAM_THREADED_MAX_SUBSCRIBERS']
+    try:
+        subscription = schedule_broker.subscribe(topics, limit)
+    except BrokerFull as e:
+        return jsonify({"msg": str(e)}), 503, {'Retry-After': '5'}
+
+    # End the stream when the token expires, the client reconnects with a fresh one
+    lifetime = min(config['STREAM_MAX_SECONDS'], get_jwt().get('exp', float('inf')) - time.time())
+    return current_app.response_class(
+        sse_events(subscription, config['STREAM_HEARTBEAT_SECONDS'], lifetime),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+# Waitlist routes
+
+# Join the waitlist for a doctor, or for any doctor of a specialization
+@api.route('/api/waitlist', methods=['POST'])
+@jwt_required()
+def join_waitlist():
+    patient = get_current_patient()
+    data = request.get_json()
+
+    doctor_id = data.get('doctor_id')
+    specialization = data.get('specialization')
+    if doctor_id is not None:
+        doctor = Doctor.query.get(doctor_id)
+        if not doctor:
+            return jsonify({"msg": "Doctor not found"}), 404
+        specialization = doctor.specialization
+    elif not specialization:
+        return jsonify({"msg": "doctor_id or specialization is required"}), 400
+
+    # The window is when the patient can come in
+    for field in ('from', 'to'):
+        is_valid, message = validate_appointment_time(data.get(field, ''))
+        if not is_valid:
+            return jsonify({"msg": f"{field}: {message}"}), 400
+    window_start = datetime.strptime(data['from'], "%Y-%m-%d %H:%M")
+    window_end = datetime.strptime(data['to'], "%Y-%m-%d %H:%M")
+    is_valid, message = validate_waitlist_window(window_start, window_end, current_app.config['WAITLIST_MAX_DAYS'])
+    if not is_valid:
+        return jsonify({"msg": message}), 400
+    if window_end <= datetime.now():
+        return jsonify({"msg": "Waitlist window is already over"}), 400
+
+    priority = data.get('priority', 0)
+    is_valid, message = validate_priority(priority, current_app.config['WAITLIST_MAX_PRIORITY'])
+    if not is_valid:
+        return jsonify({"msg": message}), 400
+
+    entry = WaitlistEntry(
+        patient_id=patient.id,
+        doctor_id=doctor_id,
+        specialization=specialization,
+        window_start=window_start,
+        window_end=window_end,
+        priority=priority,
+        auto_book=bool(data.get('auto_book', True))
+    )
+    db.session.add(entry)
+    db.session.commit()
+    waitlist_index.add(entry)
+
+    return jsonify({"msg": "Added to the waitlist", "waitlist_id": entry.id}), 201
+
+# Get the caller's waitlist entries
+@api.route('/api/waitlist', methods=['GET'])
+@jwt_required()
+def get_waitlist():
+    current_user_id = int(get_jwt_identity())
+    entries = WaitlistEntry.query.filter_by(patient_id=current_user_id).order_by(WaitlistEntry.id).all()
 
     return jsonify([{
-        'id': appointment.id,
-        'doctor_id': appointment.doctor_id,
-        'patient_id': appointment.patient_id,
-        'appointment_time': appointment.appointment_time.strftime("%Y-%m-%d %H:%M"),
-        'status': appointment.status
-    } for appointment in appointments]), 200
+        'id': entry.id,
+        'doctor_id': entry.doctor_id,
+        'specialization': entry.specialization,
+        'from': entry.window_start.strftime("%Y-%m-%d %H:%M"),
+        'to': entry.window_end.strftime("%Y-%m-%d %H:%M"),
+        'priority': entry.priority,
+        'auto_book': entry.auto_book,
+        'status': entry.status,
+        'offered_doctor_id': entry.offered_doctor_id,
+        'offered_time': entry.offered_time.strftime("%Y-%m-%d %H:%M") if entry.offered_time else None,
+        'appointment_id': entry.appointment_id
+    } for entry in entries]), 200
+
+# Leave the waitlist
+@api.route('/api/waitlist/<int:entry_id>', methods=['DELETE'])
+@jwt_required()
+def leave_waitlist(entry_id):
+    patient = get_current_patient()
+    entry = db.session.get(WaitlistEntry, entry_id)
+    if not entry or entry.patient_id != patient.id or entry.status not in ('waiting', 'offered'):
+        return jsonify({"msg": "Waitlist entry not found or you do not have permission to cancel it"}), 404
+
+    entry.status = 'canceled'
+    db.session.commit()
+    waitlist_index.remove(entry.id)
+
+    return jsonify({"msg": "Removed from the waitlist"}), 200
+
+# Accept or decline a slot offered from the waitlist
+@api.route('/api/waitlist/<int:entry_id>/offer', methods=['POST'])
+@jwt_required()
+def respond_to_waitlist_offer(entry_id):
+    patient = get_current_patient()
+    entry = db.session.get(WaitlistEntry, entry_id)
+    if not entry or entry.patient_id != patient.id or entry.status != 'offered':
+        return jsonify({"msg": "Offer not found"}), 404
+
+    data = request.get_json()
+    doctor = db.session.get(Doctor, entry.offered_doctor_id)
+    offered_time = entry.offered_time
+
+    def back_to_waiting():
+        entry.status = 'waiting'
+        entry.offered_doctor_id = None
+        entry.offered_time = None
+        db.session.commit()
+        waitlist_index.add(entry)
+
+    if not data.get('accept'):
+        back_to_waiting()
+        # Pass the slot on to the next candidate
+        backfill_slot(doctor, offered_time, exclude_patient_id=patient.id)
+        return jsonify({"msg": "Offer declined"}), 200
+
+    slot = (doctor.id, offered_time)
+    lock_schedules([doctor.id])
+    if offered_time <= datetime.now() or AppointmentSeries.taken_slots([slot]):
+        back_to_waiting()
+        return jsonify({"msg": "Time slot is no longer available"}), 400
+
+    appointment = Appointment(
+        doctor_id=doctor.id,
+        patient_id=patient.id,
+        appointment_time=offered_time,
+        notes='Booked from the waitlist'
+    )
+    db.session.add(appointment)
+    try:
+        db.session.flush()
+    except IntegrityError:
+        db.session.rollback()
+        back_to_waiting()
+        return jsonify({"msg": "Time slot is no longer available"}), 400
+    entry.status = 'booked'
+    entry.appointment_id = appointment.id
+    db.session.commit()
+    availability_index.book(appointment.id, appointment.doctor_id, appointment.appointment_time)
+
+    return jsonify({"msg": "Appointment created successfully", "appointment_id": appointment.id}), 201
+
+# Analytics routes
+
+# Booked, canceled and completed appointments per doctor or specialization and day, from the rollups
+@api.route('/api/analytics/utilization', methods=['GET'])
+@jwt_required()
+@read_replica
+def get_utilization():
+    group_by = request.args.get('group_by', 'doctor')
+    if group_by not in GROUP_BY:
+        return jsonify({"msg": "group_by must be 'doctor' or 'specialization'"}), 400
+
+    # Validate the date range, defaults to the last 30 days
+    date_to = request.args.get('to', datetime.now().strftime("%Y-%m-%d"))
+    is_valid, message = validate_date(date_to)
+    if not is_valid:
+        return jsonify({"msg": message}), 400
+    end = datetime.strptime(date_to, "%Y-%m-%d").date() + timedelta(days=1)
+
+    date_from = request.args.get('from', (end - timedelta(days=30)).strftime("%Y-%m-%d"))
+    is_valid, message = validate_date(date_from)
+    if not is_valid:
+        return jsonify({"msg": message}), 400
+    start = datetime.strptime(date_from, "%Y-%m-%d").date()
+
+    max_days = current_app.config['ANALYTICS_MAX_DAYS']
+    if end <= start or (end - start).days > max_days:
+        return jsonify({"msg": f"Date range must be between 1 and {max_days} days"}), 400
+
+    return json_response(utilization_report(start, end, group_by)), 200
+
+# Metrics routes
+
+# Expose request and SQL metrics in Prometheus text format
+@api.route('/api/metrics', methods=['GET'])
+def get_metrics():
+    cache_stats = identity_cache.stats()
+    body = metrics.render(extra=[
+        ('identity_cache_hits_total', 'counter', 'Authenticated patient lookups served from the cache.', cache_stats['hits']),
+        ('identity_cache_misses_total', 'counter', 'Authenticated patient lookups that queried the database.', cache_stats['misses']),
+        ('schedule_stream_subscribers', 'gauge', 'Open schedule event streams in this process.', schedule_broker.subscribers)
+    ])
+    return body, 200, {'Content-Type': 'text/plain; version=0.0.4; charset=utf-8'}
@@ -1,5 +1,13 @@
-from app import app, db
-from models import Patient, Doctor
+import argparse
+import csv
+import io
+import itertools
+import random
+import time as clock
+from datetime import datetime, time, timedelta
+from models import db
+from hashing import password_hasher
+from models import Patient, Doctor, Appointment, UtilizationRollup, next_change_seq, change_sequence
 
 # Seed the database using Polymorphism
 def seed_database():
@@ -27,6 +35,154 @@ def seed_database():
     db.session.commit()
     print("Database seeded!")
 
+
+# High-volume synthetic seeding
+
+SYNTHETIC_DOMAIN = 'synthetic.example.com'
+SYNTHETIC_PASSWORD = 'password123'
+FIRST_NAMES = ['Alex', 'Blake', 'Casey', 'Dana', 'Eden', 'Frankie', 'Gray', 'Harper', 'Indy', 'Jordan',
+               'Kai', 'Logan', 'Morgan', 'Noel', 'Oakley', 'Parker', 'Quinn', 'Riley', 'Sage', 'Taylor']
+LAST_NAMES = ['Adams', 'Brooks', 'Carter', 'Diaz', 'Evans', 'Foster', 'Garcia', 'Hughes', 'Ito', 'Jensen',
+              'Kim', 'Lopez', 'Moore', 'Nguyen', 'Ortiz', 'Patel', 'Reed', 'Silva', 'Turner', 'Walsh']
+NOTES = ['Follow-up visit', 'Annual checkup', 'Lab results review', 'Prescription renewal', 'New symptoms']
+# Share of generated slots that are actually booked
+SLOT_FILL = 0.75
+
+def bulk_insert(model, rows, chunk_size):
+    """Insert rows from a generator in chunks, with COPY on Postgres and executemany elsewhere."""
+    columns = None
+    chunk = []
+
+    def flush():
+        if db.engine.dialect.name == 'postgresql':
+            buffer = io.StringIO()
+            csv.writer(buffer).writerows([[row[column] for column in columns] for row in chunk])
+            buffer.seek(0)
+            cursor = db.session.connection().connection.cursor()
+            cursor.copy_expert(f"COPY {model.__tablename__} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)", buffer)
+        else:
+            db.session.execute(db.insert(model), chunk)
+
+    for row in rows:
+        columns = columns or list(row)
+        chunk.append(row)
+        if len(chunk) >= chunk_size:
+            flush()
+            chunk = []
+    if chunk:
+        flush()
+    db.session.commit()
+
+def appointment_times(rng, count, capacity, start, slots_per_day, slot_length):
+    """Pick `count` distinct working slots out of the first `capacity` weekday slots after `start`."""
+    for index in sorted(rng.sample(range(capacity), count)):
+        day, slot = divmod(index, slots_per_day)
+        weeks, weekday = divmod(day, 5)
+        yield start + timedelta(days=weeks * 7 + weekday) + slot * slot_length
+
+def seed_synthetic(patients, doctors, appointments, seed=0, chunk_size=10000, now=None):
+    """Bulk-load synthetic patients, doctors and appointments.
+
+    All patients share one precomputed password hash. Appointments fall in
+    the doctors' default working hours on weekdays, about half in the past
+    and half in the future. Each doctor's slots are drawn without
+    replacement, so no two scheduled appointments clash. Some doctors and
+    patients are busier than others. Patient and doctor emails are
+    numbered (patient1@synthetic.example.com, ...).
+    """
+    rng = random.Random(seed)
+    now = (now or datetime.now()).replace(second=0, microsecond=0)
+    specializations = sorted({doctor['specialization'] for doctor in Doctor.get_seed_data()})
+
+    def name(i):
+        return f'{FIRST_NAMES[i % len(FIRST_NAMES)]} {LAST_NAMES[i // len(FIRST_NAMES) % len(LAST_NAMES)]}'
+
+    password_hash = password_hasher.hash(SYNTHETIC_PASSWORD)
+    bulk_insert(Patient, ({
+        'name': name(i),
+        'email': f'patient{i}@{SYNTHETIC_DOMAIN}',
+        'phone': f'{5550000000 + i % 10000000}',
+        'is_doctor': False,
+        'password_hash': password_hash
+    } for i in range(1, patients + 1)), chunk_size)
+
+    bulk_insert(Doctor, ({
+        'name': f'Dr. {name(i)}',
+        'email': f'doctor{i}@{SYNTHETIC_DOMAIN}',
+        'phone': f'{5560000000 + i % 10000000}',
+        'is_doctor': True,
+        'specialization': specializations[i % len(specializations)],
+        'work_start': time(9, 0),
+        'work_end': time(17, 0),
+        'slot_minutes': 30,
+        'work_days': '0,1,2,3,4'
+    } for i in range(1, doctors + 1)), chunk_size)
+
+    # Ids of the rows just inserted, in email order
+    patient_ids = [row.id for row in db.session.execute(
+        db.select(Patient.id).where(Patient.email.like(f'%@{SYNTHETIC_DOMAIN}')).order_by(Patient.id))]
+    doctor_ids = [row.id for row in db.session.execute(
+        db.select(Doctor.id).where(Doctor.email.like(f'%@{SYNTHETIC_DOMAIN}')).order_by(Doctor.id))]
+    if not appointments or not doctor_ids or not patient_ids:
+        return
+
+    # Busier doctors get up to three times the appointments of quieter ones
+    weights = [rng.uniform(0.5, 1.5) for _ in doctor_ids]
+    total = sum(weights)
+    counts = [int(appointments * weight / total) for weight in weights]
+    for i in range(appointments - sum(counts)):
+        counts[i % len(counts)] += 1
+
+    # Enough weekday slots for the busiest doctor at SLOT_FILL, centred on today
+    slot_length = timedelta(minutes=30)
+    slots_per_day = 16
+    days = -(-max(counts) // int(slots_per_day * SLOT_FILL)) + 1
+    monday = datetime.combine((now - timedelta(days=now.weekday())).date(), time(9, 0))
+    start = monday - timedelta(weeks=days // 10)
+
+    # COPY skips column defaults, so change sequence numbers are handed out here
+    first_change_seq = db.session.scalar(db.select(next_change_seq()))
+    change_seqs = itertools.count(first_change_seq)
+
+    def appointment_rows():
+        for doctor_id, count in zip(doctor_ids, counts):
+            for appointment_time in appointment_times(rng, count, days * slots_per_day, start, slots_per_day, slot_length):
+                roll = rng.random()
+                if appointment_time < now:
+                    status = 'canceled' if roll < 0.1 else 'completed'
+                else:
+                    status = 'canceled' if roll < 0.08 else 'scheduled'
+                yield {
+                    'doctor_id': doctor_id,
+                    # Low patient numbers visit more often
+                    'patient_id': patient_ids[int(len(patient_ids) * rng.random() ** 2)],
+                    'appointment_time': appointment_time,
+                    'status': status,
+                    'notes': NOTES[int(roll * 100) % len(NOTES)] if roll < 0.2 else '',
+                    'change_seq': next(change_seqs),
+                    'updated_at': now
+                }
+
+    bulk_insert(Appointment, appointment_rows(), chunk_size)
+    if db.engine.dialect.name == 'postgresql':
+        db.session.execute(db.select(db.func.setval(change_sequence.name, next(change_seqs))))
+    # Bulk inserts skip the ORM events that keep the rollups current
+    UtilizationRollup.rebuild()
+
 if __name__ == '__main__':
-    with app.app_context():
-        seed_database()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description='Seed the database with sample or synthetic data.')
+    parser.add_argument('--patients', type=int, default=0, help='Synthetic patients to create')
+    parser.add_argument('--doctors', type=int, default=0, help='Synthetic doctors to create')
+    parser.add_argument('--appointments', type=int, default=0, help='Synthetic appointments to create')
+    parser.add_argument('--seed', type=int, default=0, help='Random seed for synthetic data')
+    parser.add_argument('--chunk-size', type=int, default=10000, help='Rows per bulk insert')
+    args = parser.parse_args()
+
+    from app import create_app
+    with create_app().app_context():
+        if args.patients or args.doctors or args.appointments:
+            started = clock.perf_counter()
+            seed_synthetic(args.patients, args.doctors, args.appointments, seed=args.seed, chunk_size=args.chunk_size)
+            print(f"Synthetic data seeded in {clock.perf_counter() - started:.1f}s")
+        else:
+            seed_database()
@@ -0,0 +1,16 @@
+# serve_async.py
+from async_mode import enable_async_mode
+enable_async_mode()
+
+import os
+from gevent.pool import Pool
+from gevent.pywsgi import WSGIServer
+from wsgi import app
+
+if __name__ == '__main__':
+    host = os.getenv('HOST', '0.0.0.0')
+    port = int(os.getenv('PORT', '5000'))
+    # Cap concurrent connections per process, each one is a greenlet
+    pool = Pool(app.config['ASYNC_MAX_CONNECTIONS'])
+    print(f"Serving in async mode on {host}:{port}")
+    WSGIServer((host, port), app, spawn=pool).serve_forever()
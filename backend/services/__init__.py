@@ -0,0 +1,17 @@
+from .availability import AvailabilityIndex, availability_index
+from .pagination import paginate, paginate_rows, page_response, encode_cursor, decode_cursor
+from .identity import IdentityCache, identity_cache, get_current_patient
+from .response_cache import ResponseCache, response_cache, cached_response
+from .metrics import Metrics, metrics, init_metrics
+from .replica import RecentWrites, recent_writes, read_replica
+from .serialization import appointment_columns, serialize_appointments, json_response, encode_json, format_time
+from .export import export_appointments, EXPORT_FORMATS
+from .filters import appointment_filters, appointment_window
+from .recurrence import series_occurrences
+from .waitlist import WaitlistIndex, waitlist_index, backfill_slot
+from .concurrency import expected_version, version_etag, retry_on_conflict
+from .doctor_search import DoctorSearchIndex, doctor_search_index, search_doctors, DOCTOR_FIELDS
+from .schedule_cache import ScheduleCache, schedule_cache, LocalLRUBackend, MemoryKVBackend, RedisBackend
+from .utilization import utilization_report, GROUP_BY
+from .changes import appointment_changes, ResyncRequired, CHANGE_FIELDS
+from .schedule_stream import ScheduleBroker, schedule_broker, sse_events, BrokerFull, LocalRelay, MemoryRelay, RedisRelay
@@ -0,0 +1,108 @@
+# services/availability.py
+import threading
+import time
+from bisect import bisect_left, bisect_right, insort
+from datetime import timedelta
+from flask import current_app
+from models import Appointment
+
+class AvailabilityIndex:
+    """In-memory index of scheduled appointment start times, per doctor.
+
+    Each doctor's bookings are loaded once from the appointment table and kept
+    as a sorted list of (appointment_time, appointment_id), so free-slot queries
+    are answered with bisect instead of re-scanning the table. The routes keep
+    it current on create, update and cancel. Entries are reloaded after
+    AVAILABILITY_INDEX_TTL seconds so writes made by other worker processes
+    are picked up eventually; booking itself is still guarded by the database.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._bookings = {}  # doctor_id -> sorted list of (appointment_time, appointment_id)
+        self._loaded_at = {}  # doctor_id -> monotonic load time
+        self._appointments = {}  # appointment_id -> (doctor_id, appointment_time)
+
+    def clear(self):
+        with self._lock:
+            self._bookings.clear()
+            self._loaded_at.clear()
+            self._appointments.clear()
+
+    def _load(self, doctor_id):
+        rows = Appointment.query.with_entities(Appointment.appointment_time, Appointment.id).filter_by(
+            doctor_id=doctor_id,
+            status='scheduled'
+        ).all()
+        bookings = sorted((row.appointment_time, row.id) for row in rows)
+
+        with self._lock:
+            for appointment_id, (owner, _) in list(self._appointments.items()):
+                if owner == doctor_id:
+                    del self._appointments[appointment_id]
+            for appointment_time, appointment_id in bookings:
+                self._appointments[appointment_id] = (doctor_id, appointment_time)
+            self._bookings[doctor_id] = bookings
+            self._loaded_at[doctor_id] = time.monotonic()
+
+    def _ensure_loaded(self, doctor_id):
+        ttl = current_app.config.get('AVAILABILITY_INDEX_TTL', 60)
+        loaded_at = self._loaded_at.get(doctor_id)
+        if loaded_at is None or (ttl and time.monotonic() - loaded_at > ttl):
+            self._load(doctor_id)
+
+    def _remove(self, appointment_id):
+        entry = self._appointments.pop(appointment_id, None)
+        if entry is None:
+            return
+        doctor_id, appointment_time = entry
+        bookings = self._bookings.get(doctor_id)
+        if bookings is not None:
+            i = bisect_left(bookings, (appointment_time, appointment_id))
+            if i < len(bookings) and bookings[i] == (appointment_time, appointment_id):
+                del bookings[i]
+
+    def book(self, appointment_id, doctor_id, appointment_time):
+        """Record a scheduled appointment, replacing any previous time it had."""
+        with self._lock:
+            self._remove(appointment_id)
+            # Doctors that were never queried are loaded on first use instead
+            if doctor_id in self._bookings:
+                insort(self._bookings[doctor_id], (appointment_time, appointment_id))
+                self._appointments[appointment_id] = (doctor_id, appointment_time)
+
+    def release(self, appointment_id):
+        """Forget an appointment that was canceled or deleted."""
+        with self._lock:
+            self._remove(appointment_id)
+
+    def free_slots(self, doctor, start, end, booked=()):
+        """Return the free slot start times for a doctor between two datetimes.
+
+        `booked` adds start times that are not appointment rows, such as
+        recurring series occurrences expanded for the window."""
+        self._ensure_loaded(doctor.id)
+        length = timedelta(minutes=doctor.slot_minutes)
+
+        with self._lock:
+            bookings = list(self._bookings[doctor.id])
+        # Only bookings that can overlap the window matter
+        lo = bisect_right(bookings, (start - length,))
+        hi = bisect_left(bookings, (end,))
+        booked = sorted([appointment_time for appointment_time, _ in bookings[lo:hi]] + list(booked))
+
+        free = []
+        day = start.date()
+        while day <= end.date():
+            for slot in doctor.get_slot_times(day):
+                if slot < start or slot + length > end:
+                    continue
+                # A booking overlaps the slot if it starts within (slot - length, slot + length)
+                i = bisect_right(booked, slot - length)
+                if i < len(booked) and booked[i] < slot + length:
+                    continue
+                free.append(slot)
+            day += timedelta(days=1)
+        return free
+
+availability_index = AvailabilityIndex()
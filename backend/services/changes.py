@@ -0,0 +1,81 @@
+# services/changes.py
+import base64
+import json
+from datetime import datetime, timedelta
+from flask import current_app
+from models import db, Appointment, AppointmentTombstone
+from .pagination import encode_cursor
+from .serialization import appointment_columns, serialize_appointments
+
+# Fields of each changed appointment, the listing's plus its place in the change sequence
+CHANGE_FIELDS = ('id', 'doctor_id', 'patient_id', 'appointment_time', 'status', 'version', 'change_seq')
+
+class ResyncRequired(Exception):
+    """The client's copy can't be brought up to date with a delta, it must fetch the full list again."""
+
+def decode_token(token):
+    """Decode a sync token into (change_seq, issued_at), ValueError when it is malformed."""
+    try:
+        seq, issued_at = json.loads(base64.urlsafe_b64decode(token.encode('ascii')))
+        return int(seq), datetime.fromisoformat(issued_at)
+    except (ValueError, TypeError, UnicodeError):
+        raise ValueError("Invalid sync token")
+
+def _participant(model, user_id):
+    return (model.patient_id == user_id) | (model.doctor_id == user_id)
+
+def _low_watermark(seq, issued_at):
+    # A write can get its sequence number before a read and commit after it, so
+    # a token doesn't prove the client saw everything below its number. Any
+    # such write was flushed within CHANGES_GRACE_SECONDS of the token being
+    # issued: go back to the lowest number written in that window
+    grace = timedelta(seconds=current_app.config['CHANGES_GRACE_SECONDS'])
+    low, high = issued_at - grace, issued_at + grace
+    lowest = [
+        db.session.scalar(db.select(db.func.min(Appointment.change_seq)).where(Appointment.updated_at.between(low, high))),
+        db.session.scalar(db.select(db.func.min(AppointmentTombstone.change_seq)).where(AppointmentTombstone.deleted_at.between(low, high)))
+    ]
+    return min([seq] + [value - 1 for value in lowest if value is not None])
+
+def appointment_changes(user_id, token=None):
+    """The user's appointments changed and deleted since `token`, and the token to ask with next.
+
+    Without a token nothing is returned but the token for the user's current
+    state, to be taken before fetching the full list. Rows around the
+    token's boundary may be sent twice; clients keep the highest version of
+    each appointment. Raises ResyncRequired when the token is older than the
+    tombstones kept or more than CHANGES_MAX_ROWS changed, and ValueError
+    when the token is malformed.
+    """
+    issued_at = datetime.now()
+    max_rows = current_app.config['CHANGES_MAX_ROWS']
+    if token is None:
+        seq = max(
+            db.session.scalar(db.select(db.func.max(Appointment.change_seq)).where(_participant(Appointment, user_id))) or 0,
+            db.session.scalar(db.select(db.func.max(AppointmentTombstone.change_seq)).where(_participant(AppointmentTombstone, user_id))) or 0
+        )
+        return {'changes': [], 'deleted': [], 'token': encode_cursor([seq, issued_at])}
+
+    seq, token_issued_at = decode_token(token)
+    if token_issued_at < issued_at - timedelta(days=current_app.config['CHANGES_RETENTION_DAYS']):
+        raise ResyncRequired("Sync token expired, fetch the full list again")
+    since = _low_watermark(seq, token_issued_at)
+
+    rows = appointment_columns(
+        Appointment.query.filter(_participant(Appointment, user_id), Appointment.change_seq > since),
+        CHANGE_FIELDS
+    ).order_by(Appointment.change_seq).limit(max_rows + 1).all()
+    deleted = db.session.execute(
+        db.select(AppointmentTombstone.appointment_id, AppointmentTombstone.change_seq)
+        .where(_participant(AppointmentTombstone, user_id), AppointmentTombstone.change_seq > since)
+        .order_by(AppointmentTombstone.change_seq).limit(max_rows + 1)
+    ).all()
+    if len(rows) + len(deleted) > max_rows:
+        raise ResyncRequired("Too many changes since the sync token, fetch the full list again")
+
+    seq = max([seq] + [row.change_seq for row in rows] + [row.change_seq for row in deleted])
+    return {
+        'changes': serialize_appointments(rows, CHANGE_FIELDS, now=issued_at),
+        'deleted': [{'id': row.appointment_id, 'change_seq': row.change_seq} for row in deleted],
+        'token': encode_cursor([seq, issued_at])
+    }
@@ -0,0 +1,50 @@
+# services/concurrency.py
+import random
+import time
+from flask import current_app
+from models import db, VersionConflict
+
+def expected_version(headers, data=None):
+    """The appointment version a client based its write on.
+
+    Read from the If-Match header (an ETag from a previous response, "*"
+    meaning any version) or else from a `version` field in the body. Returns
+    None when the client sent neither, and raises ValueError when the value
+    is not a version number.
+    """
+    value = headers.get('If-Match')
+    if value:
+        value = value.strip()
+        if value == '*':
+            return None
+        if value.startswith('W/'):
+            value = value[2:]
+        value = value.strip('"')
+    elif data and data.get('version') is not None:
+        value = data['version']
+    else:
+        return None
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise ValueError("Invalid version")
+
+def version_etag(version):
+    return f'"{version}"'
+
+def retry_on_conflict(operation, attempts=None):
+    """Run `operation` again when its compare-and-swap loses to a concurrent writer.
+
+    `operation` must re-read the rows it changes every time it runs. After
+    OPTIMISTIC_RETRY_ATTEMPTS tries, with short jittered sleeps in between,
+    the last VersionConflict is raised to the caller.
+    """
+    attempts = attempts or current_app.config['OPTIMISTIC_RETRY_ATTEMPTS']
+    for attempt in range(attempts):
+        try:
+            return operation()
+        except VersionConflict:
+            db.session.rollback()
+            if attempt + 1 >= attempts:
+                raise
+            time.sleep(random.uniform(0, 0.01 * 2 ** attempt))
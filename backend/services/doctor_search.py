@@ -0,0 +1,205 @@
+# services/doctor_search.py
+import heapq
+import re
+import threading
+import time
+from bisect import bisect_left, insort
+from collections import Counter, defaultdict
+from flask import current_app
+from sqlalchemy import event
+from sqlalchemy.orm import Session, object_session
+from models import db, Doctor
+
+# Fields each search result returns, like /api/doctors
+DOCTOR_FIELDS = ('id', 'name', 'email', 'phone', 'specialization')
+# Share of a query term's trigrams a token needs for a fuzzy match
+TRIGRAM_THRESHOLD = 0.5
+
+def tokenize(text):
+    return re.findall(r'[a-z0-9]+', (text or '').lower())
+
+def trigrams(token):
+    padded = f'  {token} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+class DoctorSearchIndex:
+    """In-memory prefix and trigram index over doctor names and specializations.
+
+    Used when the database has no trigram index of its own (SQLite). Every
+    word of a doctor's name and specialization goes into a sorted token list,
+    searched with bisect for prefix matches, and into trigram postings, used
+    for typo-tolerant matches. The index is loaded on first use, patched
+    after every commit that writes a Doctor, and rebuilt after
+    DOCTOR_SEARCH_INDEX_TTL seconds to pick up writes from other worker
+    processes and bulk loads that skip the ORM.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._loaded_at = None
+        self._doctors = {}  # doctor_id -> row tuple in DOCTOR_FIELDS order
+        self._tokens = []  # sorted list of (token, doctor_id)
+        self._trigrams = defaultdict(set)  # trigram -> doctor ids
+        self._specializations = defaultdict(set)  # lowercased specialization -> doctor ids
+
+    def clear(self):
+        with self._lock:
+            self._loaded_at = None
+            self._clear()
+
+    def _clear(self):
+        self._doctors.clear()
+        self._tokens.clear()
+        self._trigrams.clear()
+        self._specializations.clear()
+
+    @staticmethod
+    def _doctor_tokens(row):
+        return set(tokenize(row[1])) | set(tokenize(row[4]))
+
+    def _add(self, row):
+        # Caller holds the lock
+        doctor_id = row[0]
+        self._remove(doctor_id)
+        self._doctors[doctor_id] = row
+        for token in self._doctor_tokens(row):
+            insort(self._tokens, (token, doctor_id))
+            for trigram in trigrams(token):
+                self._trigrams[trigram].add(doctor_id)
+        if row[4]:
+            self._specializations[row[4].lower()].add(doctor_id)
+
+    def _remove(self, doctor_id):
+        # Caller holds the lock
+        row = self._doctors.pop(doctor_id, None)
+        if row is None:
+            return
+        for token in self._doctor_tokens(row):
+            i = bisect_left(self._tokens, (token, doctor_id))
+            if i < len(self._tokens) and self._tokens[i] == (token, doctor_id):
+                del self._tokens[i]
+            for trigram in trigrams(token):
+                self._trigrams[trigram].discard(doctor_id)
+        if row[4]:
+            self._specializations[row[4].lower()].discard(doctor_id)
+
+    def _load(self):
+        rows = db.session.execute(db.select(*[getattr(Doctor, field) for field in DOCTOR_FIELDS])).all()
+        with self._lock:
+            self._clear()
+            # Build the token list in one sort instead of inserting row by row
+            tokens = []
+            for row in rows:
+                row = tuple(row)
+                self._doctors[row[0]] = row
+                for token in self._doctor_tokens(row):
+                    tokens.append((token, row[0]))
+                    for trigram in trigrams(token):
+                        self._trigrams[trigram].add(row[0])
+                if row[4]:
+                    self._specializations[row[4].lower()].add(row[0])
+            tokens.sort()
+            self._tokens[:] = tokens
+            self._loaded_at = time.monotonic()
+
+    def _ensure_loaded(self):
+        ttl = current_app.config.get('DOCTOR_SEARCH_INDEX_TTL', 300)
+        if self._loaded_at is None or (ttl and time.monotonic() - self._loaded_at > ttl):
+            self._load()
+
+    def apply(self, changes):
+        """Patch the index with committed writes, (doctor_id, row or None for deleted)."""
+        with self._lock:
+            if self._loaded_at is None:
+                return  # Loaded with the committed rows on first use
+            for doctor_id, row in changes:
+                if row is None:
+                    self._remove(doctor_id)
+                else:
+                    self._add(row)
+
+    def _term_scores(self, term, limit):
+        # Exact token 3, prefix 2, fuzzy the share of matching trigrams. Fuzzy
+        # matching is a fallback for terms with fewer than `limit` prefix hits,
+        # common terms already have better candidates than any typo match
+        tokens = self._tokens
+        # Tokens are [a-z0-9]+ and '{' sorts after 'z', so term + '{' bounds every token starting with term
+        lo = bisect_left(tokens, (term,))
+        exact_end = bisect_left(tokens, (term, float('inf')), lo)
+        hi = bisect_left(tokens, (term + '{',), exact_end)
+        scores = dict.fromkeys((doctor_id for _, doctor_id in tokens[exact_end:hi]), 2)
+        scores.update(dict.fromkeys((doctor_id for _, doctor_id in tokens[lo:exact_end]), 3))
+        if len(term) >= 3 and len(scores) < limit:
+            grams = trigrams(term)
+            counts = Counter()
+            for trigram in grams:
+                counts.update(self._trigrams.get(trigram, ()))
+            for doctor_id, count in counts.items():
+                similarity = count / len(grams)
+                if similarity >= TRIGRAM_THRESHOLD and doctor_id not in scores:
+                    scores[doctor_id] = similarity
+        return scores
+
+    def search(self, q, specialization, limit):
+        """Top `limit` doctors matching every word of `q`, best first, as rows in DOCTOR_FIELDS order."""
+        self._ensure_loaded()
+        terms = tokenize(q)
+        with self._lock:
+            allowed = self._specializations.get(specialization.lower(), set()) if specialization else None
+            if terms:
+                scores = None
+                for term in terms:
+                    term_scores = self._term_scores(term, limit)
+                    if scores is None:
+                        scores = term_scores
+                    else:
+                        scores = {doctor_id: score + term_scores[doctor_id] for doctor_id, score in scores.items() if doctor_id in term_scores}
+                if allowed is not None:
+                    scores = {doctor_id: score for doctor_id, score in scores.items() if doctor_id in allowed}
+            else:
+                scores = dict.fromkeys(allowed or (), 0)
+            doctors = self._doctors
+            best = heapq.nsmallest(limit, scores.items(), key=lambda item: (-item[1], doctors[item[0]][1], item[0]))
+            return [doctors[doctor_id] for doctor_id, _ in best]
+
+doctor_search_index = DoctorSearchIndex()
+
+def search_doctors(q, specialization=None, limit=20):
+    """Ranked doctor search, with the trigram indexes on Postgres and doctor_search_index elsewhere."""
+    if db.engine.dialect.name != 'postgresql':
+        return doctor_search_index.search(q, specialization, limit)
+
+    name = db.func.lower(Doctor.name)
+    query = db.select(*[getattr(Doctor, field) for field in DOCTOR_FIELDS])
+    score = db.literal(0.0)
+    for term in tokenize(q):
+        # Served by the ix_doctor_name_trgm / ix_doctor_specialization_trgm GIN indexes
+        query = query.where(
+            name.like(f'%{term}%') | db.func.lower(Doctor.specialization).like(f'{term}%') | db.literal(term).op('<%')(name)
+        )
+        score = score + db.func.word_similarity(term, name) + db.case((name.like(f'{term}%'), 1), else_=0)
+    if specialization:
+        query = query.where(db.func.lower(Doctor.specialization) == specialization.lower())
+    rows = db.session.execute(query.order_by(score.desc(), Doctor.name, Doctor.id).limit(limit))
+    return [tuple(row) for row in rows]
+
+# Collect doctor writes at flush time and patch the search index once they are committed
+@event.listens_for(Doctor, 'after_insert')
+@event.listens_for(Doctor, 'after_update')
+def _record_doctor_write(mapper, connection, doctor):
+    row = tuple(getattr(doctor, field) for field in DOCTOR_FIELDS)
+    object_session(doctor).info.setdefault('doctor_search_writes', []).append((doctor.id, row))
+
+@event.listens_for(Doctor, 'after_delete')
+def _record_doctor_delete(mapper, connection, doctor):
+    object_session(doctor).info.setdefault('doctor_search_writes', []).append((doctor.id, None))
+
+@event.listens_for(Session, 'after_commit')
+def _apply_committed_doctor_writes(session):
+    changes = session.info.pop('doctor_search_writes', None)
+    if changes:
+        doctor_search_index.apply(changes)
+
+@event.listens_for(Session, 'after_rollback')
+def _forget_rolled_back_doctor_writes(session):
+    session.info.pop('doctor_search_writes', None)
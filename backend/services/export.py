@@ -0,0 +1,56 @@
+# services/export.py
+import csv
+import io
+import logging
+from datetime import datetime
+from models import db, Appointment
+from .serialization import encode_json, serialize_appointments, EXPORT_APPOINTMENT_FIELDS
+
+# Response content types per export format
+EXPORT_FORMATS = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv'
+}
+
+def _encode_ndjson(items):
+    return b''.join(encode_json(item) + b'\n' for item in items)
+
+def _encode_csv(items, fields, header=False):
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=fields)
+    if header:
+        writer.writeheader()
+    writer.writerows(items)
+    return buffer.getvalue().encode('utf-8')
+
+def export_appointments(filters, export_format, chunk_size, fields=EXPORT_APPOINTMENT_FIELDS):
+    """Return a generator of encoded chunks for an appointment export of `fields`.
+
+    The query runs right away, so it uses the database the view picked (see
+    read_replica). Rows are then read through a server-side cursor
+    `chunk_size` at a time, so memory use doesn't depend on the size of the
+    export. Closing the generator early (the client went away) closes the
+    cursor.
+    """
+    statement = (
+        db.select(*[getattr(Appointment, field) for field in fields])
+        .where(*filters)
+        .order_by(Appointment.appointment_time, Appointment.id)
+        .execution_options(yield_per=chunk_size)
+    )
+    return _stream(db.session.execute(statement), export_format, fields)
+
+def _stream(result, export_format, fields):
+    rows = 0
+    try:
+        if export_format == 'csv':
+            yield _encode_csv([], fields, header=True)
+        for partition in result.partitions():
+            items = serialize_appointments(partition, fields, now=datetime.now())
+            rows += len(items)
+            yield _encode_csv(items, fields) if export_format == 'csv' else _encode_ndjson(items)
+    except GeneratorExit:
+        logging.info(f"Appointment export aborted by the client after {rows} rows")
+        raise
+    finally:
+        result.close()
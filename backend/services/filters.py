@@ -0,0 +1,45 @@
+# services/filters.py
+from datetime import datetime, timedelta
+from models import Appointment
+from validators import validate_date, validate_appointment_status
+
+def appointment_window(args):
+    """Parse the from, to and status query parameters into (start, end, status).
+
+    `from` and `to` are inclusive dates and become a half-open datetime range,
+    either end is None when the parameter is missing. Raises ValueError with a
+    message for the client when a parameter is invalid.
+    """
+    start = end = None
+    if args.get('from'):
+        is_valid, message = validate_date(args['from'])
+        if not is_valid:
+            raise ValueError(message)
+        start = datetime.strptime(args['from'], "%Y-%m-%d")
+    if args.get('to'):
+        is_valid, message = validate_date(args['to'])
+        if not is_valid:
+            raise ValueError(message)
+        end = datetime.strptime(args['to'], "%Y-%m-%d") + timedelta(days=1)
+    if args.get('status'):
+        is_valid, message = validate_appointment_status(args['status'])
+        if not is_valid:
+            raise ValueError(message)
+    return start, end, args.get('status') or None
+
+def appointment_filters(args):
+    """Build appointment predicates from the from, to and status query parameters.
+
+    The date range becomes a half-open range on appointment_time, which the
+    (doctor_id, appointment_time) and (patient_id, appointment_time) indexes
+    can serve. Raises ValueError like appointment_window.
+    """
+    start, end, status = appointment_window(args)
+    filters = []
+    if start is not None:
+        filters.append(Appointment.appointment_time >= start)
+    if end is not None:
+        filters.append(Appointment.appointment_time < end)
+    if status is not None:
+        filters.append(Appointment.status == status)
+    return filters
@@ -0,0 +1,96 @@
+# services/identity.py
+import threading
+import time
+from collections import OrderedDict
+from flask import abort, current_app
+from flask_jwt_extended import get_jwt_identity
+from sqlalchemy import event
+from sqlalchemy.orm import Session, class_mapper, make_transient_to_detached, object_session
+from models import db, Patient
+
+class IdentityCache:
+    """Per-process LRU cache of authenticated patients, keyed by JWT subject.
+
+    Entries hold the patient's column values and expire after
+    IDENTITY_CACHE_TTL seconds. A hit is attached to the request session with
+    merge(load=False), so no SELECT is issued. Patient updates and deletes
+    evict the entry when they are flushed and again after commit.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # patient_id -> (expires_at, column values)
+        self.hits = 0
+        self.misses = 0
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'size': len(self._entries)}
+
+    def invalidate(self, patient_id):
+        with self._lock:
+            self._entries.pop(patient_id, None)
+
+    def _get(self, patient_id):
+        with self._lock:
+            entry = self._entries.get(patient_id)
+            if entry is None or entry[0] < time.monotonic():
+                self._entries.pop(patient_id, None)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(patient_id)
+            self.hits += 1
+            return entry[1]
+
+    def _put(self, patient):
+        values = {column.key: getattr(patient, column.key) for column in Patient.__table__.columns}
+        expires_at = time.monotonic() + current_app.config['IDENTITY_CACHE_TTL']
+        with self._lock:
+            self._entries[patient.id] = (expires_at, values)
+            self._entries.move_to_end(patient.id)
+            while len(self._entries) > current_app.config['IDENTITY_CACHE_SIZE']:
+                self._entries.popitem(last=False)
+
+    def get_patient(self, patient_id):
+        """Return the Patient with this id attached to the current session, or None."""
+        values = self._get(patient_id)
+        if values is not None:
+            # Rebuild a detached instance without running Patient.__init__
+            patient = class_mapper(Patient).class_manager.new_instance()
+            for key, value in values.items():
+                setattr(patient, key, value)
+            make_transient_to_detached(patient)
+            return db.session.merge(patient, load=False)
+
+        patient = db.session.get(Patient, patient_id)
+        if patient is not None:
+            self._put(patient)
+        return patient
+
+identity_cache = IdentityCache()
+
+# Get the patient for the JWT in the current request, or abort with 404
+def get_current_patient():
+    patient = identity_cache.get_patient(int(get_jwt_identity()))
+    if patient is None:
+        abort(404)
+    return patient
+
+# Evict patients as soon as a change is flushed, and again once it is committed
+# so a concurrent request can't re-cache the pre-commit row
+@event.listens_for(Patient, 'after_update')
+@event.listens_for(Patient, 'after_delete')
+def _evict_patient(mapper, connection, patient):
+    identity_cache.invalidate(patient.id)
+    object_session(patient).info.setdefault('evicted_patients', set()).add(patient.id)
+
+@event.listens_for(Session, 'after_commit')
+def _evict_committed_patients(session):
+    for patient_id in session.info.pop('evicted_patients', ()):
+        identity_cache.invalidate(patient_id)
@@ -0,0 +1,141 @@
+# services/metrics.py
+import logging
+import threading
+import time
+from flask import g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Upper bounds of the latency histogram buckets, in seconds
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Upper bounds of the statements-per-request histogram buckets
+STATEMENT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0
+        self.count = 0
+
+    def observe(self, value):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+        self.sum += value
+        self.count += 1
+
+class Metrics:
+    """Per-route request and SQL metrics, rendered in Prometheus text format.
+
+    Requests are labelled by method and URL rule (not the concrete path) so
+    the number of series stays bounded. SQL statements are attributed to the
+    request that issued them through flask.g.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        with self._lock:
+            self.latency = {}  # (method, route) -> Histogram of seconds
+            self.statements = {}  # (method, route) -> Histogram of statements per request
+            self.requests = {}  # (method, route, status) -> count
+            self.db_seconds = {}  # (method, route) -> total seconds spent in the database
+            self.budget_exceeded = {}  # (method, route) -> count
+
+    def record(self, method, route, status, seconds, statements, db_seconds, over_budget):
+        key = (method, route)
+        with self._lock:
+            self.latency.setdefault(key, Histogram(LATENCY_BUCKETS)).observe(seconds)
+            self.statements.setdefault(key, Histogram(STATEMENT_BUCKETS)).observe(statements)
+            self.requests[key + (status,)] = self.requests.get(key + (status,), 0) + 1
+            self.db_seconds[key] = self.db_seconds.get(key, 0) + db_seconds
+            if over_budget:
+                self.budget_exceeded[key] = self.budget_exceeded.get(key, 0) + 1
+
+    def render(self, extra=()):
+        """Render every metric in Prometheus text exposition format.
+
+        `extra` is an iterable of (name, type, help, value) for gauges and
+        counters owned by other components."""
+        lines = []
+
+        def labels(key, *extra_labels):
+            names = ('method', 'route', 'status')[:len(key)]
+            pairs = list(zip(names, key)) + list(extra_labels)
+            return '{' + ','.join(f'{name}="{value}"' for name, value in pairs) + '}'
+
+        def histogram(name, help_text, series):
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} histogram')
+            for key, hist in sorted(series.items()):
+                for bound, count in zip(hist.buckets, hist.counts):
+                    lines.append(f'{name}_bucket{labels(key, ("le", bound))} {count}')
+                lines.append(f'{name}_bucket{labels(key, ("le", "+Inf"))} {hist.count}')
+                lines.append(f'{name}_sum{labels(key)} {hist.sum}')
+                lines.append(f'{name}_count{labels(key)} {hist.count}')
+
+        def counter(name, help_text, series):
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} counter')
+            for key, value in sorted(series.items()):
+                lines.append(f'{name}{labels(key)} {value}')
+
+        with self._lock:
+            histogram('http_request_duration_seconds', 'Request latency by route.', self.latency)
+            counter('http_requests_total', 'Requests by route and status code.', self.requests)
+            histogram('db_statements_per_request', 'SQL statements issued per request.', self.statements)
+            counter('db_query_seconds_total', 'Time spent executing SQL, by route.', self.db_seconds)
+            counter('db_statement_budget_exceeded_total', 'Requests that issued more SQL statements than SQL_STATEMENT_BUDGET.', self.budget_exceeded)
+
+        for name, kind, help_text, value in extra:
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} {kind}')
+            lines.append(f'{name} {value}')
+        return '\n'.join(lines) + '\n'
+
+metrics = Metrics()
+
+# Count every SQL statement and its duration against the current request
+@event.listens_for(Engine, 'before_cursor_execute')
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('query_started', []).append(time.perf_counter())
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info['query_started'].pop()
+    if has_request_context() and 'sql_statements' in g:
+        g.sql_statements += 1
+        g.sql_seconds += elapsed
+
+# A failed statement never reaches after_cursor_execute, drop its start time
+@event.listens_for(Engine, 'handle_error')
+def _handle_error(exception_context):
+    connection = exception_context.connection
+    if connection is not None and connection.info.get('query_started'):
+        connection.info['query_started'].pop()
+
+def init_metrics(app):
+    """Record latency, status and SQL usage for every request to `app`."""
+
+    @app.before_request
+    def start_request_metrics():
+        g.request_started = time.perf_counter()
+        g.sql_statements = 0
+        g.sql_seconds = 0.0
+
+    @app.after_request
+    def record_request_metrics(response):
+        if 'request_started' not in g or request.endpoint == 'api.get_metrics':
+            return response
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        budget = app.config['SQL_STATEMENT_BUDGET']
+        over_budget = budget is not None and g.sql_statements > budget
+        if over_budget:
+            logging.warning(f"{request.method} {route} issued {g.sql_statements} SQL statements "
+                            f"(budget {budget}), possible N+1 query")
+        metrics.record(request.method, route, response.status_code, time.perf_counter() - g.request_started,
+                       g.sql_statements, g.sql_seconds, over_budget)
+        return response
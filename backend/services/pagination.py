@@ -0,0 +1,91 @@
+# services/pagination.py
+import base64
+import json
+from bisect import bisect_right
+from datetime import datetime
+from flask import current_app, request
+from models import db
+from .serialization import json_response
+
+def encode_cursor(values):
+    """Encode the sort key of the last row on a page as an opaque token."""
+    payload = [value.isoformat() if isinstance(value, datetime) else value for value in values]
+    return base64.urlsafe_b64encode(json.dumps(payload).encode('utf-8')).decode('ascii')
+
+def decode_cursor(cursor, columns):
+    """Decode a cursor back into sort key values typed like `columns`."""
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+        if not isinstance(payload, list) or len(payload) != len(columns):
+            raise ValueError
+        return [
+            datetime.fromisoformat(value) if isinstance(column.type, db.DateTime) else int(value)
+            for column, value in zip(columns, payload)
+        ]
+    except (ValueError, TypeError, UnicodeError):
+        raise ValueError("Invalid cursor")
+
+def _page_args(columns):
+    # Page size and decoded cursor (or None) from the request, ValueError when invalid
+    limit = request.args.get('limit', current_app.config['PAGINATION_DEFAULT_LIMIT'])
+    try:
+        limit = int(limit)
+    except ValueError:
+        raise ValueError("Invalid limit")
+    if not 1 <= limit <= current_app.config['PAGINATION_MAX_LIMIT']:
+        raise ValueError(f"Limit must be between 1 and {current_app.config['PAGINATION_MAX_LIMIT']}")
+    cursor = request.args.get('cursor')
+    return limit, decode_cursor(cursor, columns) if cursor else None
+
+def paginate(query, columns, extra=None):
+    """Return one page of `query` and the cursor for the next page.
+
+    Rows are ordered by `columns` (which must end in a unique column) and the
+    page is selected with a keyset predicate on them, so deep pages cost the
+    same as the first one. The page size and cursor come from the `limit` and
+    `cursor` query parameters; ValueError is raised when they are invalid.
+
+    `extra` merges rows that are not stored in the table into the page. It is
+    called with the decoded cursor (or None), the number of rows wanted and
+    the sort key of the last stored row when the stored rows already fill the
+    page (or None), and returns up to that many rows between the two, sorted
+    like the query and exposing the same attributes.
+    """
+    limit, after = _page_args(columns)
+    if after is not None:
+        if len(columns) == 1:
+            query = query.filter(columns[0] > after[0])
+        else:
+            query = query.filter(db.tuple_(*columns) > db.tuple_(*after))
+
+    # Fetch one extra row to know whether there is a next page
+    rows = query.order_by(*columns).limit(limit + 1).all()
+    if extra is not None:
+        def key(row):
+            return tuple(getattr(row, column.key) for column in columns)
+        before = key(rows[-1]) if len(rows) > limit else None
+        rows = sorted(rows + list(extra(after, limit + 1, before)), key=key)[:limit + 1]
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    last = rows[-1]
+    return rows, encode_cursor([getattr(last, column.key) for column in columns])
+
+def paginate_rows(rows, columns):
+    """Like paginate(), for rows already in memory and sorted by `columns`."""
+    limit, after = _page_args(columns)
+
+    def key(row):
+        return tuple(getattr(row, column.key) for column in columns)
+    start = bisect_right([key(row) for row in rows], tuple(after)) if after is not None else 0
+    page = rows[start:start + limit]
+    if start + limit >= len(rows):
+        return page, None
+    return page, encode_cursor(key(page[-1]))
+
+def page_response(data, next_cursor):
+    """JSON list response with the next page cursor in the X-Next-Cursor header."""
+    response = json_response(data)
+    if next_cursor:
+        response.headers['X-Next-Cursor'] = next_cursor
+    return response
@@ -0,0 +1,53 @@
+# services/recurrence.py
+from collections import namedtuple
+from datetime import timedelta
+from functools import lru_cache
+from models import AppointmentSeries
+from .filters import appointment_window
+
+@lru_cache(maxsize=None)
+def _row_type(fields):
+    return namedtuple('OccurrenceRow', fields)
+
+def series_occurrences(series_filters, args, fields):
+    """Build a paginate() `extra` source with the recurring occurrences of a listing.
+
+    Occurrences are expanded lazily, only for the part of the listing's
+    from/to window that the page can reach: from the cursor up to the last
+    stored row of a full page. Rows look like projected appointment rows for
+    `fields` and carry the id of the series' template appointment. Raises
+    ValueError like appointment_window.
+    """
+    start, end, status = appointment_window(args)
+    row_type = _row_type(tuple(fields))
+
+    def rows(after, limit, before):
+        window_start, window_end = start, end
+        if after is not None and (window_start is None or after[0] > window_start):
+            window_start = after[0]
+        if before is not None and (window_end is None or before[0] < window_end):
+            window_end = before[0] + timedelta(minutes=1)
+
+        found = []
+        for series in AppointmentSeries.overlapping(window_start, window_end, *series_filters):
+            for occurrence in series.expand(window_start or series.span_start,
+                                            window_end or series.span_end + timedelta(minutes=1)):
+                if status is not None and occurrence.status != status:
+                    continue
+                if after is not None and (occurrence.appointment_time, series.appointment_id) <= tuple(after):
+                    continue
+                values = {
+                    'id': series.appointment_id,
+                    'doctor_id': series.doctor_id,
+                    'patient_id': series.patient_id,
+                    'appointment_time': occurrence.appointment_time,
+                    'status': occurrence.status,
+                    'notes': occurrence.notes,
+                    # Occurrences are edited through their series, not with If-Match
+                    'version': None
+                }
+                found.append(row_type(*[values[field] for field in fields]))
+        found.sort(key=lambda row: (row.appointment_time, row.id))
+        return found[:limit]
+
+    return rows
@@ -0,0 +1,81 @@
+# services/replica.py
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from flask import current_app, g, has_request_context, request
+from flask_jwt_extended import get_jwt_identity, verify_jwt_in_request
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+# Most clients remembered for read-your-writes
+MAX_TRACKED_WRITERS = 100000
+
+class RecentWrites:
+    """When each client last committed a write, so its reads skip the replica for a while.
+
+    Clients are identified by JWT subject, or by remote address for anonymous
+    requests. The record is per process: it covers the usual replication lag
+    for clients served by the same worker.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._writes = OrderedDict()  # client key -> monotonic time of last write
+
+    def clear(self):
+        with self._lock:
+            self._writes.clear()
+
+    def record(self, key):
+        with self._lock:
+            self._writes[key] = time.monotonic()
+            self._writes.move_to_end(key)
+            while len(self._writes) > MAX_TRACKED_WRITERS:
+                self._writes.popitem(last=False)
+
+    def wrote_within(self, key, seconds):
+        with self._lock:
+            written_at = self._writes.get(key)
+        return written_at is not None and time.monotonic() - written_at < seconds
+
+recent_writes = RecentWrites()
+
+def _client_key():
+    try:
+        verify_jwt_in_request(optional=True)
+        identity = get_jwt_identity()
+    except Exception:
+        identity = None
+    return f'user:{identity}' if identity else f'addr:{request.remote_addr}'
+
+# Let a read-only view query the replica, unless the client wrote within the read-your-writes window
+def read_replica(view):
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        window = current_app.config['REPLICA_READ_AFTER_WRITE_SECONDS']
+        g.use_replica = not recent_writes.wrote_within(_client_key(), window)
+        try:
+            return view(*args, **kwargs)
+        finally:
+            g.pop('use_replica', None)
+    return wrapper
+
+# Remember which requests wrote, and record the client once the write is committed
+@event.listens_for(Session, 'after_flush')
+def _mark_flush_write(session, flush_context):
+    session.info['wrote'] = True
+
+@event.listens_for(Session, 'do_orm_execute')
+def _mark_bulk_write(orm_execute_state):
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        orm_execute_state.session.info['wrote'] = True
+
+@event.listens_for(Session, 'after_commit')
+def _record_committed_write(session):
+    if session.info.pop('wrote', False) and has_request_context():
+        recent_writes.record(_client_key())
+
+@event.listens_for(Session, 'after_rollback')
+def _forget_rolled_back_write(session):
+    session.info.pop('wrote', None)
@@ -0,0 +1,113 @@
+# services/response_cache.py
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from flask import current_app, g, request, make_response
+from sqlalchemy import event
+from sqlalchemy.orm import Session, object_session
+from models import Doctor
+
+class ResponseCache:
+    """Per-process cache of encoded JSON responses for directory endpoints.
+
+    Entries are grouped by namespace and tagged with the namespace's version
+    counter. Bumping the version (done whenever a Doctor row is written)
+    makes every entry in that namespace stale at once. Entries also expire
+    after RESPONSE_CACHE_TTL seconds, which bounds how long other worker
+    processes can serve a response from before a write. At most
+    RESPONSE_CACHE_SIZE entries are kept, least recently used go first.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._versions = {}  # namespace -> version counter
+        self._bumped_at = {}  # namespace -> monotonic time of the last bump
+        self._entries = OrderedDict()  # (namespace, key) -> (version, expires_at, body, headers)
+
+    def clear(self):
+        with self._lock:
+            self._versions.clear()
+            self._bumped_at.clear()
+            self._entries.clear()
+
+    def version(self, namespace):
+        return self._versions.get(namespace, 0)
+
+    def bump(self, namespace):
+        with self._lock:
+            self._versions[namespace] = self._versions.get(namespace, 0) + 1
+            self._bumped_at[namespace] = time.monotonic()
+            for key in [key for key in self._entries if key[0] == namespace]:
+                del self._entries[key]
+
+    def get(self, namespace, key):
+        with self._lock:
+            entry = self._entries.get((namespace, key))
+            if entry is None:
+                return None
+            version, expires_at, body, headers = entry
+            if version != self.version(namespace) or expires_at < time.monotonic():
+                del self._entries[(namespace, key)]
+                return None
+            self._entries.move_to_end((namespace, key))
+            return body, headers
+
+    def put(self, namespace, key, version, body, headers):
+        now = time.monotonic()
+        # A replica may not have caught up with a recent write yet, don't cache what it returned
+        if g.get('use_replica') and now - self._bumped_at.get(namespace, float('-inf')) < current_app.config['REPLICA_READ_AFTER_WRITE_SECONDS']:
+            return
+        expires_at = now + current_app.config['RESPONSE_CACHE_TTL']
+        with self._lock:
+            # Don't store a response built before a concurrent write bumped the version
+            if version == self.version(namespace):
+                self._entries[(namespace, key)] = (version, expires_at, body, headers)
+                self._entries.move_to_end((namespace, key))
+                while len(self._entries) > current_app.config['RESPONSE_CACHE_SIZE']:
+                    self._entries.popitem(last=False)
+
+response_cache = ResponseCache()
+
+# Headers worth replaying from a cached response
+CACHED_HEADERS = ('Content-Type', 'ETag', 'X-Next-Cursor')
+
+# Serve a GET view from the response cache, with a strong ETag and If-None-Match support.
+# Entries are keyed by the path and the query parameters in `params`, the only ones the view reads
+def cached_response(namespace, params=('limit', 'cursor')):
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            key = (request.path,) + tuple(request.args.get(param) for param in params)
+            cached = response_cache.get(namespace, key)
+            if cached is None:
+                version = response_cache.version(namespace)
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+                body = response.get_data()
+                response.set_etag(hashlib.sha256(body).hexdigest())
+                response_cache.put(namespace, key, version, body,
+                                   {key: response.headers[key] for key in CACHED_HEADERS if key in response.headers})
+            else:
+                body, headers = cached
+                response = current_app.response_class(body, status=200, headers=headers)
+            # Let clients keep their copy but always revalidate it
+            response.headers['Cache-Control'] = 'no-cache'
+            return response.make_conditional(request)
+        return wrapper
+    return decorator
+
+# Directory listings change whenever a doctor is written, bump on flush and after commit
+@event.listens_for(Doctor, 'after_insert')
+@event.listens_for(Doctor, 'after_update')
+@event.listens_for(Doctor, 'after_delete')
+def _bump_doctors(mapper, connection, doctor):
+    response_cache.bump('doctors')
+    object_session(doctor).info['doctors_written'] = True
+
+@event.listens_for(Session, 'after_commit')
+def _bump_committed_doctors(session):
+    if session.info.pop('doctors_written', False):
+        response_cache.bump('doctors')
@@ -0,0 +1,290 @@
+# services/schedule_cache.py
+import json
+import random
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from datetime import datetime, timedelta
+from flask import current_app, g
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session, object_session
+from models import db, Appointment, AppointmentSeries, SeriesException
+from .serialization import DOCTOR_APPOINTMENT_FIELDS
+
+try:
+    import redis
+except ImportError:  # redis is optional, only the shared backend needs it
+    redis = None
+
+ScheduleRow = namedtuple('ScheduleRow', DOCTOR_APPOINTMENT_FIELDS)
+
+def _fresh_counter():
+    # Counters start (and restart after expiring) at a random value, so one
+    # that expired can't count up to the generation of a block built before
+    return random.getrandbits(48)
+
+class LocalLRUBackend:
+    """In-process LRU store, the default. Each worker process has its own copy,
+    so it is only exact with a single worker."""
+
+    def __init__(self, max_entries=10000):
+        self._lock = threading.Lock()
+        self._max_entries = max_entries
+        self._values = OrderedDict()  # key -> (value, expires_at)
+        self._counters = {}  # key -> (value, expires_at), never evicted before they expire
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+            self._counters.clear()
+
+    def get_many(self, keys):
+        now = time.monotonic()
+        found = []
+        with self._lock:
+            for key in keys:
+                entry = self._values.get(key) or self._counters.get(key)
+                if entry is None or entry[1] < now:
+                    found.append(None)
+                    continue
+                if key in self._values:
+                    self._values.move_to_end(key)
+                found.append(entry[0])
+        return found
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._values[key] = (value, time.monotonic() + ttl)
+            self._values.move_to_end(key)
+            while len(self._values) > self._max_entries:
+                self._values.popitem(last=False)
+
+    def incr(self, key, ttl):
+        now = time.monotonic()
+        with self._lock:
+            value, expires_at = self._counters.get(key, (None, now))
+            value = value + 1 if value is not None and expires_at >= now else _fresh_counter()
+            self._counters[key] = (value, now + ttl)
+            if len(self._counters) > self._max_entries:
+                for stale in [k for k, (_, expires) in self._counters.items() if expires < now]:
+                    del self._counters[stale]
+            return value
+
+class MemoryKVBackend(LocalLRUBackend):
+    """Stand-in for the shared store in tests: instances built on the same
+    `store` see each other's writes, like worker processes sharing Redis."""
+
+    def __init__(self, store=None, max_entries=10000):
+        super().__init__(max_entries)
+        if store is not None:
+            self._lock, self._values, self._counters = store._lock, store._values, store._counters
+
+class RedisBackend:
+    """Shared key-value store for deployments with several worker processes."""
+
+    def __init__(self, url):
+        if redis is None:
+            raise RuntimeError("SCHEDULE_CACHE_BACKEND=redis needs the redis package")
+        self._client = redis.Redis.from_url(url)
+
+    def clear(self):
+        keys = list(self._client.scan_iter('schedule:*'))
+        if keys:
+            self._client.delete(*keys)
+
+    def get_many(self, keys):
+        return [value.decode('utf-8') if isinstance(value, bytes) else value for value in self._client.mget(keys)]
+
+    def set(self, key, value, ttl):
+        self._client.set(key, value, ex=ttl)
+
+    def incr(self, key, ttl):
+        with self._client.pipeline() as pipe:
+            pipe.set(key, _fresh_counter(), nx=True)
+            pipe.incr(key)
+            pipe.expire(key, ttl)
+            return pipe.execute()[1]
+
+BACKENDS = {
+    'local': lambda config: LocalLRUBackend(config['SCHEDULE_CACHE_SIZE']),
+    'memory': lambda config: MemoryKVBackend(max_entries=config['SCHEDULE_CACHE_SIZE']),
+    'redis': lambda config: RedisBackend(config['SCHEDULE_CACHE_URL']),
+    'none': lambda config: None
+}
+
+class ScheduleCache:
+    """Per-(doctor, date) blocks of a doctor's schedule, behind a pluggable backend.
+
+    A block holds the day's appointment rows and series occurrences, in
+    listing order. Validity is tracked with generation counters instead of
+    deletes: one global, one per doctor and one per doctor-day. Each block
+    records the counters it was built under and is only served while they
+    are unchanged. Writes bump the counters of exactly the days they touch
+    (series changes bump the doctor's, bulk statements the global one), once
+    at flush and again after commit. A block built from pre-commit data is
+    therefore never served once the commit has returned.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._configured = False
+        self._backend = None
+
+    @property
+    def backend(self):
+        """The configured backend, built from SCHEDULE_CACHE_BACKEND on first use. None when disabled."""
+        if not self._configured:
+            with self._lock:
+                if not self._configured:
+                    config = current_app.config
+                    self._backend = BACKENDS[config['SCHEDULE_CACHE_BACKEND']](config)
+                    self._configured = True
+        return self._backend
+
+    def clear(self):
+        if self._backend is not None:
+            self._backend.clear()
+
+    def reset(self, backend=None):
+        """Use `backend` from now on, or rebuild it from the app config on next use when None."""
+        with self._lock:
+            self._backend = backend
+            self._configured = backend is not None
+
+    def cacheable_days(self, start, end):
+        """The dates of a from/to window the cache can serve, or None."""
+        if self.backend is None or start is None or end is None:
+            return None
+        days = (end.date() - start.date()).days
+        if start != datetime.combine(start.date(), datetime.min.time()) or not 1 <= days <= current_app.config['SCHEDULE_CACHE_MAX_DAYS']:
+            return None
+        return [start.date() + timedelta(days=i) for i in range(days)]
+
+    @staticmethod
+    def _counter_keys(doctor_id, days):
+        return ['schedule:gen', f'schedule:gen:{doctor_id}'] + [f'schedule:gen:{doctor_id}:{day.isoformat()}' for day in days]
+
+    def get_days(self, doctor_id, days):
+        """The doctor's schedule rows for the given dates, sorted by (appointment_time, id)."""
+        ttl = current_app.config['SCHEDULE_CACHE_TTL']
+        block_keys = [f'schedule:block:{doctor_id}:{day.isoformat()}' for day in days]
+        values = self.backend.get_many(self._counter_keys(doctor_id, days) + block_keys)
+        counters = [int(value) if value is not None else None for value in values[:len(days) + 2]]
+        blocks = values[len(days) + 2:]
+
+        rows = []
+        for i, day in enumerate(days):
+            generation = [counters[0], counters[1], counters[2 + i]]
+            block = json.loads(blocks[i]) if blocks[i] else None
+            if block is None or block['generation'] != generation:
+                block = {'generation': generation, 'rows': _load_day(doctor_id, day)}
+                self.backend.set(block_keys[i], json.dumps(block), ttl)
+            rows.extend(
+                ScheduleRow(*[datetime.fromisoformat(value) if field == 'appointment_time' else value
+                              for field, value in zip(DOCTOR_APPOINTMENT_FIELDS, row)])
+                for row in block['rows']
+            )
+        return rows
+
+    def invalidate(self, keys):
+        """Bump counters: keys are (doctor_id, date) pairs, (doctor_id, None) or (None, None) for everything."""
+        # Counters outlive the blocks built under them
+        if self.backend is None:
+            return
+        ttl = max(current_app.config['SCHEDULE_CACHE_TTL'] * 2, 86400)
+        for doctor_id, day in keys:
+            if doctor_id is None:
+                self.backend.incr('schedule:gen', ttl)
+            elif day is None:
+                self.backend.incr(f'schedule:gen:{doctor_id}', ttl)
+            else:
+                self.backend.incr(f'schedule:gen:{doctor_id}:{day.isoformat()}', ttl)
+
+schedule_cache = ScheduleCache()
+
+def _load_day(doctor_id, day):
+    """Build one day's block from the primary database, as JSON-ready lists."""
+    start = datetime.combine(day, datetime.min.time())
+    end = start + timedelta(days=1)
+    # Blocks are served to every later reader, so replica lag must not end up in one
+    use_replica = g.pop('use_replica', None)
+    try:
+        rows = [tuple(row) for row in db.session.execute(
+            db.select(*[getattr(Appointment, field) for field in DOCTOR_APPOINTMENT_FIELDS])
+            .where(Appointment.doctor_id == doctor_id, Appointment.appointment_time >= start, Appointment.appointment_time < end)
+            .order_by(Appointment.appointment_time, Appointment.id)
+        )]
+        for series in AppointmentSeries.overlapping(start, end, AppointmentSeries.doctor_id == doctor_id):
+            for occurrence in series.expand(start, end):
+                values = {'id': series.appointment_id, 'patient_id': series.patient_id,
+                          'appointment_time': occurrence.appointment_time, 'status': occurrence.status}
+                rows.append(tuple(values[field] for field in DOCTOR_APPOINTMENT_FIELDS))
+    finally:
+        if use_replica is not None:
+            g.use_replica = use_replica
+    time_index = DOCTOR_APPOINTMENT_FIELDS.index('appointment_time')
+    rows.sort(key=lambda row: (row[time_index], row[0]))
+    return [[value.isoformat() if isinstance(value, datetime) else value for value in row] for row in rows]
+
+def _days_touched(appointment):
+    # The (doctor, date) the row is in now and was in before this flush
+    state = inspect(appointment)
+    keys = set()
+    for doctor_id in state.attrs.doctor_id.history.sum():
+        for appointment_time in state.attrs.appointment_time.history.sum():
+            if doctor_id is not None and appointment_time is not None:
+                keys.add((doctor_id, appointment_time.date()))
+    return keys or {(appointment.doctor_id, appointment.appointment_time.date())}
+
+def _record(session, keys):
+    session.info.setdefault('schedule_flushed', set()).update(keys)
+    session.info.setdefault('schedule_writes', set()).update(keys)
+
+# Bump the touched days once per flush, and again after commit
+@event.listens_for(Appointment, 'after_insert')
+@event.listens_for(Appointment, 'after_update')
+@event.listens_for(Appointment, 'after_delete')
+def _appointment_written(mapper, connection, appointment):
+    _record(object_session(appointment), _days_touched(appointment))
+
+@event.listens_for(AppointmentSeries, 'after_insert')
+@event.listens_for(AppointmentSeries, 'after_update')
+@event.listens_for(AppointmentSeries, 'after_delete')
+def _series_written(mapper, connection, series):
+    _record(object_session(series), {(series.doctor_id, None)})
+
+@event.listens_for(SeriesException, 'after_insert')
+@event.listens_for(SeriesException, 'after_update')
+@event.listens_for(SeriesException, 'after_delete')
+def _series_exception_written(mapper, connection, exception):
+    doctor_id = exception.series.doctor_id if exception.series is not None else None
+    _record(object_session(exception), {(doctor_id, None)})
+
+@event.listens_for(Session, 'do_orm_execute')
+def _bulk_schedule_write(orm_execute_state):
+    # Bulk statements don't say which days they touch, unless they record them
+    # in the session's schedule_writes themselves (records_schedule_days)
+    if orm_execute_state.execution_options.get('records_schedule_days'):
+        return
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        mapper = orm_execute_state.bind_mapper
+        if mapper is not None and mapper.class_ in (Appointment, AppointmentSeries, SeriesException):
+            schedule_cache.invalidate({(None, None)})
+            orm_execute_state.session.info.setdefault('schedule_writes', set()).add((None, None))
+
+@event.listens_for(Session, 'after_flush')
+def _bump_flushed_schedules(session, flush_context):
+    keys = session.info.pop('schedule_flushed', None)
+    if keys:
+        schedule_cache.invalidate(keys)
+
+@event.listens_for(Session, 'after_commit')
+def _bump_committed_schedules(session):
+    keys = session.info.pop('schedule_writes', None)
+    if keys:
+        schedule_cache.invalidate(keys)
+
+@event.listens_for(Session, 'after_rollback')
+def _forget_rolled_back_schedules(session):
+    session.info.pop('schedule_flushed', None)
+    session.info.pop('schedule_writes', None)
@@ -0,0 +1,287 @@
+# services/schedule_stream.py
+import json
+import logging
+import os
+import threading
+import time
+from collections import defaultdict, deque
+from flask import current_app
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session, object_session
+from models import Appointment, AppointmentSeries, SeriesException
+from .serialization import APPOINTMENT_FIELDS, DOCTOR_APPOINTMENT_FIELDS, encode_json, format_time
+
+try:
+    import redis
+except ImportError:  # redis is optional, only the shared relay needs it
+    redis = None
+
+# Redis channel the workers relay committed schedule events through
+CHANNEL = 'schedule:events'
+
+class BrokerFull(Exception):
+    """This process already holds as many open streams as it is allowed."""
+
+class Subscription:
+    """One open stream's queue of pending events.
+
+    Waiting uses threading.Event, which serve_async.py's patches turn into a
+    gevent event: an idle subscriber is a parked greenlet, not a thread.
+    When more than `max_pending` events pile up the client has fallen behind,
+    the queue is dropped and the stream asks it to resync instead.
+    """
+
+    def __init__(self, topics, max_pending):
+        self.topics = topics
+        self.overflowed = False
+        self._max_pending = max_pending
+        self._pending = deque()
+        self._wake = threading.Event()
+
+    def push(self, event_name, data):
+        if len(self._pending) >= self._max_pending:
+            self.overflowed = True
+            self._pending.clear()
+        elif not self.overflowed:
+            self._pending.append((event_name, data))
+        self._wake.set()
+
+    def wait(self, timeout):
+        """Pending (event, data) pairs, after waiting up to `timeout` seconds for the first."""
+        if not self._pending and not self.overflowed:
+            self._wake.wait(timeout)
+        self._wake.clear()
+        events = []
+        while self._pending:
+            events.append(self._pending.popleft())
+        return events
+
+class LocalRelay:
+    """Delivers events only to this process's subscribers, the default.
+    Exact with a single worker process."""
+
+    def start(self, deliver):
+        self._deliver = deliver
+
+    def publish(self, messages):
+        self._deliver(messages)
+
+class MemoryRelay(LocalRelay):
+    """Stand-in for the shared relay in tests: instances built on the same
+    `hub` deliver to each other, like worker processes sharing Redis."""
+
+    def __init__(self, hub=None):
+        self._listeners = hub._listeners if hub is not None else []
+
+    def start(self, deliver):
+        self._listeners.append(deliver)
+
+    def publish(self, messages):
+        for deliver in list(self._listeners):
+            deliver(messages)
+
+class RedisRelay:
+    """Relays events between worker processes over Redis pub/sub.
+
+    Each process runs one listener thread (a greenlet in async mode) that
+    hands what it receives to the local subscribers, however many there are.
+    """
+
+    def __init__(self, url):
+        if redis is None:
+            raise RuntimeError("STREAM_BROKER=redis needs the redis package")
+        self._client = redis.Redis.from_url(url)
+
+    def start(self, deliver):
+        pubsub = self._client.pubsub(ignore_subscribe_messages=True)
+        pubsub.subscribe(CHANNEL)
+
+        def listen():
+            for message in pubsub.listen():
+                deliver(json.loads(message['data']))
+
+        threading.Thread(target=listen, name='schedule-relay', daemon=True).start()
+
+    def publish(self, messages):
+        self._client.publish(CHANNEL, encode_json(messages))
+
+RELAYS = {
+    'local': lambda config: LocalRelay(),
+    'memory': lambda config: MemoryRelay(),
+    'redis': lambda config: RedisRelay(config['STREAM_BROKER_URL'])
+}
+
+class ScheduleBroker:
+    """Fans committed appointment events out to open schedule streams.
+
+    Subscribers follow topics: ('doctor', id) for a doctor's schedule and
+    ('patient', id) for a patient's own appointments. Doctor topics get the
+    fields of the doctor schedule listing, patient topics those of the
+    appointment listing. Events are published once the writing transaction
+    commits (see the session events below), through a relay so that with a
+    shared relay every worker's subscribers hear about every write.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = defaultdict(set)  # topic -> set of Subscription
+        self._count = 0
+        self._relay = None
+        self._relay_pid = None
+
+    @property
+    def relay(self):
+        """The configured relay, built from STREAM_BROKER and started on first use in each process."""
+        # A relay started before a fork (a preloading master) doesn't listen in the worker
+        if self._relay_pid != os.getpid():
+            with self._lock:
+                if self._relay_pid != os.getpid():
+                    relay = RELAYS[current_app.config['STREAM_BROKER']](current_app.config)
+                    relay.start(self.deliver)
+                    self._relay, self._relay_pid = relay, os.getpid()
+        return self._relay
+
+    @property
+    def subscribers(self):
+        return self._count
+
+    def clear(self):
+        with self._lock:
+            self._subscribers.clear()
+            self._count = 0
+
+    def reset(self, relay=None):
+        """Use `relay` from now on, or rebuild it from the app config on next use when None."""
+        with self._lock:
+            if relay is not None:
+                relay.start(self.deliver)
+            self._relay = relay
+            self._relay_pid = os.getpid() if relay is not None else None
+
+    def subscribe(self, topics, limit, max_pending=100):
+        """Open a Subscription to `topics`, BrokerFull when `limit` streams are already open."""
+        self.relay  # Listen to the other workers before the first event can arrive
+        subscription = Subscription(topics, max_pending)
+        with self._lock:
+            if self._count >= limit:
+                raise BrokerFull("Too many open streams, try again later")
+            self._count += 1
+            for topic in topics:
+                self._subscribers[topic].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            removed = False
+            for topic in subscription.topics:
+                subscribers = self._subscribers.get(topic)
+                if subscribers and subscription in subscribers:
+                    subscribers.discard(subscription)
+                    removed = True
+                    if not subscribers:
+                        del self._subscribers[topic]
+            if removed:
+                self._count -= 1
+
+    def publish(self, messages):
+        # The write is already committed: a lost event costs the clients a
+        # delta sync, it mustn't fail the request
+        try:
+            self.relay.publish(messages)
+        except Exception as e:
+            logging.error(f"Error publishing schedule events: {e}")
+
+    def deliver(self, messages):
+        """Hand relayed messages to this process's subscribers of their doctor and patient."""
+        for message in messages:
+            for topic, fields in ((('doctor', message['doctor_id']), DOCTOR_APPOINTMENT_FIELDS),
+                                  (('patient', message['patient_id']), APPOINTMENT_FIELDS)):
+                with self._lock:
+                    subscribers = list(self._subscribers.get(topic, ()))
+                if not subscribers:
+                    continue
+                data = {field: message['data'][field] for field in fields if field in message['data']}
+                for subscription in subscribers:
+                    subscription.push(message['event'], data)
+
+schedule_broker = ScheduleBroker()
+
+def sse_events(subscription, heartbeat, lifetime):
+    """Server-Sent Events for an open subscription, until `lifetime` seconds have passed.
+
+    A comment goes out every `heartbeat` idle seconds so proxies keep the
+    connection open and a dropped client is noticed. Ends with a `resync`
+    event when the client fell behind; either way the client reconnects and
+    catches up through /api/appointments/changes.
+    """
+    deadline = time.monotonic() + lifetime
+    try:
+        yield 'retry: 5000\n\n'
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+            events = subscription.wait(min(heartbeat, remaining))
+            if subscription.overflowed:
+                yield 'event: resync\ndata: {}\n\n'
+                return
+            if not events:
+                yield ': keepalive\n\n'
+            for event_name, data in events:
+                yield f"event: {event_name}\ndata: {encode_json(data).decode('utf-8')}\n\n"
+    finally:
+        schedule_broker.unsubscribe(subscription)
+
+# Writes queue their events per session and publish them once committed
+def _record(session, event_name, doctor_id, patient_id, data):
+    session.info.setdefault('schedule_events', []).append(
+        {'event': event_name, 'doctor_id': doctor_id, 'patient_id': patient_id, 'data': data})
+
+def _appointment_data(appointment):
+    data = {field: getattr(appointment, field) for field in APPOINTMENT_FIELDS}
+    data['appointment_time'] = format_time(data['appointment_time'])
+    return data
+
+@event.listens_for(Appointment, 'after_insert')
+def _appointment_created(mapper, connection, appointment):
+    _record(object_session(appointment), 'created', appointment.doctor_id, appointment.patient_id, _appointment_data(appointment))
+
+@event.listens_for(Appointment, 'after_update')
+def _appointment_updated(mapper, connection, appointment):
+    status = inspect(appointment).attrs.status.history
+    event_name = 'canceled' if status.has_changes() and appointment.status == 'canceled' else 'updated'
+    _record(object_session(appointment), event_name, appointment.doctor_id, appointment.patient_id, _appointment_data(appointment))
+
+@event.listens_for(Appointment, 'after_delete')
+def _appointment_deleted(mapper, connection, appointment):
+    _record(object_session(appointment), 'deleted', appointment.doctor_id, appointment.patient_id, {'id': appointment.id})
+
+# Occurrences aren't rows: subscribers are told which series to read again
+@event.listens_for(AppointmentSeries, 'after_insert')
+@event.listens_for(AppointmentSeries, 'after_update')
+@event.listens_for(AppointmentSeries, 'after_delete')
+def _series_written(mapper, connection, series):
+    _record(object_session(series), 'series', series.doctor_id, series.patient_id, {'id': series.id})
+
+@event.listens_for(SeriesException, 'after_insert')
+@event.listens_for(SeriesException, 'after_update')
+@event.listens_for(SeriesException, 'after_delete')
+def _series_exception_written(mapper, connection, exception):
+    series = exception.series
+    if series is not None:
+        _record(object_session(exception), 'series', series.doctor_id, series.patient_id, {'id': series.id})
+
+@event.listens_for(Session, 'after_commit')
+def _publish_committed_events(session):
+    messages = session.info.pop('schedule_events', None)
+    if messages:
+        # One series write per commit is enough to tell its subscribers
+        unique = []
+        for message in messages:
+            if message['event'] != 'series' or message not in unique:
+                unique.append(message)
+        schedule_broker.publish(unique)
+
+@event.listens_for(Session, 'after_rollback')
+def _forget_rolled_back_events(session):
+    session.info.pop('schedule_events', None)
@@ -0,0 +1,55 @@
+# services/serialization.py
+import json
+from flask import current_app
+from models import Appointment
+
+try:
+    import orjson
+except ImportError:  # orjson is optional, fall back to the standard library
+    orjson = None
+
+# Fields each appointment listing returns, in response order
+PROFILE_APPOINTMENT_FIELDS = ('id', 'doctor_id', 'appointment_time', 'status', 'notes', 'version')
+DOCTOR_APPOINTMENT_FIELDS = ('id', 'patient_id', 'appointment_time', 'status')
+APPOINTMENT_FIELDS = ('id', 'doctor_id', 'patient_id', 'appointment_time', 'status', 'version')
+EXPORT_APPOINTMENT_FIELDS = ('id', 'doctor_id', 'patient_id', 'appointment_time', 'status', 'notes')
+
+def format_time(value):
+    # Same output as strftime("%Y-%m-%d %H:%M"), without parsing a format string per row
+    return value.isoformat(' ', 'minutes')
+
+def appointment_columns(query, fields):
+    """Restrict an Appointment query to the columns a listing needs.
+
+    The query returns lightweight rows instead of ORM objects, so nothing is
+    added to the identity map and no attribute instrumentation runs.
+    """
+    return query.with_entities(*[getattr(Appointment, field) for field in fields])
+
+def serialize_appointments(rows, fields, now=None):
+    """Turn projected appointment rows into response dicts.
+
+    When `now` is given, past scheduled appointments are reported as
+    completed (see Appointment.effective_status).
+    """
+    time_index = fields.index('appointment_time')
+    status_index = fields.index('status') if now is not None else None
+    data = []
+    for row in rows:
+        item = dict(zip(fields, row))
+        appointment_time = row[time_index]
+        item['appointment_time'] = format_time(appointment_time)
+        if status_index is not None and row[status_index] == 'scheduled' and appointment_time < now:
+            item['status'] = 'completed'
+        data.append(item)
+    return data
+
+def encode_json(data):
+    """Compact JSON bytes, using orjson when it is installed."""
+    if orjson is not None:
+        return orjson.dumps(data)
+    return json.dumps(data, separators=(',', ':')).encode('utf-8')
+
+def json_response(data, status=200, headers=None):
+    """JSON response encoded with orjson when it is installed, else like jsonify."""
+    return current_app.response_class(encode_json(data), status=status, headers=headers, mimetype='application/json')
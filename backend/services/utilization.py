@@ -0,0 +1,116 @@
+# services/utilization.py
+from collections import Counter
+from datetime import date
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session, object_session, selectinload
+from models import db, Doctor, Appointment, AppointmentSeries, SeriesException, UtilizationRollup, series_counts, appointment_key
+
+# Report columns for each stored status
+STATUS_COLUMNS = {'scheduled': 'booked', 'canceled': 'canceled', 'completed': 'completed'}
+# Ways the utilization report can be grouped
+GROUP_BY = ('doctor', 'specialization')
+
+def utilization_report(start, end, group_by='doctor'):
+    """Booked, canceled and completed counts per doctor or specialization and day in [start, end).
+
+    Reads only the rollups. Days before today have no booked appointments
+    left: what is still scheduled there is reported as completed, like
+    Appointment.effective_status.
+    """
+    if group_by == 'doctor':
+        key = UtilizationRollup.doctor_id
+        query = db.select(key, UtilizationRollup.day, UtilizationRollup.status, db.func.sum(UtilizationRollup.appointments))
+    else:
+        key = Doctor.specialization
+        query = (
+            db.select(key, UtilizationRollup.day, UtilizationRollup.status, db.func.sum(UtilizationRollup.appointments))
+            .join(Doctor, Doctor.id == UtilizationRollup.doctor_id)
+        )
+    query = query.where(UtilizationRollup.day >= start, UtilizationRollup.day < end).group_by(key, UtilizationRollup.day, UtilizationRollup.status)
+
+    group_field = 'doctor_id' if group_by == 'doctor' else 'specialization'
+    today = date.today()
+    items = {}
+    for group, day, status, appointments in db.session.execute(query):
+        if not appointments or status not in STATUS_COLUMNS:
+            continue
+        item = items.get((group, day))
+        if item is None:
+            item = items[(group, day)] = {group_field: group, 'date': day.isoformat(), 'booked': 0, 'canceled': 0, 'completed': 0}
+        column = 'completed' if status == 'scheduled' and day < today else STATUS_COLUMNS[status]
+        item[column] += int(appointments)
+    # Doctors without a specialization sort last
+    return [items[key] for key in sorted(items, key=lambda key: (key[0] is None, key))]
+
+# Appointment rows adjust the rollups by their old and new (doctor, day, status)
+def _record(session, deltas):
+    session.info.setdefault('utilization_deltas', Counter()).update(deltas)
+
+def _committed_key(appointment):
+    state = inspect(appointment)
+    values = []
+    for name in ('doctor_id', 'appointment_time', 'status'):
+        history = state.attrs[name].history
+        values.append((history.deleted or history.unchanged or history.added or [None])[0])
+    return appointment_key(*values)
+
+def _current_key(appointment):
+    return appointment_key(appointment.doctor_id, appointment.appointment_time, appointment.status)
+
+@event.listens_for(Appointment, 'after_insert')
+def _appointment_inserted(mapper, connection, appointment):
+    _record(object_session(appointment), {_current_key(appointment): 1})
+
+@event.listens_for(Appointment, 'after_update')
+def _appointment_updated(mapper, connection, appointment):
+    old, new = _committed_key(appointment), _current_key(appointment)
+    if old != new:
+        deltas = Counter({new: 1})
+        deltas[old] -= 1
+        _record(object_session(appointment), deltas)
+
+@event.listens_for(Appointment, 'after_delete')
+def _appointment_deleted(mapper, connection, appointment):
+    _record(object_session(appointment), {_committed_key(appointment): -1})
+
+@event.listens_for(Session, 'before_flush')
+def _series_changes(session, flush_context, instances):
+    # Occurrences only exist as a rule and its exceptions: diff each changed
+    # series' occurrence counts against the state the database still holds
+    changed = {}
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        series = obj if isinstance(obj, AppointmentSeries) else obj.series if isinstance(obj, SeriesException) else None
+        if series is not None:
+            changed[id(series)] = series
+    if not changed:
+        return
+
+    deltas = Counter()
+    stored_ids = [series.id for series in changed.values() if series.id is not None]
+    if stored_ids:
+        # A throwaway session on the same connection sees the pre-flush rows
+        snapshot = Session(bind=session.connection(), autoflush=False)
+        try:
+            stored = snapshot.scalars(
+                db.select(AppointmentSeries).where(AppointmentSeries.id.in_(stored_ids))
+                .options(selectinload(AppointmentSeries.exceptions), selectinload(AppointmentSeries.template))
+            )
+            for series in stored:
+                deltas.subtract(series_counts(series))
+        finally:
+            snapshot.close()
+    for series in changed.values():
+        if series not in session.deleted:
+            deltas.update(series_counts(series))
+    _record(session, deltas)
+
+# Write the deltas of each flush in the same transaction
+@event.listens_for(Session, 'after_flush')
+def _apply_utilization_deltas(session, flush_context):
+    deltas = session.info.pop('utilization_deltas', None)
+    if deltas:
+        UtilizationRollup.apply(session.connection(), deltas)
+
+@event.listens_for(Session, 'after_rollback')
+def _forget_rolled_back_deltas(session):
+    session.info.pop('utilization_deltas', None)
@@ -0,0 +1,194 @@
+# services/waitlist.py
+import logging
+import threading
+import time
+from bisect import insort
+from datetime import datetime, timedelta
+from heapq import merge
+from flask import current_app
+from sqlalchemy.exc import IntegrityError
+from models import db, Appointment, AppointmentSeries, WaitlistEntry, lock_schedules
+from .availability import availability_index
+
+class WaitlistIndex:
+    """In-memory priority queues of waiting waitlist entries.
+
+    Entries are queued under their doctor, or under their specialization when
+    any doctor will do, and each queue is split into one bucket per day of
+    the entry's window. A bucket is kept sorted by (-priority, created_at, id),
+    so matching a freed slot only reads the two buckets for the slot's doctor,
+    specialization and day, best candidate first. Queues are loaded from the
+    waitlist table on first use and reloaded after WAITLIST_INDEX_TTL seconds
+    to pick up entries added by other worker processes; an entry is only
+    matched after it has been claimed in the database, so a stale queue can
+    cost a skipped candidate but never a double booking.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._queues = {}  # key -> {date: sorted list of (-priority, created_at, entry_id)}
+        self._loaded_at = {}  # key -> monotonic load time
+        self._entries = {}  # entry_id -> (key, sort key, patient_id, window_start, window_end, auto_book)
+
+    def clear(self):
+        with self._lock:
+            self._queues.clear()
+            self._loaded_at.clear()
+            self._entries.clear()
+
+    @staticmethod
+    def _key(entry):
+        if entry.doctor_id is not None:
+            return ('doctor', entry.doctor_id)
+        return ('specialization', entry.specialization)
+
+    def _insert(self, key, entry_id, info):
+        # Caller holds the lock
+        sort_key = info[1]
+        queue = self._queues[key]
+        day = info[3].date()
+        while day <= info[4].date():
+            insort(queue.setdefault(day, []), sort_key)
+            day += timedelta(days=1)
+        self._entries[entry_id] = info
+
+    def _load(self, key):
+        kind, value = key
+        column = WaitlistEntry.doctor_id if kind == 'doctor' else WaitlistEntry.specialization
+        query = WaitlistEntry.query.filter(column == value, WaitlistEntry.status == 'waiting', WaitlistEntry.window_end > datetime.now())
+        if kind == 'specialization':
+            query = query.filter(WaitlistEntry.doctor_id.is_(None))
+        entries = query.all()
+
+        with self._lock:
+            for entry_id, info in list(self._entries.items()):
+                if info[0] == key:
+                    del self._entries[entry_id]
+            self._queues[key] = {}
+            for entry in entries:
+                self._insert(key, entry.id, self._info(key, entry))
+            self._loaded_at[key] = time.monotonic()
+
+    def _ensure_loaded(self, key):
+        ttl = current_app.config.get('WAITLIST_INDEX_TTL', 60)
+        loaded_at = self._loaded_at.get(key)
+        if loaded_at is None or (ttl and time.monotonic() - loaded_at > ttl):
+            self._load(key)
+
+    @staticmethod
+    def _info(key, entry):
+        sort_key = (-entry.priority, entry.created_at, entry.id)
+        return (key, sort_key, entry.patient_id, entry.window_start, entry.window_end, entry.auto_book)
+
+    def add(self, entry):
+        """Queue a waiting entry. Queues that were never loaded pick it up on first use."""
+        key = self._key(entry)
+        with self._lock:
+            if key in self._queues:
+                self._insert(key, entry.id, self._info(key, entry))
+
+    def remove(self, entry_id):
+        """Stop matching an entry. Its bucket slots are dropped lazily when scanned."""
+        with self._lock:
+            return self._entries.pop(entry_id, None)
+
+    def restore(self, entry_id, info):
+        """Put back an entry whose claim was rolled back."""
+        if info is None:
+            return
+        with self._lock:
+            if info[0] in self._queues:
+                self._insert(info[0], entry_id, info)
+
+    def candidates(self, doctor, slot_time, exclude_patient_id=None, limit=10):
+        """Up to `limit` waiting entries that accept `slot_time` with `doctor`, best
+        first, as (entry_id, auto_book) pairs."""
+        keys = [('doctor', doctor.id)]
+        if doctor.specialization:
+            keys.append(('specialization', doctor.specialization))
+        for key in keys:
+            self._ensure_loaded(key)
+
+        day = slot_time.date()
+        found = []
+        with self._lock:
+            for sort_key in merge(*[self._queues[key].get(day, ()) for key in keys]):
+                info = self._entries.get(sort_key[2])
+                if info is None:
+                    continue  # Matched or withdrawn since it was queued
+                _, _, patient_id, window_start, window_end, auto_book = info
+                if patient_id == exclude_patient_id or not window_start <= slot_time < window_end:
+                    continue
+                found.append((sort_key[2], auto_book))
+                if len(found) >= limit:
+                    break
+        return found
+
+waitlist_index = WaitlistIndex()
+
+def backfill_slot(doctor, slot_time, exclude_patient_id=None):
+    """Offer or book a freed slot for the best waiting candidate.
+
+    Candidates come from waitlist_index best first. Each one is claimed with
+    a conditional UPDATE on its waiting status, so entries matched by another
+    worker are skipped. Auto-book entries get the appointment in the same
+    transaction as the claim; the others are marked offered and the patient
+    accepts or declines later. Returns the matched entry, or None when nobody
+    is waiting or the slot is no longer free.
+    """
+    if slot_time <= datetime.now():
+        return None
+    slot = (doctor.id, slot_time)
+    if Appointment.taken_slots([slot]) or AppointmentSeries.taken_slots([slot]):
+        return None
+
+    # Entries that fail their claim leave the index, so each round gets new candidates
+    while True:
+        candidates = waitlist_index.candidates(doctor, slot_time, exclude_patient_id)
+        if not candidates:
+            return None
+        for entry_id, auto_book in candidates:
+            info = waitlist_index.remove(entry_id)
+            claimed = db.session.execute(
+                db.update(WaitlistEntry)
+                .where(WaitlistEntry.id == entry_id, WaitlistEntry.status == 'waiting')
+                .values(status='booked' if auto_book else 'offered', offered_doctor_id=doctor.id, offered_time=slot_time)
+                .execution_options(synchronize_session=False)
+            )
+            if claimed.rowcount == 0:
+                db.session.rollback()
+                continue
+
+            entry = db.session.get(WaitlistEntry, entry_id)
+            db.session.refresh(entry)
+            if not auto_book:
+                db.session.commit()
+                return entry
+
+            # Check the series again under the doctor's lock, one may have claimed the slot since
+            lock_schedules([doctor.id])
+            if AppointmentSeries.taken_slots([slot]):
+                db.session.rollback()
+                waitlist_index.restore(entry_id, info)
+                return None
+
+            appointment = Appointment(
+                doctor_id=doctor.id,
+                patient_id=entry.patient_id,
+                appointment_time=slot_time,
+                notes='Booked from the waitlist'
+            )
+            db.session.add(appointment)
+            try:
+                db.session.flush()
+                entry.appointment_id = appointment.id
+                db.session.commit()
+            except IntegrityError:
+                # Someone else booked the slot first, the entry keeps waiting
+                db.session.rollback()
+                waitlist_index.restore(entry_id, info)
+                logging.info(f"Waitlist backfill lost slot {slot_time} for doctor {doctor.id}")
+                return None
+
+            availability_index.book(appointment.id, appointment.doctor_id, appointment.appointment_time)
+            return entry
@@ -0,0 +1,66 @@
+# sweeper.py
+import argparse
+import logging
+import threading
+from datetime import datetime, timedelta
+from models import db, Appointment, AppointmentTombstone
+
+# Mark past scheduled appointments as completed, one batch at a time
+def sweep_overdue_appointments(batch_size=500, now=None):
+    total = 0
+    while True:
+        updated = Appointment.complete_overdue(now=now, batch_size=batch_size)
+        total += updated
+        if updated < batch_size:
+            return total
+
+# Drop tombstones older than any sync token still accepted
+def purge_tombstones(retention_days, now=None):
+    return AppointmentTombstone.purge((now or datetime.now()) - timedelta(days=retention_days))
+
+# Run the sweeper in-process on a daemon thread, returns an Event that stops it
+def start_status_sweeper(app, interval, batch_size=500):
+    stop = threading.Event()
+
+    def run():
+        while not stop.is_set():
+            with app.app_context():
+                try:
+                    completed = sweep_overdue_appointments(batch_size=batch_size)
+                    if completed:
+                        logging.info(f"Status sweeper completed {completed} appointments")
+                    purged = purge_tombstones(app.config['CHANGES_RETENTION_DAYS'])
+                    if purged:
+                        logging.info(f"Status sweeper purged {purged} appointment tombstones")
+                except Exception as e:
+                    db.session.rollback()
+                    logging.error(f"Error sweeping appointment statuses: {e}")
+            stop.wait(interval)
+
+    thread = threading.Thread(target=run, name='status-sweeper', daemon=True)
+    thread.start()
+    return stop
+
+# Start the in-process sweeper when STATUS_SWEEP_INTERVAL asks for one, only serving entry points call this
+def start_configured_sweeper(app):
+    if app.config['STATUS_SWEEP_INTERVAL']:
+        return start_status_sweeper(app, app.config['STATUS_SWEEP_INTERVAL'], app.config['STATUS_SWEEP_BATCH_SIZE'])
+    return None
+
+if __name__ == '__main__':
+    from app import create_app
+    # The sweeper runs in the foreground here
+    app = create_app()
+
+    parser = argparse.ArgumentParser(description='Mark past scheduled appointments as completed.')
+    parser.add_argument('--batch-size', type=int, default=app.config['STATUS_SWEEP_BATCH_SIZE'])
+    parser.add_argument('--interval', type=int, default=0,
+                        help='Seconds between sweeps. Runs once and exits when 0.')
+    args = parser.parse_args()
+
+    if args.interval:
+        start_status_sweeper(app, args.interval, args.batch_size).wait()
+    else:
+        with app.app_context():
+            print(f"Completed {sweep_overdue_appointments(batch_size=args.batch_size)} appointments")
+            print(f"Purged {purge_tombstones(app.config['CHANGES_RETENTION_DAYS'])} appointment tombstones")
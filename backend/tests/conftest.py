@@ -5,4 +5,101 @@ import sys
 backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
 # Add the backend directory to the Python path
-sys.path.insert(0, backend_dir) 
\ No newline at end of file
+sys.path.insert(0, backend_dir)
+
+# SERVING_MODE=async runs the whole suite with the gevent patches serve_async.py applies
+if os.getenv('SERVING_MODE') == 'async':
+    from async_mode import enable_async_mode
+    enable_async_mode()
+
+import pytest
+from app import create_app
+from models import db, Patient, Doctor
+from services import availability_index, identity_cache, response_cache, metrics, recent_writes, waitlist_index, doctor_search_index, schedule_cache, schedule_broker
+
+# create a test app and test client
+@pytest.fixture
+def app():
+    flask_app = create_app({
+        'TESTING': True,
+        'SQLALCHEMY_DATABASE_URI': 'sqlite:///:memory:',
+        'JWT_SECRET_KEY': 'test-secret-key',
+        'BCRYPT_LOG_ROUNDS': 4,
+        'MIGRATE_COMMANDS': False,
+        'STATUS_SWEEP_INTERVAL': 0
+    })
+
+    with flask_app.app_context():
+        db.create_all()
+        yield flask_app
+        db.session.remove()
+        db.drop_all()
+
+    # In-process indexes outlive the per-test database
+    availability_index.clear()
+    identity_cache.clear()
+    response_cache.clear()
+    metrics.clear()
+    recent_writes.clear()
+    waitlist_index.clear()
+    doctor_search_index.clear()
+    schedule_cache.clear()
+    schedule_cache.reset()
+    schedule_broker.clear()
+
+# start test client
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+# create a test patient
+@pytest.fixture
+def test_patient(app):
+    with app.app_context():
+        patient = Patient(
+            name="Test Patient",
+            email="test@example.com",
+            phone="1234567890"
+        )
+        patient.set_password("testpass123")
+        db.session.add(patient)
+        db.session.commit()
+        print(patient.id)
+        return patient
+
+# create a test doctor
+@pytest.fixture
+def test_doctor(app):
+    with app.app_context():
+        doctor = Doctor(
+            name="Test Doctor",
+            email="doctor@example.com",
+            phone="0987654321",
+            specialization="General",
+            is_doctor=True
+        )
+        db.session.add(doctor)
+        db.session.commit()
+
+        print(doctor.id)
+        return doctor
+
+# book an appointment through the API, returns the response
+@pytest.fixture
+def book(client):
+    def book(headers, doctor, appointment_time='2030-01-02 10:00'):
+        return client.post('/api/appointments/create', json={
+            'doctor_id': doctor.id,
+            'appointment_time': appointment_time
+        }, headers=headers)
+    return book
+
+# create a test auth headers
+@pytest.fixture
+def auth_headers(client, test_patient):
+    response = client.post('/api/patients/login', json={
+        'email': 'test@example.com',
+        'password': 'testpass123'
+    })
+    token = response.json['access_token']
+    return {'Authorization': f'Bearer {token}'}
@@ -0,0 +1,65 @@
+import os
+import runpy
+import subprocess
+import sys
+import pytest
+from app import create_app
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# test importing the app module builds nothing and imports no routes or extensions
+def test_import_has_no_side_effects():
+    code = "import sys, app; print(any(name in sys.modules for name in ('routes', 'models', 'flask_migrate', 'flask_jwt_extended')))"
+    output = subprocess.run([sys.executable, '-c', code], cwd=BACKEND, capture_output=True, text=True, check=True).stdout
+    assert output.strip() == 'False'
+
+# test each app gets its own configuration and only the extensions it asked for
+def test_apps_are_configured_independently(app):
+    other = create_app({'PAGINATION_MAX_LIMIT': 5, 'MIGRATE_COMMANDS': True})
+    assert other.config['PAGINATION_MAX_LIMIT'] == 5
+    assert app.config['PAGINATION_MAX_LIMIT'] != 5
+    assert 'migrate' in other.extensions
+    assert 'migrate' not in app.extensions
+    assert 'api' in app.blueprints
+
+# test a database URL passed to the factory gets engine options for its own dialect
+def test_engine_options_follow_database_url():
+    sqlite_app = create_app({'SQLALCHEMY_DATABASE_URI': 'sqlite:///:memory:', 'MIGRATE_COMMANDS': False})
+    assert 'pool_size' not in sqlite_app.config['SQLALCHEMY_ENGINE_OPTIONS']
+    postgres_app = create_app({'SQLALCHEMY_DATABASE_URI': 'postgresql://localhost/other', 'MIGRATE_COMMANDS': False})
+    assert 'pool_size' in postgres_app.config['SQLALCHEMY_ENGINE_OPTIONS']
+    explicit = create_app({'SQLALCHEMY_DATABASE_URI': 'sqlite:///:memory:', 'SQLALCHEMY_ENGINE_OPTIONS': {'echo': True}, 'MIGRATE_COMMANDS': False})
+    assert explicit.config['SQLALCHEMY_ENGINE_OPTIONS'] == {'echo': True}
+
+# test gunicorn sizes workers from the available CPUs unless told otherwise
+def test_gunicorn_worker_sizing(monkeypatch):
+    monkeypatch.delenv('SERVING_MODE', raising=False)
+    monkeypatch.delenv('WEB_CONCURRENCY', raising=False)
+    monkeypatch.delenv('SCHEDULE_CACHE_BACKEND', raising=False)
+    config = runpy.run_path(os.path.join(BACKEND, 'gunicorn.conf.py'))
+    assert config['default_workers'](4) == 9
+    assert config['default_workers'](4, async_mode=True) == 4
+    assert config['workers'] == 2 * config['available_cpus']() + 1
+    assert config['preload_app'] and config['wsgi_app'] == 'wsgi:app'
+
+    monkeypatch.setenv('WEB_CONCURRENCY', '3')
+    assert runpy.run_path(os.path.join(BACKEND, 'gunicorn.conf.py'))['workers'] == 3
+
+    # A per-process schedule cache would serve other workers' stale blocks
+    monkeypatch.setenv('SCHEDULE_CACHE_BACKEND', 'local')
+    with pytest.raises(RuntimeError):
+        runpy.run_path(os.path.join(BACKEND, 'gunicorn.conf.py'))
+    monkeypatch.setenv('WEB_CONCURRENCY', '1')
+    assert runpy.run_path(os.path.join(BACKEND, 'gunicorn.conf.py'))['workers'] == 1
+
+# test only the serving entry point starts the status sweeper, migrations and seeding never do
+def test_sweeper_starts_only_when_serving():
+    code = ("import threading, app, wsgi; "
+            "print(sorted(t.name for t in threading.enumerate() if t.name == 'status-sweeper'))")
+    env = {**os.environ, 'DATABASE_URL': 'sqlite:///:memory:', 'STATUS_SWEEP_INTERVAL': '3600'}
+    output = subprocess.run([sys.executable, '-c', code], cwd=BACKEND, env=env, capture_output=True, text=True, check=True).stdout
+    assert output.strip() == "['status-sweeper']"
+
+    code = "import threading, app; app.create_app({'MIGRATE_COMMANDS': True}); print(threading.active_count())"
+    output = subprocess.run([sys.executable, '-c', code], cwd=BACKEND, env=env, capture_output=True, text=True, check=True).stdout
+    assert output.strip() == '1'
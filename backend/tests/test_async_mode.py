@@ -0,0 +1,33 @@
+import pytest
+from async_mode import async_mode_enabled
+from hashing import password_hasher
+
+pytestmark = pytest.mark.skipif(not async_mode_enabled(), reason="run with SERVING_MODE=async")
+
+# test bcrypt runs on a native thread and doesn't stall other greenlets
+def test_hashing_does_not_block_event_loop(app):
+    import gevent
+    rounds = app.config['BCRYPT_LOG_ROUNDS']
+    app.config['BCRYPT_LOG_ROUNDS'] = 10
+    try:
+        ticks = []
+        def ticker():
+            while True:
+                ticks.append(1)
+                gevent.sleep(0.001)
+        background = gevent.spawn(ticker)
+        password_hasher.hash('testpass123')
+        background.kill()
+    finally:
+        app.config['BCRYPT_LOG_ROUNDS'] = rounds
+    assert len(ticks) > 5
+
+# test many concurrent requests are served by greenlets in one process
+def test_concurrent_requests(app, client, test_doctor):
+    import gevent
+    def fetch():
+        with app.app_context():
+            return app.test_client().get('/api/doctors').status_code
+    jobs = [gevent.spawn(fetch) for _ in range(200)]
+    gevent.joinall(jobs, timeout=30)
+    assert [job.value for job in jobs] == [200] * 200
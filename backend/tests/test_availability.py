@@ -0,0 +1,79 @@
+from datetime import datetime, timedelta
+from models import db, Appointment
+
+# next weekday at least two days out, so no slot is in the past
+def next_workday():
+    day = (datetime.now() + timedelta(days=2)).date()
+    while day.weekday() >= 5:
+        day += timedelta(days=1)
+    return day
+
+# test a working day is split into slots
+def test_availability_lists_working_slots(client, test_doctor):
+    day = next_workday().strftime("%Y-%m-%d")
+    response = client.get(f'/api/doctors/{test_doctor.id}/availability?from={day}&to={day}')
+    assert response.status_code == 200
+    slots = response.json['slots']
+    assert response.json['slot_minutes'] == 30
+    assert len(slots) == 16
+    assert slots[0] == f'{day} 09:00'
+    assert slots[-1] == f'{day} 16:30'
+
+# test weekends are not offered
+def test_availability_skips_non_working_days(client, test_doctor):
+    day = next_workday()
+    while day.weekday() != 5:
+        day += timedelta(days=1)
+    day = day.strftime("%Y-%m-%d")
+    response = client.get(f'/api/doctors/{test_doctor.id}/availability?from={day}&to={day}')
+    assert response.status_code == 200
+    assert response.json['slots'] == []
+
+# test booking, rescheduling and canceling keep the index current
+def test_availability_tracks_bookings(client, auth_headers, test_doctor):
+    day = next_workday().strftime("%Y-%m-%d")
+    url = f'/api/doctors/{test_doctor.id}/availability?from={day}&to={day}'
+    assert f'{day} 10:00' in client.get(url).json['slots']
+
+    response = client.post('/api/appointments/create', headers=auth_headers, json={
+        'doctor_id': test_doctor.id,
+        'appointment_time': f'{day} 10:00'
+    })
+    appointment_id = response.json['appointment_id']
+    slots = client.get(url).json['slots']
+    assert f'{day} 10:00' not in slots
+    assert len(slots) == 15
+
+    client.put(f'/api/appointments/{appointment_id}', headers=auth_headers, json={
+        'appointment_time': f'{day} 11:00'
+    })
+    slots = client.get(url).json['slots']
+    assert f'{day} 10:00' in slots
+    assert f'{day} 11:00' not in slots
+
+    client.delete(f'/api/appointments/{appointment_id}', headers=auth_headers)
+    assert len(client.get(url).json['slots']) == 16
+
+# test off-grid appointments block every slot they overlap
+def test_availability_loads_existing_appointments(client, test_patient, test_doctor):
+    day = next_workday()
+    db.session.add(Appointment(
+        patient_id=test_patient.id,
+        doctor_id=test_doctor.id,
+        appointment_time=datetime.combine(day, datetime.min.time()) + timedelta(hours=13, minutes=15),
+        status='scheduled'
+    ))
+    db.session.commit()
+
+    day = day.strftime("%Y-%m-%d")
+    slots = client.get(f'/api/doctors/{test_doctor.id}/availability?from={day}&to={day}').json['slots']
+    assert f'{day} 13:00' not in slots
+    assert f'{day} 13:30' not in slots
+    assert f'{day} 14:00' in slots
+
+# test invalid ranges are rejected
+def test_availability_invalid_range(client, test_doctor):
+    response = client.get(f'/api/doctors/{test_doctor.id}/availability?from=tomorrow')
+    assert response.status_code == 400
+    response = client.get(f'/api/doctors/{test_doctor.id}/availability?from=2030-01-10&to=2030-01-01')
+    assert response.status_code == 400
@@ -0,0 +1,117 @@
+from datetime import datetime
+from models import db, Appointment
+
+# test a whole series is booked in one request
+def test_batch_booking_all_or_nothing(client, auth_headers, test_doctor):
+    response = client.post('/api/appointments/batch', headers=auth_headers, json={
+        'appointments': [
+            {'doctor_id': test_doctor.id, 'appointment_time': f'2030-01-0{day} 10:00', 'notes': 'Follow-up'}
+            for day in range(1, 6)
+        ]
+    })
+    assert response.status_code == 201
+    assert len(response.json['appointment_ids']) == 5
+    assert Appointment.query.count() == 5
+
+# test one bad item rejects the whole batch by default
+def test_batch_booking_rejects_conflicts(client, auth_headers, test_patient, test_doctor):
+    db.session.add(Appointment(
+        patient_id=test_patient.id,
+        doctor_id=test_doctor.id,
+        appointment_time=datetime(2030, 1, 1, 10, 0),
+        status='scheduled'
+    ))
+    db.session.commit()
+
+    response = client.post('/api/appointments/batch', headers=auth_headers, json={
+        'appointments': [
+            {'doctor_id': test_doctor.id, 'appointment_time': '2030-01-01 10:00'},
+            {'doctor_id': test_doctor.id, 'appointment_time': '2030-01-02 10:00'},
+            {'doctor_id': test_doctor.id, 'appointment_time': '2030-01-02 10:00'},
+            {'doctor_id': 999, 'appointment_time': '2030-01-03 10:00'},
+            {'doctor_id': test_doctor.id, 'appointment_time': 'tomorrow'}
+        ]
+    })
+    assert response.status_code == 400
+    assert response.json['errors'] == [
+        {'index': 0, 'msg': 'Time slot is already taken'},
+        {'index': 2, 'msg': 'Time slot is already taken'},
+        {'index': 3, 'msg': 'Doctor not found'},
+        {'index': 4, 'msg': 'Invalid appointment time format. Use YYYY-MM-DD HH:MM.'}
+    ]
+    assert Appointment.query.count() == 1
+
+# test per-item mode books what it can
+def test_batch_booking_per_item(client, auth_headers, test_patient, test_doctor):
+    db.session.add(Appointment(
+        patient_id=test_patient.id,
+        doctor_id=test_doctor.id,
+        appointment_time=datetime(2030, 1, 1, 10, 0),
+        status='scheduled'
+    ))
+    db.session.commit()
+
+    response = client.post('/api/appointments/batch', headers=auth_headers, json={
+        'atomic': False,
+        'appointments': [
+            {'doctor_id': test_doctor.id, 'appointment_time': '2030-01-01 10:00'},
+            {'doctor_id': test_doctor.id, 'appointment_time': '2030-01-01 11:00'}
+        ]
+    })
+    assert response.status_code == 200
+    results = response.json['results']
+    assert results[0] == {'index': 0, 'status': 'error', 'msg': 'Time slot is already taken'}
+    assert results[1]['status'] == 'created'
+    assert Appointment.query.count() == 2
+
+# test malformed items fail on their own instead of the whole request
+def test_batch_booking_malformed_items(client, auth_headers, test_doctor):
+    response = client.post('/api/appointments/batch', headers=auth_headers, json={
+        'atomic': False,
+        'appointments': [
+            {'doctor_id': [test_doctor.id], 'appointment_time': '2030-01-01 10:00'},
+            {'doctor_id': test_doctor.id, 'appointment_time': 202001011000},
+            {'doctor_id': True, 'appointment_time': '2030-01-01 10:00'},
+            {'doctor_id': str(test_doctor.id), 'appointment_time': '2030-01-01 11:00'}
+        ]
+    })
+    assert response.status_code == 200
+    assert [result['status'] for result in response.json['results']] == ['error', 'error', 'error', 'created']
+    assert response.json['results'][0]['msg'] == 'doctor_id must be an integer'
+    assert response.json['results'][1]['msg'] == 'appointment_time must be a string'
+
+    # atomic takes a real boolean only
+    response = client.post('/api/appointments/batch', headers=auth_headers, json={
+        'atomic': 'false',
+        'appointments': [{'doctor_id': test_doctor.id, 'appointment_time': '2030-01-02 10:00'}]
+    })
+    assert response.status_code == 400
+
+# test empty and oversized batches are rejected
+def test_batch_booking_limits(client, app, auth_headers, test_doctor):
+    assert client.post('/api/appointments/batch', headers=auth_headers, json={'appointments': []}).status_code == 400
+    too_many = [{'doctor_id': test_doctor.id, 'appointment_time': '2030-01-01 10:00'}] * (app.config['BATCH_BOOKING_MAX_ITEMS'] + 1)
+    assert client.post('/api/appointments/batch', headers=auth_headers, json={'appointments': too_many}).status_code == 400
+
+# test a slot taken after the conflict check only fails its own item
+def test_batch_booking_per_item_lost_race(client, auth_headers, test_patient, test_doctor, monkeypatch):
+    db.session.add(Appointment(
+        patient_id=test_patient.id,
+        doctor_id=test_doctor.id,
+        appointment_time=datetime(2030, 1, 1, 10, 0),
+        status='scheduled'
+    ))
+    db.session.commit()
+    # Pretend the competing booking landed between the check and the insert
+    monkeypatch.setattr(Appointment, 'taken_slots', classmethod(lambda cls, slots: set()))
+
+    response = client.post('/api/appointments/batch', headers=auth_headers, json={
+        'atomic': False,
+        'appointments': [
+            {'doctor_id': test_doctor.id, 'appointment_time': '2030-01-01 10:00'},
+            {'doctor_id': test_doctor.id, 'appointment_time': '2030-01-01 11:00'}
+        ]
+    })
+    assert response.status_code == 200
+    assert [result['status'] for result in response.json['results']] == ['error', 'created']
+    assert Appointment.query.count() == 2
@@ -0,0 +1,25 @@
+from benchmarks.datasets import build_dataset
+from benchmarks.run import run_suite, SCENARIOS
+from benchmarks.bench_startup import setup_database, cold_start
+from models import Patient, Doctor, Appointment
+
+# test the benchmark suite runs every scenario cleanly on a tiny dataset
+def test_benchmark_suite_smoke(app):
+    build_dataset(doctors=3, patients=10, appointments=300)
+    assert Patient.query.count() == 10
+    assert Doctor.query.count() == 3
+    assert Appointment.query.count() == 300
+
+    results = run_suite(app, doctors=3, patients=10, requests=5)
+    assert set(results) == set(SCENARIOS)
+    for result in results.values():
+        assert result['requests'] == 5
+        assert result['errors'] == 0
+        assert result['p50_ms'] <= result['p99_ms']
+
+# test the startup benchmark measures a cold start that serves its first request
+def test_startup_benchmark_smoke(tmp_path):
+    database_url = f"sqlite:///{tmp_path / 'startup.db'}"
+    setup_database(database_url)
+    sample, = cold_start(database_url, runs=1)
+    assert 0 < sample['import_ms'] < sample['total_ms'] <= sample['process_ms']
@@ -0,0 +1,86 @@
+from datetime import datetime, timedelta
+from models import db, Patient, Doctor, Appointment, AppointmentTombstone
+from services.pagination import encode_cursor
+from sweeper import purge_tombstones
+
+def changes(client, headers, token=None):
+    return client.get('/api/appointments/changes', query_string={'since': token} if token else {}, headers=headers)
+
+# test creates, updates and cancellations arrive once the client has a token
+def test_changes_since_token(client, auth_headers, test_doctor, book):
+    kept = book(auth_headers, test_doctor, '2030-01-01 10:00').json['appointment_id']
+    response = changes(client, auth_headers)
+    assert response.status_code == 200
+    assert response.json['changes'] == [] and response.json['deleted'] == []
+    token = response.json['token']
+
+    # Rows written around the token's boundary can be sent again, later ones always are
+    rows = changes(client, auth_headers, token).json
+    assert {row['id'] for row in rows['changes']} <= {kept}
+
+    created = book(auth_headers, test_doctor, '2030-01-02 10:00').json['appointment_id']
+    client.put(f'/api/appointments/{kept}', json={'appointment_time': '2030-01-03 10:00'}, headers=auth_headers)
+    rows = changes(client, auth_headers, token).json
+    by_id = {row['id']: row for row in rows['changes']}
+    assert set(by_id) == {kept, created}
+    assert by_id[kept]['version'] == 2
+    assert [row['change_seq'] for row in rows['changes']] == sorted(row['change_seq'] for row in rows['changes'])
+
+    client.delete(f'/api/appointments/{created}', headers=auth_headers)
+    rows = changes(client, auth_headers, rows['token']).json
+    assert {row['id']: row['status'] for row in rows['changes']}[created] == 'canceled'
+
+# test deleted appointments leave a tombstone in the feed, and the sweeper purges old ones
+def test_deletions_leave_tombstones(client, auth_headers, test_doctor, book):
+    appointment_id = book(auth_headers, test_doctor, '2030-01-01 10:00').json['appointment_id']
+    token = changes(client, auth_headers).json['token']
+
+    response = client.delete(f'/api/appointments/{appointment_id}/delete', headers=auth_headers)
+    assert response.status_code == 200
+    assert db.session.get(Appointment, appointment_id) is None
+    rows = changes(client, auth_headers, token).json
+    assert [row['id'] for row in rows['deleted']] == [appointment_id]
+    assert appointment_id not in {row['id'] for row in rows['changes']}
+
+    assert purge_tombstones(30) == 0
+    assert purge_tombstones(30, now=datetime.now() + timedelta(days=31)) == 1
+    assert AppointmentTombstone.query.count() == 0
+
+# test a write numbered before the token but committed after it is still sent
+def test_late_commit_inside_grace_window(client, auth_headers, test_doctor, book):
+    first = book(auth_headers, test_doctor, '2030-01-01 10:00').json['appointment_id']
+    book(auth_headers, test_doctor, '2030-01-02 10:00')
+    token = changes(client, auth_headers).json['token']
+
+    # Simulate a transaction that drew its number before the last booking but committed just now
+    db.session.execute(db.update(Appointment.__table__).where(Appointment.id == first).values(
+        change_seq=0, updated_at=datetime.now(), status='canceled'))
+    db.session.commit()
+    rows = changes(client, auth_headers, token).json
+    assert {row['id']: row['status'] for row in rows['changes']}[first] == 'canceled'
+
+# test malformed tokens are rejected, and expired or oversized deltas ask for a resync
+def test_invalid_and_stale_tokens(app, client, auth_headers, test_doctor, book):
+    assert changes(client, auth_headers, 'not-a-token').status_code == 400
+    assert changes(client, auth_headers, encode_cursor(['x', 'y'])).status_code == 400
+
+    expired = encode_cursor([0, datetime.now() - timedelta(days=31)])
+    assert changes(client, auth_headers, expired).status_code == 410
+
+    token = changes(client, auth_headers).json['token']
+    app.config['CHANGES_MAX_ROWS'] = 1
+    book(auth_headers, test_doctor, '2030-01-01 10:00')
+    book(auth_headers, test_doctor, '2030-01-02 10:00')
+    assert changes(client, auth_headers, token).status_code == 410
+
+# test other users' appointments stay out of the feed
+def test_changes_scoped_to_caller(client, auth_headers, test_doctor):
+    token = changes(client, auth_headers).json['token']
+    other = Patient(name='Other Patient', email='other@example.com', phone='5555555555')
+    other.set_password('otherpass123')
+    other_doctor = Doctor(name='Other Doctor', email='other.doctor@example.com', phone='5555555556', specialization='General')
+    db.session.add_all([other, other_doctor])
+    db.session.commit()
+    db.session.add(Appointment(doctor_id=other_doctor.id, patient_id=other.id, appointment_time=datetime(2030, 1, 1, 10)))
+    db.session.commit()
+    assert changes(client, auth_headers, token).json['changes'] == []
@@ -0,0 +1,79 @@
+from models import db, Doctor
+
+def add_doctor(name, specialization, email):
+    doctor = Doctor(name=name, email=email, phone='0987654321', specialization=specialization)
+    db.session.add(doctor)
+    db.session.commit()
+    return doctor
+
+def names(response):
+    return [doctor['name'] for doctor in response.json]
+
+def add_directory():
+    add_doctor('Dr. Anna Smith', 'Family Medicine', 'smith@example.com')
+    add_doctor('Dr. Sam Smithers', 'Pediatrics', 'smithers@example.com')
+    add_doctor('Dr. Lee Johnson', 'Pediatrics', 'johnson@example.com')
+    add_doctor('Dr. Ravi Patel', 'Cardiology', 'patel@example.com')
+
+# test ranking: exact word, then prefix, with typo tolerance
+def test_search_ranks_matches(client):
+    add_directory()
+    assert names(client.get('/api/doctors/search?q=smith')) == ['Dr. Anna Smith', 'Dr. Sam Smithers']
+    assert names(client.get('/api/doctors/search?q=smi&limit=1')) == ['Dr. Anna Smith']
+    assert names(client.get('/api/doctors/search?q=jonhson')) == ['Dr. Lee Johnson']
+    assert names(client.get('/api/doctors/search?q=sam pedia')) == ['Dr. Sam Smithers']
+    assert client.get('/api/doctors/search?q=zzz').json == []
+
+    response = client.get('/api/doctors/search?q=smith')
+    assert set(response.json[0]) == {'id', 'name', 'email', 'phone', 'specialization'}
+
+# test the specialization filter, alone or with a query
+def test_search_by_specialization(client):
+    add_directory()
+    assert names(client.get('/api/doctors/search?specialization=pediatrics')) == ['Dr. Lee Johnson', 'Dr. Sam Smithers']
+    assert names(client.get('/api/doctors/search?q=smith&specialization=Pediatrics')) == ['Dr. Sam Smithers']
+    assert client.get('/api/doctors/search').status_code == 400
+    assert client.get('/api/doctors/search?q=smith&limit=0').status_code == 400
+
+# test committed doctor writes patch the index without a rebuild
+def test_search_index_follows_writes(client):
+    add_directory()
+    assert names(client.get('/api/doctors/search?q=patel')) == ['Dr. Ravi Patel']
+
+    doctor = Doctor.query.filter_by(email='patel@example.com').one()
+    doctor.name = 'Dr. Ravi Mehta'
+    db.session.commit()
+    add_doctor('Dr. Mia Patel', 'Cardiology', 'mia@example.com')
+    assert names(client.get('/api/doctors/search?q=patel')) == ['Dr. Mia Patel']
+    assert names(client.get('/api/doctors/search?q=mehta')) == ['Dr. Ravi Mehta']
+
+    # Rolled back writes never reach the index
+    doctor.name = 'Dr. Ravi Kumar'
+    db.session.flush()
+    db.session.rollback()
+    assert client.get('/api/doctors/search?q=kumar').json == []
+
+    db.session.delete(Doctor.query.filter_by(email='mia@example.com').one())
+    db.session.commit()
+    assert client.get('/api/doctors/search?q=patel').json == []
+
+# test search over 100k doctors returns the best matches
+def test_search_at_scale(client):
+    first = ['Alex', 'Blake', 'Casey', 'Dana', 'Eden', 'Gray', 'Harper', 'Jordan', 'Kai', 'Logan']
+    last = ['Adams', 'Brooks', 'Carter', 'Diaz', 'Evans', 'Foster', 'Garcia', 'Hughes', 'Kim', 'Lopez']
+    specializations = ['Family Medicine', 'Pediatrics', 'Cardiology', 'Dermatology']
+    db.session.execute(db.insert(Doctor), [{
+        'name': f'Dr. {first[i % 10]} {last[i // 10 % 10]}{i // 100}',
+        'email': f'doctor{i}@example.com',
+        'phone': '0987654321',
+        'is_doctor': True,
+        'specialization': specializations[i % 4]
+    } for i in range(100000)])
+    db.session.commit()
+    add_doctor('Dr. Quinn Zephyr', 'Cardiology', 'zephyr@example.com')
+
+    assert names(client.get('/api/doctors/search?q=zephyr')) == ['Dr. Quinn Zephyr']
+    assert names(client.get('/api/doctors/search?q=zephir')) == ['Dr. Quinn Zephyr']
+    response = client.get('/api/doctors/search?q=casey garcia&specialization=cardiology&limit=5')
+    assert len(response.json) == 5
+    assert all('Casey Garcia' in doctor['name'] and doctor['specialization'] == 'Cardiology' for doctor in response.json)
@@ -0,0 +1,65 @@
+import csv
+import io
+import json
+import logging
+from datetime import datetime, timedelta
+from models import db, Appointment
+
+def add_appointments(patient, doctor, count, start=datetime(2030, 1, 1, 9, 0)):
+    db.session.execute(db.insert(Appointment), [{
+        'doctor_id': doctor.id,
+        'patient_id': patient.id,
+        'appointment_time': start + timedelta(days=i),
+        'status': 'scheduled',
+        'notes': f'Visit {i}'
+    } for i in range(count)])
+    db.session.commit()
+
+# test a doctor's schedule exports as NDJSON, filtered by date
+def test_export_ndjson(client, auth_headers, test_patient, test_doctor):
+    add_appointments(test_patient, test_doctor, 10)
+    response = client.get(f'/api/appointments/export?doctor_id={test_doctor.id}&from=2030-01-03&to=2030-01-05',
+                          headers=auth_headers)
+    assert response.status_code == 200
+    assert response.mimetype == 'application/x-ndjson'
+    rows = [json.loads(line) for line in response.data.splitlines()]
+    assert [row['appointment_time'] for row in rows] == ['2030-01-03 09:00', '2030-01-04 09:00', '2030-01-05 09:00']
+    # Other patients' notes stay private, the export carries the schedule listing's fields
+    assert set(rows[0]) == {'id', 'patient_id', 'appointment_time', 'status'}
+
+# test the caller's own appointments export as CSV across several chunks
+def test_export_csv(client, app, auth_headers, test_patient, test_doctor):
+    add_appointments(test_patient, test_doctor, 25)
+    chunk_size = app.config['EXPORT_CHUNK_SIZE']
+    app.config['EXPORT_CHUNK_SIZE'] = 10
+    try:
+        response = client.get('/api/appointments/export?format=csv', headers=auth_headers)
+    finally:
+        app.config['EXPORT_CHUNK_SIZE'] = chunk_size
+    assert response.status_code == 200
+    assert 'appointments.csv' in response.headers['Content-Disposition']
+    rows = list(csv.DictReader(io.StringIO(response.get_data(as_text=True))))
+    assert len(rows) == 25
+    assert rows[-1]['appointment_time'] == '2030-01-25 09:00'
+    assert rows[-1]['notes'] == 'Visit 24'
+
+# test a client hanging up mid-export closes the stream
+def test_export_client_disconnect(client, app, auth_headers, test_patient, test_doctor, caplog):
+    add_appointments(test_patient, test_doctor, 25)
+    chunk_size = app.config['EXPORT_CHUNK_SIZE']
+    app.config['EXPORT_CHUNK_SIZE'] = 10
+    try:
+        with caplog.at_level(logging.INFO):
+            response = client.get('/api/appointments/export', headers=auth_headers, buffered=False)
+            first = next(iter(response.response))
+            response.close()
+    finally:
+        app.config['EXPORT_CHUNK_SIZE'] = chunk_size
+    assert len(first.splitlines()) == 10
+    assert 'aborted by the client after 10 rows' in caplog.text
+
+# test invalid export parameters
+def test_export_invalid_params(client, auth_headers):
+    assert client.get('/api/appointments/export?format=xml', headers=auth_headers).status_code == 400
+    assert client.get('/api/appointments/export?from=yesterday', headers=auth_headers).status_code == 400
+    assert client.get('/api/appointments/export?doctor_id=999', headers=auth_headers).status_code == 404
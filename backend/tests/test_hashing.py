@@ -0,0 +1,74 @@
+import threading
+import pytest
+from hashing import password_hasher, HashingBusy
+from models import Patient
+from async_mode import async_mode_enabled
+
+# test hashes round-trip through the pool with the configured cost
+def test_hash_and_check(app):
+    password_hash = password_hasher.hash('testpass123')
+    assert password_hash.startswith('$2b$04$')
+    assert password_hasher.check(password_hash, 'testpass123')
+    assert not password_hasher.check(password_hash, 'wrongpass')
+    assert not password_hasher.needs_rehash(password_hash)
+
+# test login upgrades a hash made with an old cost
+def test_login_rehashes_on_cost_change(client, app, test_patient):
+    app.config['BCRYPT_LOG_ROUNDS'] = 5
+    try:
+        response = client.post('/api/patients/login', json={
+            'email': 'test@example.com',
+            'password': 'testpass123'
+        })
+        assert response.status_code == 200
+        patient = Patient.query.filter_by(email='test@example.com').first()
+        assert patient.password_hash.startswith('$2b$05$')
+        assert patient.check_password('testpass123')
+    finally:
+        app.config['BCRYPT_LOG_ROUNDS'] = 4
+
+# test the pending cap rejects work instead of queueing it
+def test_busy_hasher_returns_503(client, app, test_patient):
+    saved = {key: app.config[key] for key in ('PASSWORD_HASH_MAX_PENDING', 'PASSWORD_HASH_TIMEOUT')}
+    app.config.update({'PASSWORD_HASH_MAX_PENDING': 1, 'PASSWORD_HASH_TIMEOUT': 0.01})
+    password_hasher.shutdown()
+    started = threading.Event()
+    release = threading.Event()
+
+    # occupy the only slot until the test is done
+    def block():
+        started.set()
+        release.wait(5)
+
+    def hold():
+        with app.app_context():
+            password_hasher._run(block)
+
+    holder = threading.Thread(target=hold)
+    holder.start()
+    try:
+        started.wait(5)
+        with pytest.raises(HashingBusy):
+            password_hasher.hash('testpass123')
+        response = client.post('/api/patients/login', json={
+            'email': 'test@example.com',
+            'password': 'testpass123'
+        })
+        assert response.status_code == 503
+    finally:
+        release.set()
+        holder.join()
+        app.config.update(saved)
+        password_hasher.shutdown()
+
+# test threaded mode hashes on the calling thread, within limits taken from the current app
+@pytest.mark.skipif(async_mode_enabled(), reason="async mode hashes on native threads")
+def test_hashes_inline_with_app_limits(app):
+    app.config['PASSWORD_HASH_WORKERS'] = 2
+    threads = []
+    password_hasher._run(lambda: threads.append(threading.current_thread()))
+    assert threads == [threading.current_thread()]
+
+    app.config['PASSWORD_HASH_MAX_PENDING'] = 3
+    password_hasher._pool()
+    assert password_hasher._settings == (2, 3, False)
@@ -0,0 +1,51 @@
+from sqlalchemy import event
+from models import db, Patient
+from services import identity_cache
+
+# count the patient SELECTs issued while serving a request
+def patient_selects(fn):
+    statements = []
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if statement.startswith('SELECT') and 'FROM patient' in statement:
+            statements.append(statement)
+    engine = db.engine
+    event.listen(engine, 'before_cursor_execute', record)
+    try:
+        fn()
+    finally:
+        event.remove(engine, 'before_cursor_execute', record)
+    return len(statements)
+
+# test repeated authenticated requests reuse the cached identity
+def test_identity_cache_skips_lookup(client, auth_headers):
+    identity_cache.clear()
+    assert patient_selects(lambda: client.get('/api/patients/profile', headers=auth_headers)) == 1
+    assert patient_selects(lambda: client.get('/api/patients/profile', headers=auth_headers)) == 0
+    assert identity_cache.stats()['hits'] == 1
+    assert identity_cache.stats()['misses'] == 1
+
+# test updating the profile evicts the cached identity
+def test_identity_cache_invalidated_on_update(client, auth_headers):
+    client.get('/api/patients/profile', headers=auth_headers)
+    response = client.put('/api/patients/profile', headers=auth_headers, json={
+        'name': 'Renamed Patient',
+        'email': 'renamed@example.com',
+        'phone': '5555555555'
+    })
+    assert response.status_code == 200
+
+    profile = client.get('/api/patients/profile', headers=auth_headers).json
+    assert profile['name'] == 'Renamed Patient'
+    assert profile['email'] == 'renamed@example.com'
+
+# test a deleted patient is no longer served from the cache
+def test_identity_cache_invalidated_on_delete(client, auth_headers, test_patient):
+    client.get('/api/patients/profile', headers=auth_headers)
+    db.session.delete(db.session.get(Patient, test_patient.id))
+    db.session.commit()
+
+    response = client.post('/api/appointments/create', headers=auth_headers, json={
+        'doctor_id': 1,
+        'appointment_time': '2030-01-01 09:00'
+    })
+    assert response.status_code == 404
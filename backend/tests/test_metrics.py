@@ -0,0 +1,42 @@
+import logging
+import pytest
+from sqlalchemy.exc import OperationalError
+from models import db
+
+# test requests are recorded per route with their SQL statement counts
+def test_metrics_endpoint(client, test_doctor):
+    client.get('/api/doctors')
+    client.get(f'/api/doctors/{test_doctor.id}/availability?from=tomorrow')
+
+    response = client.get('/api/metrics')
+    assert response.status_code == 200
+    assert response.content_type.startswith('text/plain')
+    body = response.get_data(as_text=True)
+    assert 'http_requests_total{method="GET",route="/api/doctors",status="200"} 1' in body
+    assert 'http_requests_total{method="GET",route="/api/doctors/<int:doctor_id>/availability",status="400"} 1' in body
+    assert 'http_request_duration_seconds_count{method="GET",route="/api/doctors"} 1' in body
+    assert 'db_statements_per_request_count{method="GET",route="/api/doctors"} 1' in body
+    assert 'db_statements_per_request_bucket{method="GET",route="/api/doctors",le="0"} 0' in body
+    assert 'identity_cache_hits_total' in body
+    assert 'route="/api/metrics"' not in body
+
+# test requests over the statement budget are logged and counted
+def test_statement_budget_warning(client, app, auth_headers, caplog):
+    budget = app.config['SQL_STATEMENT_BUDGET']
+    app.config['SQL_STATEMENT_BUDGET'] = 0
+    try:
+        with caplog.at_level(logging.WARNING):
+            client.get('/api/appointments', headers=auth_headers)
+    finally:
+        app.config['SQL_STATEMENT_BUDGET'] = budget
+
+    assert 'GET /api/appointments issued' in caplog.text
+    body = client.get('/api/metrics').get_data(as_text=True)
+    assert 'db_statement_budget_exceeded_total{method="GET",route="/api/appointments"} 1' in body
+
+# test a failed statement doesn't leave its start time behind
+def test_failed_statement_timing(app):
+    connection = db.session.connection()
+    with pytest.raises(OperationalError):
+        connection.exec_driver_sql('SELECT * FROM missing_table')
+    assert connection.info.get('query_started') == []
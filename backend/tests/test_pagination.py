@@ -0,0 +1,59 @@
+from datetime import datetime, timedelta
+from models import db, Patient, Appointment
+
+# walk a paginated endpoint and return every row plus the number of pages
+def walk(client, url, headers=None):
+    rows, pages, cursor = [], 0, None
+    while True:
+        separator = '&' if '?' in url else '?'
+        response = client.get(url + (f'{separator}cursor={cursor}' if cursor else ''), headers=headers)
+        assert response.status_code == 200
+        rows.extend(response.json)
+        pages += 1
+        cursor = response.headers.get('X-Next-Cursor')
+        if not cursor:
+            return rows, pages
+
+# test walking a 100k appointment schedule page by page
+def test_walk_doctor_appointments(client, auth_headers, test_patient, test_doctor):
+    start = datetime(2030, 1, 1, 9, 0)
+    # Several appointments share a time (canceled ones) so the id tiebreak is exercised
+    db.session.execute(db.insert(Appointment), [{
+        'doctor_id': test_doctor.id,
+        'patient_id': test_patient.id,
+        'appointment_time': start + timedelta(minutes=30 * (i // 2)),
+        'status': 'scheduled' if i % 2 else 'canceled'
+    } for i in range(100000)])
+    db.session.commit()
+
+    rows, pages = walk(client, f'/api/doctors/{test_doctor.id}/appointments?limit=1000', auth_headers)
+    assert pages == 100
+    assert len(rows) == 100000
+    assert len({row['id'] for row in rows}) == 100000
+    times = [row['appointment_time'] for row in rows]
+    assert times == sorted(times)
+
+# test the default and maximum page sizes
+def test_page_limits(client, app, test_doctor):
+    for i in range(5):
+        patient = Patient(name=f'Patient {i}', email=f'patient{i}@example.com', phone='1234567890')
+        db.session.add(patient)
+    db.session.commit()
+
+    rows, pages = walk(client, '/api/patients?limit=2')
+    assert pages == 3
+    assert [row['email'] for row in rows] == [f'patient{i}@example.com' for i in range(5)]
+
+    response = client.get('/api/patients')
+    assert len(response.json) == 5
+    assert 'X-Next-Cursor' not in response.headers
+
+    assert client.get('/api/doctors?limit=0').status_code == 400
+    assert client.get(f'/api/doctors?limit={app.config["PAGINATION_MAX_LIMIT"] + 1}').status_code == 400
+    assert client.get('/api/doctors?limit=abc').status_code == 400
+
+# test a tampered cursor is rejected
+def test_invalid_cursor(client, auth_headers):
+    response = client.get('/api/appointments?cursor=not-a-cursor', headers=auth_headers)
+    assert response.status_code == 400
+    assert response.json['msg'] == 'Invalid cursor'
@@ -0,0 +1,59 @@
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.pool import StaticPool
+from models import db, Doctor, Appointment
+
+# attach a separate in-memory database as the 'replica' bind
+@pytest.fixture
+def replica(app):
+    engine = create_engine('sqlite://', poolclass=StaticPool, connect_args={'check_same_thread': False})
+    db.metadata.create_all(engine)
+    engines = db._app_engines[app]
+    engines['replica'] = engine
+    yield engine
+    db.session.remove()
+    del engines['replica']
+    engine.dispose()
+
+# test read-only routes query the replica
+def test_reads_go_to_replica(client, replica, test_doctor):
+    with replica.begin() as conn:
+        conn.execute(db.insert(Doctor), [{'name': 'Dr. Replica', 'email': 'replica@example.com', 'phone': '5550001111', 'is_doctor': True}])
+
+    emails = [d['email'] for d in client.get('/api/doctors').json]
+    assert emails == ['replica@example.com']
+
+# test a client that just wrote reads its own write from the primary
+def test_read_your_writes(client, replica, auth_headers, test_doctor):
+    with replica.begin() as conn:
+        conn.execute(db.insert(Doctor), [{'id': test_doctor.id, 'name': 'Test Doctor', 'email': 'doctor@example.com', 'phone': '0987654321', 'is_doctor': True}])
+
+    # Nothing written yet, the (empty) replica answers
+    assert client.get(f'/api/doctors/{test_doctor.id}/appointments', headers=auth_headers).json == []
+
+    response = client.post('/api/appointments/create', headers=auth_headers, json={
+        'doctor_id': test_doctor.id,
+        'appointment_time': '2030-01-01 10:00'
+    })
+    assert response.status_code == 201
+    appointments = client.get(f'/api/doctors/{test_doctor.id}/appointments', headers=auth_headers).json
+    assert [a['appointment_time'] for a in appointments] == ['2030-01-01 10:00']
+
+# test writes never go to the replica
+def test_writes_go_to_primary(client, replica, auth_headers, test_doctor):
+    client.post('/api/appointments/create', headers=auth_headers, json={
+        'doctor_id': test_doctor.id,
+        'appointment_time': '2030-01-01 10:00'
+    })
+    assert Appointment.query.count() == 1
+    with replica.connect() as conn:
+        assert conn.execute(db.select(db.func.count()).select_from(Appointment)).scalar() == 0
+
+# test directory responses read from a replica right after a doctor write aren't cached
+def test_no_caching_replica_reads_after_write(client, replica, test_doctor):
+    # test_doctor was just written, so this replica read must not be cached
+    assert client.get('/api/doctors').json == []
+
+    with replica.begin() as conn:
+        conn.execute(db.insert(Doctor), [{'name': 'Dr. Replica', 'email': 'replica@example.com', 'phone': '5550001111', 'is_doctor': True}])
+    assert [d['email'] for d in client.get('/api/doctors').json] == ['replica@example.com']
@@ -0,0 +1,51 @@
+from models import db, Doctor
+from services import response_cache
+
+# test the doctor list carries an ETag and honours If-None-Match
+def test_doctors_etag_not_modified(client, test_doctor):
+    response = client.get('/api/doctors')
+    assert response.status_code == 200
+    etag = response.headers['ETag']
+
+    cached = client.get('/api/doctors', headers={'If-None-Match': etag})
+    assert cached.status_code == 304
+    assert cached.data == b''
+
+# test the cached list is rebuilt after a doctor write
+def test_doctors_cache_invalidated_on_write(client, test_doctor):
+    etag = client.get('/api/doctors').headers['ETag']
+
+    db.session.add(Doctor(name='Dr. New', email='new.doctor@example.com', phone='5550001111', specialization='Cardiology'))
+    db.session.commit()
+
+    response = client.get('/api/doctors', headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.headers['ETag'] != etag
+    assert any(d['email'] == 'new.doctor@example.com' for d in response.json)
+
+# test different pages are cached separately
+def test_doctors_cache_keyed_by_query(client, test_doctor):
+    db.session.add(Doctor(name='Dr. Two', email='two@example.com', phone='5550001111', specialization='Cardiology'))
+    db.session.commit()
+
+    first = client.get('/api/doctors?limit=1')
+    assert len(first.json) == 1
+    assert 'X-Next-Cursor' in first.headers
+    assert len(client.get('/api/doctors').json) == 2
+    again = client.get('/api/doctors?limit=1')
+    assert again.headers['X-Next-Cursor'] == first.headers['X-Next-Cursor']
+    assert client.get('/api/doctors?limit=0').status_code == 400
+
+# test unread query parameters share an entry and the number of entries is bounded
+def test_doctors_cache_bounded(app, client, test_doctor):
+    app.config['RESPONSE_CACHE_SIZE'] = 2
+    # The doctor was just written, responses are only cached once a replica would have caught up
+    app.config['REPLICA_READ_AFTER_WRITE_SECONDS'] = 0
+    for i in range(5):
+        assert client.get(f'/api/doctors?x={i}').status_code == 200
+    assert len(response_cache._entries) == 1
+
+    for limit in (1, 2, 3):
+        client.get(f'/api/doctors?limit={limit}')
+    assert len(response_cache._entries) == 2
+    assert response_cache.get('doctors', ('/api/doctors', '3', None)) is not None
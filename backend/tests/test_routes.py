@@ -1,69 +1,5 @@
-import pytest
 from datetime import datetime, timedelta
-from app import app as flask_app
-from models import db, Patient, Doctor, Appointment
-
-# create a test app and test client
-@pytest.fixture
-def app():
-    flask_app.config.update({
-        'TESTING': True,
-        'SQLALCHEMY_DATABASE_URI': 'sqlite:///:memory:',
-        'JWT_SECRET_KEY': 'test-secret-key'
-    })
-
-    with flask_app.app_context():
-        db.create_all()
-        yield flask_app
-        db.session.remove()
-        db.drop_all()
-
-# start test client
-@pytest.fixture
-def client(app):
-    return app.test_client()
-
-# create a test patient
-@pytest.fixture
-def test_patient(app):
-    with app.app_context():
-        patient = Patient(
-            name="Test Patient",
-            email="test@example.com",
-            phone="1234567890"
-        )
-        patient.set_password("testpass123")
-        db.session.add(patient)
-        db.session.commit()
-        print(patient.id)
-        return patient
-
-# create a test doctor
-@pytest.fixture
-def test_doctor(app):
-    with app.app_context():
-        doctor = Doctor(
-            name="Test Doctor",
-            email="doctor@example.com",
-            phone="0987654321",
-            specialization="General",
-            is_doctor=True
-        )
-        db.session.add(doctor)
-        db.session.commit()
-
-        print(doctor.id)
-        return doctor
-
-# create a test auth headers
-@pytest.fixture
-def auth_headers(client, test_patient):
-    response = client.post('/api/patients/login', json={
-        'email': 'test@example.com',
-        'password': 'testpass123'
-    })
-    token = response.json['access_token']
-    return {'Authorization': f'Bearer {token}'}
+from models import db, Appointment
 
 # test patient registration
 def test_patient_registration(client):
@@ -246,4 +182,53 @@ def test_double_booking_prevention(client, auth_headers, test_doctor, test_patie
             }
         )
         assert second_response.status_code == 400
-        assert b'Time slot is already taken' in second_response.data 
\ No newline at end of file
+        assert b'Time slot is already taken' in second_response.data 
+
+# test rescheduling into a taken slot is rejected
+def test_update_appointment_into_taken_slot(client, auth_headers, test_patient, test_doctor, app):
+    with app.app_context():
+        taken_time = (datetime.now() + timedelta(days=1)).replace(second=0, microsecond=0)
+        taken = Appointment(
+            patient_id=test_patient.id,
+            doctor_id=test_doctor.id,
+            appointment_time=taken_time,
+            status='scheduled'
+        )
+        moving = Appointment(
+            patient_id=test_patient.id,
+            doctor_id=test_doctor.id,
+            appointment_time=taken_time + timedelta(hours=1),
+            status='scheduled'
+        )
+        db.session.add_all([taken, moving])
+        db.session.commit()
+
+        response = client.put(
+            f'/api/appointments/{moving.id}',
+            headers=auth_headers,
+            json={'appointment_time': taken_time.strftime("%Y-%m-%d %H:%M")}
+        )
+        assert response.status_code == 400
+        assert b'Time slot is already taken' in response.data
+
+# test a canceled slot can be booked again
+def test_rebook_canceled_slot(client, auth_headers, test_patient, test_doctor, app):
+    with app.app_context():
+        appointment_time = (datetime.now() + timedelta(days=1)).replace(second=0, microsecond=0)
+        canceled = Appointment(
+            patient_id=test_patient.id,
+            doctor_id=test_doctor.id,
+            appointment_time=appointment_time,
+            status='canceled'
+        )
+        db.session.add(canceled)
+        db.session.commit()
+
+        response = client.post('/api/appointments/create',
+            headers=auth_headers,
+            json={
+                'doctor_id': test_doctor.id,
+                'appointment_time': appointment_time.strftime("%Y-%m-%d %H:%M")
+            }
+        )
+        assert response.status_code == 201
@@ -0,0 +1,146 @@
+import pytest
+from datetime import date, datetime
+from sqlalchemy import event
+from models import db, Appointment
+from services import schedule_cache, LocalLRUBackend, MemoryKVBackend
+from sweeper import sweep_overdue_appointments
+
+def schedule(client, headers, doctor, query='from=2030-01-01&to=2030-01-03'):
+    response = client.get(f'/api/doctors/{doctor.id}/appointments?{query}', headers=headers)
+    return [(a['appointment_time'], a['status']) for a in response.json]
+
+# The in-process backend stands in for the shared one, the default leaves caching off
+@pytest.fixture(autouse=True)
+def local_cache(app):
+    schedule_cache.reset(LocalLRUBackend())
+    yield
+    schedule_cache.reset()
+
+def count_appointment_queries(client, url, headers):
+    statements = []
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if 'FROM appointment ' in statement:
+            statements.append(statement)
+    event.listen(db.engine, 'before_cursor_execute', record)
+    try:
+        client.get(url, headers=headers)
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', record)
+    return len(statements)
+
+# test repeated reads of a window are served from the cached day blocks
+def test_schedule_served_from_cache(client, auth_headers, test_doctor, book):
+    book(auth_headers, test_doctor, '2030-01-01 10:00')
+    book(auth_headers, test_doctor, '2030-01-02 11:00')
+    url = f'/api/doctors/{test_doctor.id}/appointments?from=2030-01-01&to=2030-01-03'
+
+    assert count_appointment_queries(client, url, auth_headers) == 3
+    assert count_appointment_queries(client, url, auth_headers) == 0
+    assert schedule(client, auth_headers, test_doctor) == [('2030-01-01 10:00', 'scheduled'), ('2030-01-02 11:00', 'scheduled')]
+
+    # Pages and status filters are cut from the cached rows
+    response = client.get(f'{url}&limit=1', headers=auth_headers)
+    assert len(response.json) == 1
+    response = client.get(f'{url}&limit=1&cursor={response.headers["X-Next-Cursor"]}', headers=auth_headers)
+    assert response.json[0]['appointment_time'] == '2030-01-02 11:00'
+    assert 'X-Next-Cursor' not in response.headers
+    assert schedule(client, auth_headers, test_doctor, 'from=2030-01-01&to=2030-01-03&status=canceled') == []
+
+# test create, update and cancel only invalidate the days they touch
+def test_writes_invalidate_touched_days(client, auth_headers, test_doctor, book):
+    appointment_id = book(auth_headers, test_doctor, '2030-01-01 10:00').json['appointment_id']
+    url = f'/api/doctors/{test_doctor.id}/appointments?from=2030-01-01&to=2030-01-03'
+    assert schedule(client, auth_headers, test_doctor) == [('2030-01-01 10:00', 'scheduled')]
+
+    book(auth_headers, test_doctor, '2030-01-03 09:00')
+    assert count_appointment_queries(client, url, auth_headers) == 1
+    assert schedule(client, auth_headers, test_doctor)[-1] == ('2030-01-03 09:00', 'scheduled')
+
+    # A reschedule leaves one day and lands on another
+    client.put(f'/api/appointments/{appointment_id}', json={'appointment_time': '2030-01-02 14:00'}, headers=auth_headers)
+    assert count_appointment_queries(client, url, auth_headers) == 2
+    assert schedule(client, auth_headers, test_doctor) == [('2030-01-02 14:00', 'scheduled'), ('2030-01-03 09:00', 'scheduled')]
+
+    client.delete(f'/api/appointments/{appointment_id}', headers=auth_headers)
+    assert schedule(client, auth_headers, test_doctor)[0] == ('2030-01-02 14:00', 'canceled')
+    assert client.delete(f'/api/appointments/{appointment_id}/delete', headers=auth_headers).status_code == 200
+    assert schedule(client, auth_headers, test_doctor) == [('2030-01-03 09:00', 'scheduled')]
+
+    # Bulk statements don't name their days, so they invalidate everything
+    db.session.execute(db.update(Appointment).values(notes='Bulk'))
+    db.session.commit()
+    assert count_appointment_queries(client, url, auth_headers) == 3
+
+# test series occurrences are cached with the day and refreshed when the series changes
+def test_series_changes_invalidate_doctor(client, auth_headers, test_doctor):
+    response = client.post('/api/appointments/series', json={
+        'doctor_id': test_doctor.id,
+        'appointment_time': '2030-01-01 10:00',
+        'interval_days': 1,
+        'occurrences': 3
+    }, headers=auth_headers)
+    series_id = response.json['series_id']
+    assert len(schedule(client, auth_headers, test_doctor)) == 3
+
+    client.put(f'/api/appointments/series/{series_id}/occurrences', json={
+        'original_time': '2030-01-02 10:00', 'status': 'canceled'
+    }, headers=auth_headers)
+    assert schedule(client, auth_headers, test_doctor)[1] == ('2030-01-02 10:00', 'canceled')
+
+# test workers sharing a store see each other's invalidations, and rollbacks leave blocks valid
+def test_shared_backend_across_workers(app, test_patient, test_doctor):
+    other_worker = MemoryKVBackend()
+    schedule_cache.reset(MemoryKVBackend(store=other_worker))
+    try:
+        day = date(2030, 1, 1)
+        assert schedule_cache.get_days(test_doctor.id, [day]) == []
+
+        db.session.add(Appointment(doctor_id=test_doctor.id, patient_id=test_patient.id, appointment_time=datetime(2030, 1, 1, 10, 0)))
+        db.session.commit()
+        rows = schedule_cache.get_days(test_doctor.id, [day])
+        assert [row.status for row in rows] == ['scheduled']
+        assert other_worker.get_many([f'schedule:block:{test_doctor.id}:2030-01-01']) != [None]
+
+        appointment = db.session.get(Appointment, rows[0].id)
+        appointment.status = 'canceled'
+        db.session.flush()
+        db.session.rollback()
+        assert [row.status for row in schedule_cache.get_days(test_doctor.id, [day])] == ['scheduled']
+    finally:
+        schedule_cache.reset()
+
+# test caching is off unless a shared store is configured
+def test_cache_off_by_default(app, client, auth_headers, test_doctor):
+    schedule_cache.reset()
+    assert app.config['SCHEDULE_CACHE_BACKEND'] == 'none'
+    assert schedule_cache.backend is None
+    url = f'/api/doctors/{test_doctor.id}/appointments?from=2030-01-01&to=2030-01-03'
+    assert client.get(url, headers=auth_headers).status_code == 200
+
+# test the status sweeper only invalidates the days it completed appointments on
+def test_sweeper_invalidates_completed_days(client, auth_headers, test_patient, test_doctor):
+    db.session.add(Appointment(doctor_id=test_doctor.id, patient_id=test_patient.id, appointment_time=datetime(2020, 1, 1, 10, 0)))
+    db.session.commit()
+    past = f'/api/doctors/{test_doctor.id}/appointments?from=2020-01-01&to=2020-01-02'
+    future = f'/api/doctors/{test_doctor.id}/appointments?from=2030-01-01&to=2030-01-03'
+    count_appointment_queries(client, past, auth_headers)
+    count_appointment_queries(client, future, auth_headers)
+
+    assert sweep_overdue_appointments(now=datetime(2025, 1, 1)) == 1
+    assert count_appointment_queries(client, past, auth_headers) == 1
+    assert count_appointment_queries(client, future, auth_headers) == 0
+
+    # A sweep with nothing to complete leaves every block valid
+    assert sweep_overdue_appointments(now=datetime(2025, 1, 1)) == 0
+    assert count_appointment_queries(client, past, auth_headers) == 0
+
+# test the in-process backend evicts the least recently used blocks
+def test_local_backend_lru():
+    backend = LocalLRUBackend(max_entries=2)
+    backend.set('a', '1', 60)
+    backend.set('b', '2', 60)
+    backend.get_many(['a'])
+    backend.set('c', '3', 60)
+    assert backend.get_many(['a', 'b', 'c']) == ['1', None, '3']
+    first = backend.incr('gen', 60)
+    assert backend.incr('gen', 60) == first + 1
@@ -0,0 +1,61 @@
+from datetime import datetime, timedelta
+from sqlalchemy import event
+from models import db, Appointment
+
+def add_week(patient, doctor):
+    statuses = ['scheduled', 'canceled', 'completed']
+    db.session.execute(db.insert(Appointment), [{
+        'doctor_id': doctor.id,
+        'patient_id': patient.id,
+        'appointment_time': datetime(2030, 1, 1, 9, 0) + timedelta(days=i),
+        'status': statuses[i % 3]
+    } for i in range(7)])
+    db.session.commit()
+
+# run a request and return the query plan of the appointment listing it issued
+def appointment_query_plan(client, url, headers):
+    statements = []
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if 'FROM appointment' in statement and 'ORDER BY' in statement:
+            statements.append((statement, parameters))
+    event.listen(db.engine, 'before_cursor_execute', record)
+    try:
+        response = client.get(url, headers=headers)
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', record)
+    statement, parameters = statements[-1]
+    plan = db.session.connection().exec_driver_sql('EXPLAIN QUERY PLAN ' + statement, parameters).fetchall()
+    return response, ' '.join(row[-1] for row in plan)
+
+# test date range and status filters on a doctor's schedule
+def test_doctor_schedule_filters(client, auth_headers, test_patient, test_doctor):
+    add_week(test_patient, test_doctor)
+    url = f'/api/doctors/{test_doctor.id}/appointments'
+
+    response = client.get(f'{url}?from=2030-01-02&to=2030-01-04', headers=auth_headers)
+    assert [a['appointment_time'] for a in response.json] == ['2030-01-02 09:00', '2030-01-03 09:00', '2030-01-04 09:00']
+
+    response = client.get(f'{url}?status=canceled', headers=auth_headers)
+    assert {a['status'] for a in response.json} == {'canceled'}
+    assert len(response.json) == 2
+
+    assert client.get(f'{url}?status=lost', headers=auth_headers).status_code == 400
+    assert client.get(f'{url}?from=01/02/2030', headers=auth_headers).status_code == 400
+
+# test filters on the caller's appointments
+def test_appointment_list_filters(client, auth_headers, test_patient, test_doctor):
+    add_week(test_patient, test_doctor)
+    response = client.get('/api/appointments?from=2030-01-06&status=scheduled', headers=auth_headers)
+    assert [a['appointment_time'] for a in response.json] == ['2030-01-07 09:00']
+
+# test the range filters are served by the schedule indexes
+def test_schedule_range_uses_index(client, auth_headers, test_patient, test_doctor):
+    add_week(test_patient, test_doctor)
+
+    _, plan = appointment_query_plan(client, f'/api/doctors/{test_doctor.id}/appointments?from=2030-01-02&to=2030-01-04', auth_headers)
+    assert 'ix_appointment_doctor_time' in plan
+    assert 'appointment_time>' in plan.replace(' ', '')
+
+    _, plan = appointment_query_plan(client, '/api/appointments?from=2030-01-02&to=2030-01-04', auth_headers)
+    assert 'ix_appointment_patient_time' in plan
+    assert 'SCAN appointment' not in plan
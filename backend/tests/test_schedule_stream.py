@@ -0,0 +1,169 @@
+import json
+import queue
+from types import SimpleNamespace
+from datetime import datetime
+import pytest
+import services.schedule_stream
+from models import db, Patient, Appointment
+from services import schedule_broker, MemoryRelay
+from services.schedule_stream import CHANNEL, RedisRelay
+
+def open_stream(client, headers, query=''):
+    response = client.get(f'/api/stream/schedule{query}', headers=headers, buffered=False)
+    assert response.status_code == 200
+    assert response.mimetype == 'text/event-stream'
+    events = iter(response.response)
+    assert next(events) == b'retry: 5000\n\n'
+    return response, events
+
+def parse(chunk):
+    lines = dict(line.split(': ', 1) for line in chunk.decode('utf-8').strip().split('\n'))
+    return lines['event'], json.loads(lines['data'])
+
+# test committed creates, updates and cancellations reach the patient's and the doctor's streams
+def test_stream_receives_committed_events(app, client, auth_headers, test_doctor, book):
+    app.config['STREAM_HEARTBEAT_SECONDS'] = 0.05
+    own, own_events = open_stream(client, auth_headers)
+    schedule, schedule_events = open_stream(client, auth_headers, f'?doctor_id={test_doctor.id}')
+    assert schedule_broker.subscribers == 2
+    try:
+        appointment_id = book(auth_headers, test_doctor, '2030-01-01 10:00').json['appointment_id']
+        event_name, data = parse(next(own_events))
+        assert event_name == 'created'
+        assert data == {'id': appointment_id, 'doctor_id': test_doctor.id, 'patient_id': 1,
+                        'appointment_time': '2030-01-01 10:00', 'status': 'scheduled', 'version': 1}
+        # Doctor streams carry the doctor schedule listing's fields
+        assert parse(next(schedule_events)) == ('created', {'id': appointment_id, 'patient_id': 1,
+                                                            'appointment_time': '2030-01-01 10:00', 'status': 'scheduled'})
+
+        client.put(f'/api/appointments/{appointment_id}', json={'appointment_time': '2030-01-02 10:00'}, headers=auth_headers)
+        client.delete(f'/api/appointments/{appointment_id}', headers=auth_headers)
+        assert [parse(next(own_events))[0] for _ in range(2)] == ['updated', 'canceled']
+
+        # Idle streams send keepalive comments
+        assert next(own_events) == b': keepalive\n\n'
+    finally:
+        own.close()
+        schedule.close()
+    assert schedule_broker.subscribers == 0
+
+# test rolled back writes and other patients' appointments are not pushed
+def test_stream_filters_and_rollbacks(app, client, auth_headers, test_doctor, book):
+    app.config['STREAM_HEARTBEAT_SECONDS'] = 0.05
+    response, events = open_stream(client, auth_headers)
+    try:
+        appointment_id = book(auth_headers, test_doctor, '2030-01-01 10:00').json['appointment_id']
+        assert parse(next(events))[0] == 'created'
+
+        appointment = db.session.get(Appointment, appointment_id)
+        appointment.status = 'canceled'
+        db.session.flush()
+        db.session.rollback()
+
+        other = Patient(name='Other Patient', email='other@example.com', phone='5555555555')
+        other.set_password('otherpass123')
+        db.session.add(other)
+        db.session.commit()
+        db.session.add(Appointment(doctor_id=test_doctor.id, patient_id=other.id, appointment_time=datetime(2030, 1, 1, 11)))
+        db.session.commit()
+        assert next(events) == b': keepalive\n\n'
+    finally:
+        response.close()
+
+# test workers sharing a relay push each other's writes to their subscribers
+def test_shared_relay_across_workers(app, test_patient, test_doctor):
+    other_worker = MemoryRelay()
+    schedule_broker.reset(MemoryRelay(hub=other_worker))
+    received = []
+    other_worker.start(received.extend)
+    try:
+        subscription = schedule_broker.subscribe([('doctor', test_doctor.id)], limit=10)
+        db.session.add(Appointment(doctor_id=test_doctor.id, patient_id=test_patient.id, appointment_time=datetime(2030, 1, 1, 10)))
+        db.session.commit()
+        assert [message['event'] for message in received] == ['created']
+        assert [name for name, data in subscription.wait(0)] == ['created']
+        schedule_broker.unsubscribe(subscription)
+    finally:
+        schedule_broker.reset()
+
+class StubRedis:
+    """Just enough of a Redis server's pub/sub for RedisRelay, shared by the clients built from it."""
+
+    def __init__(self):
+        self.urls = []
+        self.published = []
+        self._subscribers = []
+
+    def from_url(self, url):
+        self.urls.append(url)
+        return self
+
+    def pubsub(self, ignore_subscribe_messages=False):
+        assert ignore_subscribe_messages
+        return StubPubSub(self)
+
+    def publish(self, channel, data):
+        self.published.append(channel)
+        for pubsub in self._subscribers:
+            if channel in pubsub.channels:
+                pubsub.messages.put({'type': 'message', 'channel': channel, 'data': data})
+
+class StubPubSub:
+    def __init__(self, server):
+        self.server = server
+        self.channels = set()
+        self.messages = queue.Queue()
+
+    def subscribe(self, channel):
+        self.channels.add(channel)
+        self.server._subscribers.append(self)
+
+    def listen(self):
+        while True:
+            yield self.messages.get()
+
+# test the Redis relay publishes on its channel and delivers what other workers publish
+def test_redis_relay(app, test_patient, test_doctor, monkeypatch):
+    server = StubRedis()
+    monkeypatch.setattr(services.schedule_stream, 'redis', SimpleNamespace(Redis=server))
+    other_worker = RedisRelay('redis://cache:6379/0')
+    received = queue.Queue()
+    other_worker.start(received.put)
+    schedule_broker.reset(RedisRelay('redis://cache:6379/0'))
+    try:
+        subscription = schedule_broker.subscribe([('doctor', test_doctor.id)], limit=10)
+        db.session.add(Appointment(doctor_id=test_doctor.id, patient_id=test_patient.id, appointment_time=datetime(2030, 1, 1, 10)))
+        db.session.commit()
+        assert server.urls == ['redis://cache:6379/0'] * 2
+        assert server.published == [CHANNEL]
+        assert [message['event'] for message in received.get(timeout=1)] == ['created']
+        assert [name for name, data in subscription.wait(1)] == ['created']
+        schedule_broker.unsubscribe(subscription)
+    finally:
+        schedule_broker.reset()
+
+    # Without the package the relay can't be built
+    monkeypatch.setattr(services.schedule_stream, 'redis', None)
+    with pytest.raises(RuntimeError):
+        RedisRelay('redis://cache:6379/0')
+
+# test a full process refuses new streams, and a client that falls behind is told to resync
+def test_stream_limits(app, client, auth_headers, test_doctor):
+    app.config['STREAM_MAX_SUBSCRIBERS'] = app.config['STREAM_THREADED_MAX_SUBSCRIBERS'] = 1
+    assert client.get('/api/stream/schedule').status_code == 401
+    assert client.get('/api/stream/schedule?doctor_id=abc', headers=auth_headers).status_code == 400
+
+    response, events = open_stream(client, auth_headers)
+    try:
+        refused = client.get('/api/stream/schedule', headers=auth_headers)
+        assert refused.status_code == 503
+        assert refused.headers['Retry-After'] == '5'
+
+        subscription, = schedule_broker._subscribers[('patient', 1)]
+        for i in range(101):
+            subscription.push('updated', {'id': i})
+        assert next(events) == b'event: resync\ndata: {}\n\n'
+        assert next(events, None) is None
+    finally:
+        response.close()
+    assert schedule_broker.subscribers == 0
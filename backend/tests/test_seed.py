@@ -0,0 +1,34 @@
+from collections import Counter
+from datetime import datetime, time
+from models import Patient, Doctor, Appointment
+from seed import seed_synthetic, SYNTHETIC_PASSWORD
+
+# test the synthetic seeder loads the requested counts without clashing slots
+def test_seed_synthetic_counts_and_slots(app):
+    now = datetime(2026, 3, 11, 12, 0)
+    seed_synthetic(patients=50, doctors=4, appointments=2000, seed=7, chunk_size=300, now=now)
+    assert Patient.query.count() == 50
+    assert Doctor.query.count() == 4
+    appointments = Appointment.query.all()
+    assert len(appointments) == 2000
+
+    scheduled = Counter((a.doctor_id, a.appointment_time) for a in appointments if a.status == 'scheduled')
+    assert max(scheduled.values()) == 1
+    for appointment in appointments:
+        assert appointment.appointment_time.weekday() < 5
+        assert time(9, 0) <= appointment.appointment_time.time() < time(17, 0)
+        if appointment.status == 'scheduled':
+            assert appointment.appointment_time >= now
+        else:
+            assert appointment.status in ('completed', 'canceled')
+    assert any(a.appointment_time < now for a in appointments)
+    assert any(a.appointment_time >= now for a in appointments)
+
+# test every synthetic patient logs in with the shared password
+def test_seed_synthetic_shared_password(client):
+    seed_synthetic(patients=3, doctors=1, appointments=0)
+    response = client.post('/api/patients/login', json={
+        'email': 'patient3@synthetic.example.com',
+        'password': SYNTHETIC_PASSWORD
+    })
+    assert response.status_code == 200
@@ -0,0 +1,27 @@
+from datetime import datetime
+from services import serialization
+from services.serialization import format_time, serialize_appointments, json_response
+
+# test the fast formatter matches the format the API has always used
+def test_format_time_matches_strftime():
+    value = datetime(2030, 1, 2, 3, 4, 59, 123456)
+    assert format_time(value) == value.strftime("%Y-%m-%d %H:%M")
+
+# test projected rows become response dicts with effective statuses
+def test_serialize_appointments():
+    fields = ('id', 'appointment_time', 'status')
+    rows = [(1, datetime(2030, 1, 1, 9, 0), 'scheduled'), (2, datetime(2020, 1, 1, 9, 0), 'scheduled')]
+    assert serialize_appointments(rows, fields) == [
+        {'id': 1, 'appointment_time': '2030-01-01 09:00', 'status': 'scheduled'},
+        {'id': 2, 'appointment_time': '2020-01-01 09:00', 'status': 'scheduled'}
+    ]
+    assert serialize_appointments(rows, fields, now=datetime(2025, 1, 1))[1]['status'] == 'completed'
+
+# test responses are the same JSON with or without orjson
+def test_json_response_without_orjson(app, monkeypatch):
+    data = [{'id': 1, 'notes': 'café'}]
+    fast = json_response(data)
+    monkeypatch.setattr(serialization, 'orjson', None)
+    fallback = json_response(data)
+    assert fast.get_json() == fallback.get_json() == data
+    assert fallback.mimetype == 'application/json'
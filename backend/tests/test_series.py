@@ -0,0 +1,126 @@
+from types import SimpleNamespace
+import routes.routes
+from models import db, Appointment, AppointmentSeries, SeriesException, lock_schedules
+
+def create_series(client, headers, doctor, appointment_time='2030-01-01 10:00', occurrences=10, interval_days=7):
+    return client.post('/api/appointments/series', json={
+        'doctor_id': doctor.id,
+        'appointment_time': appointment_time,
+        'interval_days': interval_days,
+        'occurrences': occurrences,
+        'notes': 'Physiotherapy'
+    }, headers=headers)
+
+# test a series stores only its template and blocks its future occurrences
+def test_series_conflicts_without_materialising(client, auth_headers, test_doctor, book):
+    response = create_series(client, auth_headers, test_doctor)
+    assert response.status_code == 201
+    assert Appointment.query.count() == 1
+
+    assert book(auth_headers, test_doctor, '2030-01-15 10:00').status_code == 400
+    assert book(auth_headers, test_doctor, '2030-01-15 10:30').status_code == 201
+    # Past the last occurrence the slot is free again
+    assert book(auth_headers, test_doctor, '2030-03-12 10:00').status_code == 201
+
+    # A second series that would land on an existing booking is rejected
+    response = create_series(client, auth_headers, test_doctor, appointment_time='2030-01-01 10:30', occurrences=4)
+    assert response.status_code == 400
+    assert response.json['conflicts'] == ['2030-01-15 10:30']
+    response = create_series(client, auth_headers, test_doctor, appointment_time='2029-12-25 10:00', occurrences=3)
+    assert response.status_code == 400
+
+    assert create_series(client, auth_headers, test_doctor, occurrences=200).status_code == 400
+
+# test schedules list expanded occurrences and page through them
+def test_series_occurrences_in_listings(client, auth_headers, test_doctor, book):
+    create_series(client, auth_headers, test_doctor)
+    book(auth_headers, test_doctor, '2030-01-09 09:00')
+    url = f'/api/doctors/{test_doctor.id}/appointments'
+
+    response = client.get(f'{url}?from=2030-01-08&to=2030-01-15', headers=auth_headers)
+    assert [a['appointment_time'] for a in response.json] == ['2030-01-08 10:00', '2030-01-09 09:00', '2030-01-15 10:00']
+
+    times = []
+    next_url = f'{url}?limit=3'
+    while next_url:
+        response = client.get(next_url, headers=auth_headers)
+        times.extend(a['appointment_time'] for a in response.json)
+        cursor = response.headers.get('X-Next-Cursor')
+        next_url = f'{url}?limit=3&cursor={cursor}' if cursor else None
+    assert len(times) == 11
+    assert times == sorted(times)
+    assert times[:3] == ['2030-01-01 10:00', '2030-01-08 10:00', '2030-01-09 09:00']
+
+    response = client.get('/api/appointments?from=2030-03-01', headers=auth_headers)
+    assert [a['appointment_time'] for a in response.json] == ['2030-03-05 10:00']
+
+# test moving and canceling single occurrences stores sparse exceptions
+def test_series_exceptions(client, auth_headers, test_doctor, book):
+    series_id = create_series(client, auth_headers, test_doctor).json['series_id']
+    url = f'/api/appointments/series/{series_id}/occurrences'
+
+    response = client.put(url, json={'original_time': '2030-01-08 10:00', 'status': 'canceled'}, headers=auth_headers)
+    assert response.status_code == 200
+    response = client.put(url, json={'original_time': '2030-01-22 10:00', 'appointment_time': '2030-01-23 14:00'}, headers=auth_headers)
+    assert response.status_code == 200
+    assert SeriesException.query.count() == 2
+
+    assert client.put(url, json={'original_time': '2030-01-09 10:00', 'status': 'canceled'}, headers=auth_headers).status_code == 404
+    assert client.put(url, json={'original_time': '2030-01-01 10:00', 'status': 'canceled'}, headers=auth_headers).status_code == 400
+
+    assert book(auth_headers, test_doctor, '2030-01-08 10:00').status_code == 201
+    assert book(auth_headers, test_doctor, '2030-01-22 10:00').status_code == 201
+    assert book(auth_headers, test_doctor, '2030-01-23 14:00').status_code == 400
+
+    response = client.get(f'/api/appointments/series/{series_id}?from=2030-01-08&to=2030-01-23', headers=auth_headers)
+    items = response.json['items']
+    assert [(i['original_time'], i['appointment_time'], i['status']) for i in items] == [
+        ('2030-01-08 10:00', '2030-01-08 10:00', 'canceled'),
+        ('2030-01-15 10:00', '2030-01-15 10:00', 'scheduled'),
+        ('2030-01-22 10:00', '2030-01-23 14:00', 'scheduled')
+    ]
+    assert all(i['notes'] == 'Physiotherapy' for i in items)
+
+    response = client.get(f'/api/doctors/{test_doctor.id}/availability?from=2030-01-15&to=2030-01-15')
+    assert '2030-01-15 10:00' not in response.json['slots']
+    assert '2030-01-15 10:30' in response.json['slots']
+
+# test canceling a series frees its future occurrences
+def test_cancel_series(client, auth_headers, test_doctor, book):
+    series_id = create_series(client, auth_headers, test_doctor).json['series_id']
+    response = client.delete(f'/api/appointments/series/{series_id}', headers=auth_headers)
+    assert response.status_code == 200
+
+    series = db.session.get(AppointmentSeries, series_id)
+    assert series.occurrences == 1
+    assert series.template.status == 'canceled'
+    assert book(auth_headers, test_doctor, '2030-01-01 10:00').status_code == 201
+    assert book(auth_headers, test_doctor, '2030-01-15 10:00').status_code == 201
+
+    # The template can't be deleted out from under its series
+    response = client.delete(f'/api/appointments/{series.appointment_id}/delete', headers=auth_headers)
+    assert response.status_code == 400
+
+# test series and single bookings check their slots under the doctor's schedule lock
+def test_series_writes_lock_the_schedule(client, app, auth_headers, test_doctor, book, monkeypatch):
+    locked = []
+    monkeypatch.setattr(routes.routes, 'lock_schedules', lambda doctor_ids: locked.append(sorted(doctor_ids)))
+
+    create_series(client, auth_headers, test_doctor)
+    book(auth_headers, test_doctor, '2030-01-02 10:00')
+    assert locked == [[test_doctor.id], [test_doctor.id]]
+
+    # On Postgres each doctor gets a transaction-level advisory lock, in id order
+    statements = []
+    with app.app_context():
+        monkeypatch.setattr(db.session, 'get_bind', lambda: SimpleNamespace(dialect=SimpleNamespace(name='postgresql')))
+        monkeypatch.setattr(db.session, 'execute', statements.append)
+        lock_schedules([7, 3, 7])
+    assert ['pg_advisory_xact_lock' in str(statement) for statement in statements] == [True, True]
+    assert [list(statement.compile().params.values()) for statement in statements] == [[1, 3], [1, 7]]
+
+# test booleans aren't accepted as recurrence counts
+def test_series_rejects_boolean_recurrence(client, auth_headers, test_doctor):
+    assert create_series(client, auth_headers, test_doctor, interval_days=True).status_code == 400
+    assert create_series(client, auth_headers, test_doctor, occurrences=True).status_code == 400
+    assert AppointmentSeries.query.count() == 0
@@ -0,0 +1,52 @@
+from datetime import datetime, timedelta
+from models import db, Appointment
+from sweeper import sweep_overdue_appointments
+
+def add_appointment(patient, doctor, appointment_time, status='scheduled'):
+    appointment = Appointment(
+        patient_id=patient.id,
+        doctor_id=doctor.id,
+        appointment_time=appointment_time,
+        status=status
+    )
+    db.session.add(appointment)
+    db.session.commit()
+    return appointment.id
+
+# test the sweeper completes past scheduled appointments in batches
+def test_sweep_completes_overdue_appointments(app, test_patient, test_doctor):
+    now = datetime.now()
+    past_ids = [add_appointment(test_patient, test_doctor, now - timedelta(hours=i + 1)) for i in range(5)]
+    canceled_id = add_appointment(test_patient, test_doctor, now - timedelta(days=1), status='canceled')
+    future_id = add_appointment(test_patient, test_doctor, now + timedelta(days=1))
+
+    assert sweep_overdue_appointments(batch_size=2, now=now) == 5
+
+    db.session.expire_all()
+    assert all(db.session.get(Appointment, i).status == 'completed' for i in past_ids)
+    assert db.session.get(Appointment, canceled_id).status == 'canceled'
+    assert db.session.get(Appointment, future_id).status == 'scheduled'
+    assert sweep_overdue_appointments(batch_size=2, now=now) == 0
+
+# test the profile reports past appointments as completed without writing
+def test_profile_is_read_only(client, auth_headers, test_patient, test_doctor, app):
+    appointment_id = add_appointment(test_patient, test_doctor, datetime.now() - timedelta(hours=1))
+
+    response = client.get('/api/patients/profile', headers=auth_headers)
+    assert response.status_code == 200
+    assert response.json['appointments'][0]['status'] == 'completed'
+
+    db.session.expire_all()
+    assert db.session.get(Appointment, appointment_id).status == 'scheduled'
+
+# test every listing agrees with the profile on past scheduled appointments
+def test_listings_report_effective_status(client, auth_headers, test_patient, test_doctor):
+    appointment_time = datetime.now() - timedelta(hours=1)
+    add_appointment(test_patient, test_doctor, appointment_time)
+    day = appointment_time.date()
+    window = f'from={day.isoformat()}&to={(day + timedelta(days=1)).isoformat()}'
+
+    for url in ('/api/appointments', f'/api/doctors/{test_doctor.id}/appointments',
+                f'/api/doctors/{test_doctor.id}/appointments?{window}'):
+        response = client.get(url, headers=auth_headers)
+        assert [appointment['status'] for appointment in response.json] == ['completed'], url
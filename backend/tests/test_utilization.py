@@ -0,0 +1,104 @@
+from datetime import datetime, timedelta
+from sqlalchemy import event
+from models import db, Doctor, Appointment, UtilizationRollup
+from sweeper import sweep_overdue_appointments
+
+def rollups():
+    return {(row.doctor_id, row.day.isoformat(), row.status): row.appointments
+            for row in UtilizationRollup.query.all() if row.appointments}
+
+def assert_matches_rebuild():
+    # The incrementally maintained rows equal a rebuild from scratch
+    maintained = rollups()
+    UtilizationRollup.rebuild()
+    assert rollups() == maintained
+
+# test appointment writes adjust the rollups in their own transaction
+def test_writes_maintain_rollups(client, auth_headers, test_doctor, book):
+    first = book(auth_headers, test_doctor, '2030-01-01 10:00').json['appointment_id']
+    book(auth_headers, test_doctor, '2030-01-01 11:00')
+    assert rollups() == {(test_doctor.id, '2030-01-01', 'scheduled'): 2}
+
+    client.put(f'/api/appointments/{first}', json={'appointment_time': '2030-01-02 10:00'}, headers=auth_headers)
+    client.delete(f'/api/appointments/{first}', headers=auth_headers)
+    assert rollups() == {(test_doctor.id, '2030-01-01', 'scheduled'): 1, (test_doctor.id, '2030-01-02', 'canceled'): 1}
+
+    # Rolled back writes leave no trace
+    appointment = db.session.get(Appointment, first)
+    appointment.status = 'scheduled'
+    db.session.flush()
+    db.session.rollback()
+    assert rollups()[(test_doctor.id, '2030-01-02', 'canceled')] == 1
+    assert_matches_rebuild()
+
+# test series occurrences are counted, and follow moves, cancellations and the series' end
+def test_series_maintain_rollups(client, auth_headers, test_doctor):
+    series_id = client.post('/api/appointments/series', json={
+        'doctor_id': test_doctor.id,
+        'appointment_time': '2030-01-01 10:00',
+        'interval_days': 1,
+        'occurrences': 3
+    }, headers=auth_headers).json['series_id']
+    assert rollups() == {(test_doctor.id, f'2030-01-0{day}', 'scheduled'): 1 for day in (1, 2, 3)}
+
+    url = f'/api/appointments/series/{series_id}/occurrences'
+    client.put(url, json={'original_time': '2030-01-02 10:00', 'appointment_time': '2030-01-04 09:00'}, headers=auth_headers)
+    client.put(url, json={'original_time': '2030-01-03 10:00', 'status': 'canceled'}, headers=auth_headers)
+    assert rollups() == {
+        (test_doctor.id, '2030-01-01', 'scheduled'): 1,
+        (test_doctor.id, '2030-01-03', 'canceled'): 1,
+        (test_doctor.id, '2030-01-04', 'scheduled'): 1
+    }
+    assert_matches_rebuild()
+
+    client.delete(f'/api/appointments/series/{series_id}', headers=auth_headers)
+    assert rollups() == {(test_doctor.id, '2030-01-01', 'canceled'): 1}
+    assert_matches_rebuild()
+
+# test the status sweeper moves overdue appointments to completed in the rollups
+def test_sweeper_maintains_rollups(app, test_patient, test_doctor):
+    yesterday = datetime.now().replace(hour=10, minute=0, second=0, microsecond=0) - timedelta(days=1)
+    db.session.add_all([
+        Appointment(doctor_id=test_doctor.id, patient_id=test_patient.id, appointment_time=yesterday),
+        Appointment(doctor_id=test_doctor.id, patient_id=test_patient.id, appointment_time=yesterday + timedelta(hours=1))
+    ])
+    db.session.commit()
+    assert sweep_overdue_appointments() == 2
+    assert rollups() == {(test_doctor.id, yesterday.date().isoformat(), 'completed'): 2}
+
+# test the report groups by doctor or specialization and reads only the rollups
+def test_utilization_report(client, auth_headers, test_patient, test_doctor):
+    other = Doctor(name='Dr. Other', email='other@example.com', phone='0987654321', specialization='General')
+    db.session.add(other)
+    db.session.commit()
+    yesterday = datetime.now().replace(hour=10, minute=0, second=0, microsecond=0) - timedelta(days=1)
+    db.session.add_all([
+        Appointment(doctor_id=test_doctor.id, patient_id=test_patient.id, appointment_time=yesterday),
+        Appointment(doctor_id=test_doctor.id, patient_id=test_patient.id, appointment_time=yesterday, status='canceled'),
+        Appointment(doctor_id=other.id, patient_id=test_patient.id, appointment_time=yesterday + timedelta(days=2))
+    ])
+    db.session.commit()
+    day = yesterday.date()
+    url = f'/api/analytics/utilization?from={day}&to={day + timedelta(days=2)}'
+
+    statements = []
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+    event.listen(db.engine, 'before_cursor_execute', record)
+    try:
+        response = client.get(url, headers=auth_headers)
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', record)
+    assert not [statement for statement in statements if 'FROM appointment' in statement]
+    # Yesterday's scheduled appointment already happened
+    assert response.json == [
+        {'doctor_id': test_doctor.id, 'date': day.isoformat(), 'booked': 0, 'canceled': 1, 'completed': 1},
+        {'doctor_id': other.id, 'date': (day + timedelta(days=2)).isoformat(), 'booked': 1, 'canceled': 0, 'completed': 0}
+    ]
+
+    response = client.get(f'{url}&group_by=specialization', headers=auth_headers)
+    assert [(item['specialization'], item['booked'] + item['canceled'] + item['completed']) for item in response.json] == [('General', 2), ('General', 1)]
+
+    assert client.get(f'{url}&group_by=patient', headers=auth_headers).status_code == 400
+    assert client.get('/api/analytics/utilization?from=2030-01-02&to=2030-01-01', headers=auth_headers).status_code == 400
+    assert client.get('/api/analytics/utilization?from=2020-01-01&to=2030-01-01', headers=auth_headers).status_code == 400
@@ -0,0 +1,88 @@
+import pytest
+from datetime import datetime
+from models import db, Appointment, VersionConflict, commit_versioned
+from services import retry_on_conflict
+from sweeper import sweep_overdue_appointments
+
+def create(client, headers, doctor, appointment_time='2030-01-02 10:00'):
+    return client.post('/api/appointments/create', json={
+        'doctor_id': doctor.id,
+        'appointment_time': appointment_time
+    }, headers=headers).json['appointment_id']
+
+def bump_version(appointment_id):
+    # Another writer commits an update behind the session's back
+    with db.engine.begin() as connection:
+        connection.execute(db.text('UPDATE appointment SET version = version + 1 WHERE id = :id'), {'id': appointment_id})
+
+# test If-Match and the version field make updates conditional
+def test_update_with_if_match(client, auth_headers, test_doctor):
+    appointment_id = create(client, auth_headers, test_doctor)
+    url = f'/api/appointments/{appointment_id}'
+
+    response = client.get(url, headers=auth_headers)
+    assert response.headers['ETag'] == '"1"'
+    assert response.json['version'] == 1
+
+    response = client.put(url, json={'notes': 'Front desk'}, headers={**auth_headers, 'If-Match': '"1"'})
+    assert response.status_code == 200
+    assert response.json['version'] == 2
+
+    # The patient's edit was based on version 1
+    response = client.put(url, json={'notes': 'Patient', 'version': 1}, headers=auth_headers)
+    assert response.status_code == 409
+    assert response.json['version'] == 2
+    assert response.headers['ETag'] == '"2"'
+    assert db.session.get(Appointment, appointment_id).notes == 'Front desk'
+
+    assert client.put(url, json={'notes': 'x'}, headers={**auth_headers, 'If-Match': 'abc'}).status_code == 400
+    assert client.delete(url, headers={**auth_headers, 'If-Match': '"1"'}).status_code == 409
+    assert client.delete(url, headers={**auth_headers, 'If-Match': '"2"'}).status_code == 200
+    assert client.get(url, headers=auth_headers).json['version'] == 3
+
+# test a concurrent commit between read and write makes the compare-and-swap fail
+def test_lost_update_is_detected(client, auth_headers, test_doctor):
+    appointment_id = create(client, auth_headers, test_doctor)
+    appointment = db.session.get(Appointment, appointment_id)
+    appointment.notes = 'Read at version 1'
+    bump_version(appointment_id)
+
+    with pytest.raises(VersionConflict):
+        commit_versioned()
+    db.session.expire_all()
+    assert db.session.get(Appointment, appointment_id).version == 2
+
+# test the retry helper re-runs the operation and gives up after a bounded number of tries
+def test_retry_on_conflict(app, client, auth_headers, test_doctor):
+    appointment_id = create(client, auth_headers, test_doctor)
+    calls = []
+
+    def add_note():
+        calls.append(1)
+        appointment = db.session.get(Appointment, appointment_id)
+        appointment.notes = 'Retried'
+        if len(calls) == 1:
+            bump_version(appointment_id)
+        commit_versioned()
+        return appointment.version
+
+    assert retry_on_conflict(add_note) == 3
+    assert len(calls) == 2
+
+    def always_conflicts():
+        calls.append(1)
+        raise VersionConflict()
+
+    calls.clear()
+    with pytest.raises(VersionConflict):
+        retry_on_conflict(always_conflicts, attempts=3)
+    assert len(calls) == 3
+
+# test bulk status updates bump the version too
+def test_sweeper_bumps_version(app, test_patient, test_doctor):
+    appointment = Appointment(patient_id=test_patient.id, doctor_id=test_doctor.id, appointment_time=datetime(2020, 1, 1, 9, 0))
+    db.session.add(appointment)
+    db.session.commit()
+    sweep_overdue_appointments(batch_size=10)
+    db.session.expire_all()
+    assert appointment.version == 2
@@ -0,0 +1,100 @@
+from datetime import datetime, timedelta
+from models import db, Patient, Doctor, Appointment, WaitlistEntry
+from services import waitlist_index, backfill_slot
+
+def add_patient(client, name, email):
+    patient = Patient(name=name, email=email, phone='1112223333')
+    patient.set_password('testpass123')
+    db.session.add(patient)
+    db.session.commit()
+    token = client.post('/api/patients/login', json={'email': email, 'password': 'testpass123'}).json['access_token']
+    return patient, {'Authorization': f'Bearer {token}'}
+
+def join(client, headers, **data):
+    body = {'from': '2030-01-02 08:00', 'to': '2030-01-02 18:00'}
+    body.update(data)
+    return client.post('/api/waitlist', json=body, headers=headers)
+
+# test a cancellation books the slot for the highest priority waiting patient
+def test_cancel_backfills_best_candidate(client, auth_headers, test_doctor, book):
+    appointment_id = book(auth_headers, test_doctor).json['appointment_id']
+    waiting, waiting_headers = add_patient(client, 'Waiting Patient', 'waiting@example.com')
+    urgent, urgent_headers = add_patient(client, 'Urgent Patient', 'urgent@example.com')
+    assert join(client, waiting_headers, doctor_id=test_doctor.id, priority=1).status_code == 201
+    assert join(client, urgent_headers, specialization='General', priority=5).status_code == 201
+    # Outside the window, never matched
+    assert join(client, urgent_headers, doctor_id=test_doctor.id, priority=10, **{'from': '2030-01-03 08:00', 'to': '2030-01-03 18:00'}).status_code == 201
+
+    assert client.delete(f'/api/appointments/{appointment_id}', headers=auth_headers).status_code == 200
+
+    booked = Appointment.query.filter_by(appointment_time=datetime(2030, 1, 2, 10, 0), status='scheduled').one()
+    assert booked.patient_id == urgent.id
+    entries = client.get('/api/waitlist', headers=urgent_headers).json
+    assert [(e['status'], e['appointment_id']) for e in entries] == [('booked', booked.id), ('waiting', None)]
+    assert client.get('/api/waitlist', headers=waiting_headers).json[0]['status'] == 'waiting'
+
+# test offers can be declined, passing the slot on, or accepted
+def test_offer_decline_and_accept(client, auth_headers, test_doctor, book):
+    appointment_id = book(auth_headers, test_doctor).json['appointment_id']
+    first, first_headers = add_patient(client, 'First Patient', 'first@example.com')
+    second, second_headers = add_patient(client, 'Second Patient', 'second@example.com')
+    first_id = join(client, first_headers, doctor_id=test_doctor.id, priority=3, auto_book=False).json['waitlist_id']
+    second_id = join(client, second_headers, doctor_id=test_doctor.id, priority=1, auto_book=False).json['waitlist_id']
+
+    client.delete(f'/api/appointments/{appointment_id}', headers=auth_headers)
+    assert db.session.get(WaitlistEntry, first_id).status == 'offered'
+    assert db.session.get(WaitlistEntry, second_id).status == 'waiting'
+
+    response = client.post(f'/api/waitlist/{first_id}/offer', json={'accept': False}, headers=first_headers)
+    assert response.status_code == 200
+    assert db.session.get(WaitlistEntry, first_id).status == 'waiting'
+    assert db.session.get(WaitlistEntry, second_id).status == 'offered'
+
+    response = client.post(f'/api/waitlist/{second_id}/offer', json={'accept': True}, headers=second_headers)
+    assert response.status_code == 201
+    assert db.session.get(Appointment, response.json['appointment_id']).patient_id == second.id
+    assert client.post(f'/api/waitlist/{second_id}/offer', json={'accept': True}, headers=second_headers).status_code == 404
+
+# test entries that left the waitlist are never matched
+def test_leave_waitlist(client, auth_headers, test_doctor, book):
+    appointment_id = book(auth_headers, test_doctor).json['appointment_id']
+    _, headers = add_patient(client, 'Waiting Patient', 'waiting@example.com')
+    entry_id = join(client, headers, doctor_id=test_doctor.id).json['waitlist_id']
+    assert client.delete(f'/api/waitlist/{entry_id}', headers=headers).status_code == 200
+
+    client.delete(f'/api/appointments/{appointment_id}', headers=auth_headers)
+    assert Appointment.query.filter_by(status='scheduled').count() == 0
+    assert join(client, headers, doctor_id=test_doctor.id, priority=99).status_code == 400
+    assert join(client, headers, doctor_id=test_doctor.id, priority=True).status_code == 400
+    assert join(client, headers, doctor_id=test_doctor.id, to='2030-03-02 18:00').status_code == 400
+
+# test matching reads only the slot's doctor and day among many entries
+def test_matcher_with_many_entries(app, test_patient, test_doctor):
+    other = Doctor(name='Other Doctor', email='other@example.com', phone='0987654321', specialization='Pediatrics')
+    db.session.add(other)
+    db.session.commit()
+    start = datetime(2030, 1, 1, 8, 0)
+    db.session.execute(db.insert(WaitlistEntry), [{
+        'patient_id': test_patient.id,
+        'doctor_id': (test_doctor.id, other.id)[i % 2],
+        'window_start': start + timedelta(days=i % 20),
+        'window_end': start + timedelta(days=i % 20, hours=10),
+        'priority': i % 7,
+        'auto_book': True,
+        'status': 'waiting',
+        'created_at': start - timedelta(seconds=i)
+    } for i in range(20000)])
+    db.session.commit()
+
+    slot = datetime(2030, 1, 5, 10, 0)
+    best = WaitlistEntry.query.filter(
+        WaitlistEntry.doctor_id == test_doctor.id,
+        WaitlistEntry.window_start <= slot,
+        WaitlistEntry.window_end > slot
+    ).order_by(WaitlistEntry.priority.desc(), WaitlistEntry.created_at, WaitlistEntry.id).first()
+    entry_id, _ = waitlist_index.candidates(test_doctor, slot)[0]
+    assert entry_id == best.id
+
+    entry = backfill_slot(test_doctor, slot)
+    assert entry.id == best.id and entry.status == 'booked'
+    assert waitlist_index.candidates(test_doctor, slot)[0][0] != best.id
@@ -1,2 +1,3 @@
 from .patient import validate_email, validate_password, validate_phone, validate_name
-from .appointment import validate_appointment_time, validate_appointment_status
\ No newline at end of file
+from .appointment import validate_appointment_time, validate_appointment_status, validate_date, validate_recurrence
+from .waitlist import validate_waitlist_window, validate_priority
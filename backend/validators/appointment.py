@@ -13,3 +13,17 @@ def validate_appointment_status(status):
         return False, "Invalid appointment status. Must be 'scheduled', 'canceled', or 'completed'."
     return True, ""
 
+def validate_date(date):
+    try:
+        datetime.strptime(date, "%Y-%m-%d")
+        return True, ""
+    except ValueError:
+        return False, "Invalid date format. Use YYYY-MM-DD."
+
+def validate_recurrence(interval_days, occurrences, max_occurrences):
+    # bool is an int subclass, but true/false aren't counts
+    if not isinstance(interval_days, int) or isinstance(interval_days, bool) or not 1 <= interval_days <= 365:
+        return False, "interval_days must be a whole number of days between 1 and 365."
+    if not isinstance(occurrences, int) or isinstance(occurrences, bool) or not 2 <= occurrences <= max_occurrences:
+        return False, f"occurrences must be a whole number between 2 and {max_occurrences}."
+    return True, ""
@@ -0,0 +1,15 @@
+# validators/waitlist.py
+from datetime import timedelta
+
+def validate_waitlist_window(window_start, window_end, max_days):
+    if window_end <= window_start:
+        return False, "Waitlist window must end after it starts."
+    if window_end - window_start > timedelta(days=max_days):
+        return False, f"Waitlist window can be at most {max_days} days long."
+    return True, ""
+
+def validate_priority(priority, max_priority):
+    # bool is an int subclass, but true/false aren't priorities
+    if not isinstance(priority, int) or isinstance(priority, bool) or not 0 <= priority <= max_priority:
+        return False, f"priority must be a whole number between 0 and {max_priority}."
+    return True, ""
@@ -0,0 +1,8 @@
+# wsgi.py
+"""Production WSGI entry point: `gunicorn -c gunicorn.conf.py` serves `wsgi:app`."""
+from app import create_app
+from sweeper import start_configured_sweeper
+
+app = create_app({'MIGRATE_COMMANDS': False})
+# Only serving processes sweep: migrations, seeding and scripts build the app without it
+start_configured_sweeper(app)
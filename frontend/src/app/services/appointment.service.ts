@@ -1,6 +1,6 @@
 import { Injectable } from '@angular/core';
-import { HttpClient } from '@angular/common/http';
-import { Observable, catchError, throwError } from 'rxjs';
+import { HttpClient, HttpParams } from '@angular/common/http';
+import { EMPTY, Observable, catchError, expand, map, reduce, throwError } from 'rxjs';
 import { Appointment } from '../models/appointment.model';
 import { environment } from '../../environments/environment';
 import { User } from '../models/user.model';
@@ -10,12 +10,14 @@ import { User } from '../models/user.model';
 })
 export class AppointmentService {
   private apiUrl = environment.apiUrl;
+  // Rows requested per page when following a paginated list to its end
+  private pageSize = 1000;
 
   constructor(private http: HttpClient) {}
 
   // Get all appointments for the logged-in user (patient or doctor)
   getAppointments(): Observable<Appointment[]> {
-    return this.http.get<Appointment[]>(`${this.apiUrl}/api/appointments`);
+    return this.getAllPages<Appointment>(`${this.apiUrl}/api/appointments`);
   }
 
   // Get patient's appointments
@@ -25,7 +27,7 @@ export class AppointmentService {
 
   // Get doctor's appointments
   getDoctorAppointments(doctorId: number): Observable<Appointment[]> {
-    return this.http.get<Appointment[]>(`${this.apiUrl}/api/doctors/${doctorId}/appointments`);
+    return this.getAllPages<Appointment>(`${this.apiUrl}/api/doctors/${doctorId}/appointments`);
   }
 
   // Book a new appointment or reschedule a canceled one
@@ -66,7 +68,27 @@ export class AppointmentService {
 
   // Get all doctors
   getDoctors(): Observable<User[]> {
-    return this.http.get<User[]>(`${this.apiUrl}/api/doctors`);
+    return this.getAllPages<User>(`${this.apiUrl}/api/doctors`);
+  }
+
+  // Fetch every page of a list endpoint, following the X-Next-Cursor header
+  private getAllPages<T>(url: string): Observable<T[]> {
+    const fetchPage = (cursor: string | null) => {
+      let params = new HttpParams().set('limit', this.pageSize);
+      if (cursor) {
+        params = params.set('cursor', cursor);
+      }
+      return this.http.get<T[]>(url, { params, observe: 'response' });
+    };
+
+    return fetchPage(null).pipe(
+      expand(response => {
+        const cursor = response.headers.get('X-Next-Cursor');
+        return cursor ? fetchPage(cursor) : EMPTY;
+      }),
+      map(response => response.body ?? []),
+      reduce((rows: T[], page: T[]) => rows.concat(page), [])
+    );
   }
 
   // Helper method to format date and time for the API
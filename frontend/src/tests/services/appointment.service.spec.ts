@@ -39,11 +39,34 @@ describe('AppointmentService', () => {
       expect(appointments).toBeDefined();
     });
 
-    const req = httpMock.expectOne(`${environment.apiUrl}/api/appointments`);
+    const req = httpMock.expectOne(r => r.url === `${environment.apiUrl}/api/appointments`);
     expect(req.request.method).toBe('GET');
     req.flush(mockAppointments);
   });
 
+  it('should follow the next page cursor', () => {
+    const page = (id: number): AppointmentDTO => ({
+      id,
+      patient_id: 1,
+      doctor_id: 1,
+      appointment_time: '2024-01-20 14:30',
+      status: 'scheduled'
+    });
+    let received: any[] = [];
+
+    service.getDoctorAppointments(1).subscribe(appointments => {
+      received = appointments;
+    });
+
+    const url = `${environment.apiUrl}/api/doctors/1/appointments`;
+    const first = httpMock.expectOne(r => r.url === url && !r.params.has('cursor'));
+    first.flush([page(1)], { headers: { 'X-Next-Cursor': 'abc' } });
+    const second = httpMock.expectOne(r => r.url === url && r.params.get('cursor') === 'abc');
+    second.flush([page(2)]);
+
+    expect(received.map(appointment => appointment.id)).toEqual([1, 2]);
+  });
+
   it('should get doctor appointments', () => {
     const doctorId = 1;
     const mockAppointments: AppointmentDTO[] = [{
@@ -58,7 +81,7 @@ describe('AppointmentService', () => {
       expect(appointments).toBeDefined();
     });
 
-    const req = httpMock.expectOne(`${environment.apiUrl}/api/doctors/${doctorId}/appointments`);
+    const req = httpMock.expectOne(r => r.url === `${environment.apiUrl}/api/doctors/${doctorId}/appointments`);
     expect(req.request.method).toBe('GET');
     req.flush(mockAppointments);
   });